@@ -1,28 +1,57 @@
 # backend/app.py
 
-import uuid
-import random
 import os
 import requests
 import re
 import json
-from flask import Flask, request, jsonify, send_from_directory
+import zipfile
+import click
+from flask import Flask, request, jsonify, send_from_directory, send_file, stream_with_context
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
+from werkzeug.datastructures import FileStorage
 from dotenv import load_dotenv
+from datetime import datetime
+from sqlalchemy import and_, or_, insert, update
 
 load_dotenv()
 
 from config import Config
-from models.database import db, ClothingItem, ChatSession, ChatMessage
-from ml_model import classify_image
+from models.database import db, init_db, ClothingItem, ChatSession, ChatMessage
+from ml_model import analyze_images, model_loader, inference_client
+from jobs import JobQueue, JobQueueFull
+from image_store import save_content_addressed, perceptual_hash, ClassificationCache
+from image_preprocessing import DecodedImage
+from color_extraction import dominant_color, color_label
+import thumbnails
+from embedding_index import EmbeddingIndex
+from cache import TTLCache
+from fashion_logic import PALETTE, CLOTHING_TYPES, OCCASION_RULES, BAND_EXCLUDES, temperature_band, describe_outfit
+import wardrobe
+import migrations
+from outfit_precompute import OutfitPrecomputer
+import metrics
+from metrics import stage
 
 # Flask app
 app = Flask(__name__)
 app.config.from_object(Config)
 CORS(app)
-db.init_app(app)
+init_db(app)
+metrics.init_app(app)
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+os.makedirs(app.config['THUMBNAIL_FOLDER'], exist_ok=True)
+if app.config['MODEL_PRELOAD'] and inference_client is None: model_loader.load_in_background()
+upload_jobs = JobQueue(max_workers=app.config['UPLOAD_WORKERS'], max_pending=app.config['UPLOAD_MAX_PENDING'])
+thumbnail_jobs = JobQueue(max_workers=app.config['THUMBNAIL_WORKERS'], max_pending=app.config['THUMBNAIL_MAX_PENDING'])
+embedding_index = EmbeddingIndex(app.config['EMBEDDING_INDEX_FOLDER'], dtype=app.config['EMBEDDING_DTYPE'])
+classification_cache = ClassificationCache(max_entries=app.config['CLASSIFICATION_CACHE_SIZE'], max_distance=app.config['PERCEPTUAL_HASH_MAX_DISTANCE'])
+wardrobe_cache = wardrobe.WardrobeCache()
+precomputed_outfits = None
+if app.config['OUTFIT_PRECOMPUTE']:
+    precomputed_outfits = OutfitPrecomputer(app, wardrobe_cache, top_k=app.config['OUTFIT_PRECOMPUTE_TOP_K'],
+                                            poll_seconds=app.config['OUTFIT_PRECOMPUTE_POLL_SECONDS'])
+    wardrobe.on_change(precomputed_outfits.notify)
 
 
 # --- CORE ROUTES ---
@@ -30,8 +59,37 @@ os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 @app.route('/')
 def home(): return {"message": "Fashion AI Backend is Running!"}
 
+@app.route('/ready')
+def ready():
+    status = model_loader.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+@app.route('/stats/cache')
+def cache_stats(): return jsonify({"weather": weather_cache.stats(), "llm": llm_cache.stats()})
+
 @app.route('/uploads/<path:filename>')
-def uploaded_file(filename): return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+def uploaded_file(filename): return send_from_directory(app.config['UPLOAD_FOLDER'], filename, max_age=app.config['UPLOAD_CACHE_MAX_AGE'])
+
+@app.route('/thumbnails/<int:size>/<filename>')
+def thumbnail(size, filename):
+    if size not in thumbnails.SIZES: return jsonify({"error": f"Size must be one of {list(thumbnails.SIZES)}"}), 400
+    fmt = request.args.get('format')
+    negotiated = fmt is None
+    if negotiated: fmt = 'webp' if any(mimetype == 'image/webp' for mimetype, _ in request.accept_mimetypes) else 'jpeg'
+    if fmt not in thumbnails.FORMATS: return jsonify({"error": f"Format must be one of {list(thumbnails.FORMATS)}"}), 400
+    if filename != secure_filename(filename) or not os.path.isfile(os.path.join(app.config['UPLOAD_FOLDER'], filename)):
+        return jsonify({"error": "Image not found"}), 404
+
+    try:
+        path = thumbnails.get_or_create_derivative(app.config['UPLOAD_FOLDER'], app.config['THUMBNAIL_FOLDER'], filename, size, fmt)
+    except Exception as e:
+        print(f"Error creating thumbnail for {filename}: {e}")
+        return jsonify({"error": "Could not create thumbnail"}), 500
+    response = send_file(os.path.abspath(path), mimetype=thumbnails.FORMATS[fmt][1], etag=thumbnails.derivative_etag(filename, size, fmt),
+                         conditional=True, max_age=app.config['UPLOAD_CACHE_MAX_AGE'])
+    response.cache_control.immutable = True
+    if negotiated: response.vary.add('Accept')
+    return response
 
 
 # --- CLOTHING MANAGEMENT API ---
@@ -42,23 +100,202 @@ def upload():
     file = request.files['image']
     if file.filename == '' or not allowed_file(file.filename): return jsonify({"error": "Invalid file type"}), 400
     
-    filename = f"{uuid.uuid4().hex}.{secure_filename(file.filename).rsplit('.', 1)[1].lower()}"
-    file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    file.save(file_path)
-    
+    extension = secure_filename(file.filename).rsplit('.', 1)[1].lower()
+    with stage('upload.save'):
+        filename, sha256, file_path = save_content_addressed(file, app.config['UPLOAD_FOLDER'], extension)
     manual_category = request.form.get('category')
-    final_category = manual_category if manual_category and manual_category.strip() != "" else classify_image(file_path)
-    color = request.form.get('color', 'Default Color')
-    
-    item = ClothingItem(filename=filename, category=final_category, color=color)
-    db.session.add(item)
-    db.session.commit()
+    needs_classification = not (manual_category and manual_category.strip() != "")
+    # Decoded once here; the classifier, the perceptual hash, the color and the thumbnails all work from it
+    with stage('upload.decode'):
+        image = decode_upload(file_path)
+    with stage('upload.color'):
+        extracted_color = dominant_color(image) if isinstance(image, DecodedImage) else None
+    color = (request.form.get('color') or '').strip() or color_label(extracted_color) or 'Default Color'
+    color_lab = extracted_color.lab if extracted_color else None
+    if app.config['THUMBNAILS_ON_UPLOAD']:
+        try:
+            thumbnail_jobs.submit(thumbnails.create_all_derivatives, app.config['UPLOAD_FOLDER'], app.config['THUMBNAIL_FOLDER'], filename, image)
+        except JobQueueFull:
+            pass  # They will be generated on first request instead
+
+    async_mode = request.args.get('async', request.form.get('async', str(app.config['ASYNC_UPLOADS']))).lower() in ('1', 'true')
+
+    if needs_classification and async_mode:
+        # Save the item with an empty category now and classify it in the background
+        item = ClothingItem(filename=filename, category=None, color=color, color_lab=color_lab)
+        db.session.add(item)
+        wardrobe.bump_version()
+        db.session.commit()
+        try:
+            job_id = upload_jobs.submit(classify_uploaded_item, item.id, image, sha256, item_id=item.id)
+        except JobQueueFull:
+            db.session.delete(item)
+            wardrobe.bump_version()
+            db.session.commit()
+            remove_upload_if_unused(filename)
+            return jsonify({"error": "Too many uploads are being processed. Please try again shortly."}), 503
+        return jsonify({"job_id": job_id, "status": "pending", "id": item.id, "filename": item.filename, "category": item.category, "color": item.color}), 202
+
+    final_category, embedding = classify_upload(image, sha256) if needs_classification else (manual_category, None)
+    with stage('upload.commit'):
+        item = ClothingItem(filename=filename, category=final_category, color=color, color_lab=color_lab)
+        db.session.add(item)
+        wardrobe.bump_version()
+        db.session.commit()
+    with stage('upload.index'):
+        index_item_embedding(item, embedding)
     return jsonify({"id": item.id, "filename": item.filename, "category": item.category, "color": item.color}), 201
 
+@app.route('/upload/bulk', methods=['POST'])
+def upload_bulk():
+    """
+    Adds many clothes in one request: any number of `images` parts and/or `archive` zip files.
+    An optional `category` / `color` applies to every file; otherwise each image's color is extracted. Each image is decoded once,
+    files that don't decode are reported as failed, images are classified in batches and all rows are inserted with one statement
+    and one commit. Answers with one result per file.
+    """
+    # Werkzeug spools multipart bodies over 500KB to temporary files, so a big upload is never held in memory
+    sources = request.files.getlist('images') + request.files.getlist('image') + request.files.getlist('archive')
+    if not sources: return jsonify({"error": "No files uploaded"}), 400
+    manual_category = (request.form.get('category') or '').strip() or None
+    manual_color = (request.form.get('color') or '').strip() or None
+
+    results, saved = [], []  # saved: (result index, filename, sha256)
+    analyzed = {}  # sha256 -> (classifier pixels, perceptual hash, DominantColor), all from the one decode of each distinct image
+    for name, file, error in iter_bulk_files(sources):
+        if error is None and len(saved) >= app.config['BULK_UPLOAD_MAX_FILES']:
+            error = f"Too many files; at most {app.config['BULK_UPLOAD_MAX_FILES']} per request"
+        if error is None:
+            try:
+                extension = name.rsplit('.', 1)[1].lower()
+                filename, sha256, file_path = save_content_addressed(file, app.config['UPLOAD_FOLDER'], extension)
+            except Exception as e:
+                print(f"Error saving {name}: {e}")
+                error = "Could not save the file"
+        if error is None and sha256 not in analyzed:
+            try:
+                image = DecodedImage.open(file_path)
+            except OSError as e:  # UnidentifiedImageError included
+                print(f"Error decoding {name}: {e}")
+                error = "Not a valid image"
+                remove_upload_if_unused(filename)
+            else:
+                # Only the small classifier input outlives this loop, not the decoded image
+                classify = manual_category is None
+                analyzed[sha256] = (image.model_pixels() if classify else None,
+                                    perceptual_hash(image) if classify and app.config['PERCEPTUAL_HASH'] else None,
+                                    dominant_color(image))
+                if app.config['THUMBNAILS_ON_UPLOAD']:
+                    try:
+                        thumbnail_jobs.submit(thumbnails.create_all_derivatives, app.config['UPLOAD_FOLDER'], app.config['THUMBNAIL_FOLDER'], filename, image)
+                    except JobQueueFull:
+                        pass  # They will be generated on first request instead
+        if error is None: saved.append((len(results), filename, sha256))
+        results.append({"file": name, "status": "error", "error": error} if error else {"file": name, "status": "pending"})
+
+    # Classify every distinct image once: cache hits first, the rest in model-sized batches
+    categories, embeddings = {}, {}
+    if manual_category is None and analyzed:
+        categories = classification_cache.get_many([(sha256, phash) for sha256, (_, phash, _) in analyzed.items()])
+        misses = [sha256 for sha256 in analyzed if sha256 not in categories]
+        batch_size = app.config['BULK_CLASSIFY_BATCH_SIZE']
+        for start in range(0, len(misses), batch_size):
+            batch = misses[start:start + batch_size]
+            for sha256, (category, embedding) in zip(batch, analyze_images([analyzed[sha256][0] for sha256 in batch])):
+                categories[sha256], embeddings[sha256] = category, embedding
+        classification_cache.put_many([(sha256, categories[sha256], analyzed[sha256][1]) for sha256 in misses if categories[sha256] != "Uncategorized"])
+
+    colors = {sha256: color for sha256, (_, _, color) in analyzed.items()}
+    rows = [{"filename": filename, "category": manual_category or categories.get(sha256),
+             "color": manual_color or color_label(colors[sha256]) or 'Default Color',
+             "color_lab": colors[sha256].lab if colors[sha256] else None} for _, filename, sha256 in saved]
+    item_ids = []
+    if rows:
+        item_ids = list(db.session.scalars(insert(ClothingItem).returning(ClothingItem.id, sort_by_parameter_order=True), rows))
+        wardrobe.bump_version()
+        db.session.commit()
+
+    for (index, filename, sha256), item_id, row in zip(saved, item_ids, rows):
+        results[index] = {"file": results[index]['file'], "status": "created",
+                          "item": {"id": item_id, "filename": filename, "category": row['category'], "color": row['color']}}
+    if app.config['SIMILARITY_INDEX'] and item_ids:
+        embedded = [(item_id, embeddings[sha256]) for (_, _, sha256), item_id in zip(saved, item_ids) if embeddings.get(sha256) is not None]
+        if embedded: embedding_index.add_many([item_id for item_id, _ in embedded], [embedding for _, embedding in embedded])
+        embedded_ids = {item_id for item_id, _ in embedded}
+        for (_, filename, _), item_id in zip(saved, item_ids):
+            if item_id not in embedded_ids: index_item_embedding(wardrobe.WardrobeItem(item_id, filename, None, None))
+
+    created = len(item_ids)
+    return jsonify({"created": created, "failed": len(results) - created, "results": results}), 201 if created else 400
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = upload_jobs.get(job_id)
+    if job is None: return jsonify({"error": "Job not found"}), 404
+    item = ClothingItem.query.get(job['item_id']) if job.get('item_id') else None
+    job['item'] = {"id": item.id, "filename": item.filename, "category": item.category, "color": item.color} if item else None
+    return jsonify(job)
+
 @app.route('/clothes', methods=['GET'])
 def get_clothes():
-    items = ClothingItem.query.all()
-    return jsonify([{"id": i.id, "filename": i.filename, "category": i.category, "color": i.color} for i in items])
+    """
+    Lists clothes ordered by id. Optional query parameters:
+    category / color (comma-separated), type (a CLOTHING_TYPES group), fields (comma-separated),
+    limit / cursor (keyset pagination; the response then becomes {"items": [...], "next_cursor": ...}).
+    """
+    fields = [f for f in request.args.get('fields', ','.join(CLOTHING_FIELDS)).split(',') if f]
+    if not fields or any(f not in CLOTHING_FIELDS for f in fields):
+        return jsonify({"error": f"fields must be a comma-separated subset of {list(CLOTHING_FIELDS)}"}), 400
+    categories, colors = csv_arg('category'), csv_arg('color')
+    clothing_type = request.args.get('type')
+    if clothing_type:
+        if clothing_type not in CLOTHING_TYPES: return jsonify({"error": f"type must be one of {list(CLOTHING_TYPES)}"}), 400
+        categories = [c for c in CLOTHING_TYPES[clothing_type] if categories is None or c in categories]
+
+    # Only select the requested columns (plus the id, which the cursor needs)
+    query = db.session.query(*[getattr(ClothingItem, f) for f in dict.fromkeys(['id', *fields])])
+    if categories is not None: query = query.filter(ClothingItem.category.in_(categories))
+    if colors is not None: query = query.filter(ClothingItem.color.in_(colors))
+    query = query.order_by(ClothingItem.id)
+
+    if 'limit' not in request.args and 'cursor' not in request.args:
+        # Unpaginated (legacy) response: stream the array instead of building it in memory
+        def stream():
+            try:
+                yield '['
+                for n, row in enumerate(query.yield_per(1000)):
+                    yield (',' if n else '') + json.dumps({f: getattr(row, f) for f in fields})
+                yield ']'
+            finally:
+                # The query's session was already removed at the end of the view; give back the connection it reopened
+                query.session.close()
+        return app.response_class(stream_with_context(stream()), mimetype='application/json')
+
+    try:
+        limit = min(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        cursor = int(request.args['cursor']) if request.args.get('cursor') else None
+    except ValueError:
+        return jsonify({"error": "limit and cursor must be integers"}), 400
+    if limit < 1: return jsonify({"error": "limit must be positive"}), 400
+    if cursor is not None: query = query.filter(ClothingItem.id > cursor)
+    rows = query.limit(limit + 1).all()
+    next_cursor = str(rows[limit - 1].id) if len(rows) > limit else None
+    return jsonify({"items": [{f: getattr(row, f) for f in fields} for row in rows[:limit]], "next_cursor": next_cursor})
+
+@app.route('/clothes/<int:item_id>/similar', methods=['GET'])
+def similar_clothes(item_id):
+    item = ClothingItem.query.get_or_404(item_id)
+    vector = embedding_index.get(item.id) if app.config['SIMILARITY_INDEX'] else None
+    if vector is None: return jsonify({"error": "This item hasn't been indexed for similarity search yet"}), 404
+    try:
+        k = min(max(int(request.args.get('k', 10)), 1), 100)
+    except ValueError:
+        return jsonify({"error": "k must be an integer"}), 400
+
+    matches = embedding_index.search(vector, k=k, exclude_ids=[item.id])
+    items = {i.id: i for i in ClothingItem.query.filter(ClothingItem.id.in_([match_id for match_id, _ in matches]))}
+    return jsonify([{"id": i.id, "filename": i.filename, "category": i.category, "color": i.color, "score": round(score, 4)}
+                    for i, score in ((items.get(match_id), score) for match_id, score in matches) if i is not None])
 
 @app.route('/clothes/<int:item_id>', methods=['PUT', 'DELETE'])
 def manage_clothing_item(item_id):
@@ -66,16 +303,17 @@ def manage_clothing_item(item_id):
     if request.method == 'PUT':
         data = request.get_json()
         item.category = data.get('category', item.category)
+        if data.get('color', item.color) != item.color: item.color_lab = None  # Stale now; `flask backfill-colors` re-extracts it
         item.color = data.get('color', item.color)
+        wardrobe.bump_version()
         db.session.commit()
         return jsonify({"id": item.id, "filename": item.filename, "category": item.category, "color": item.color})
     if request.method == 'DELETE':
-        try:
-            os.remove(os.path.join(app.config['UPLOAD_FOLDER'], item.filename))
-        except OSError as e:
-            print(f"Error deleting file {item.filename}: {e}")
         db.session.delete(item)
+        wardrobe.bump_version()
         db.session.commit()
+        if app.config['SIMILARITY_INDEX']: embedding_index.delete(item_id)
+        remove_upload_if_unused(item.filename)
         return jsonify({"message": "Item deleted"}), 200
 
 
@@ -90,8 +328,15 @@ def create_chat():
 
 @app.route('/chats', methods=['GET'])
 def get_chats():
-    sessions = ChatSession.query.order_by(ChatSession.created_at.desc()).all()
-    return jsonify([s.to_dict() for s in sessions])
+    """Newest chats first. With limit / cursor the response becomes {"items": [...], "next_cursor": ...}."""
+    query = ChatSession.query.order_by(ChatSession.created_at.desc(), ChatSession.id.desc())
+    if 'limit' not in request.args and 'cursor' not in request.args:
+        return jsonify([s.to_dict() for s in query])
+    try:
+        sessions, next_cursor = paginate_newest_first(query, ChatSession)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"items": [s.to_dict() for s in sessions], "next_cursor": next_cursor})
 
 @app.route('/chats/<int:session_id>', methods=['PUT', 'DELETE'])
 def manage_chat_session(session_id):
@@ -111,9 +356,20 @@ def manage_chat_session(session_id):
 
 @app.route('/chats/<int:session_id>/messages', methods=['GET'])
 def get_messages(session_id):
+    """
+    Messages in chronological order. With limit / cursor only the newest page is returned, as
+    {"items": [...], "next_cursor": ...}; pass next_cursor back to load the page before it.
+    """
     session = ChatSession.query.get_or_404(session_id)
-    messages = sorted(session.messages, key=lambda m: m.created_at)
-    return jsonify([m.to_dict() for m in messages])
+    query = ChatMessage.query.filter(ChatMessage.session_id == session.id)
+    if 'limit' not in request.args and 'cursor' not in request.args:
+        return jsonify([m.to_dict() for m in query.order_by(ChatMessage.created_at, ChatMessage.id)])
+    try:
+        messages, next_cursor = paginate_newest_first(query.order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc()), ChatMessage)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    # Oldest first within the page, like the unpaginated list
+    return jsonify({"items": [m.to_dict() for m in reversed(messages)], "next_cursor": next_cursor})
 
 @app.route('/chats/<int:session_id>/messages', methods=['POST'])
 def post_message(session_id):
@@ -122,27 +378,88 @@ def post_message(session_id):
     user_prompt = data.get('prompt')
     if not user_prompt: return jsonify({"error": "Prompt is required"}), 400
 
-    user_message = ChatMessage(session_id=session.id, role='user', content=user_prompt)
-    db.session.add(user_message)
+    # mode=local answers instantly from the local engine, without calling Gemini
+    engine = request.args.get('mode', data.get('mode'))
+    wants_stream = request.args.get('stream', str(data.get('stream', ''))).lower() in ('1', 'true') or request.accept_mimetypes.best == 'text/event-stream'
+    if wants_stream:
+        # Server-Sent Events: stylist notes as they are generated, then the outfit, then the saved message
+        def event_stream():
+            replies, result, streamed_notes, saved = stream_outfit_with_llm(user_prompt, engine), None, False, False
+            try:
+                for kind, payload in replies:
+                    if kind == 'notes':
+                        streamed_notes = True
+                        yield sse_event('notes', {"text": payload})
+                    else:
+                        result = payload
+                if not streamed_notes: yield sse_event('notes', {"text": result.get('notes')})
+                yield sse_event('outfit', {"outfit": result.get('outfit')})
+                ai_message = save_ai_reply(session, user_prompt, result)
+                saved = True
+                yield sse_event('done', ai_message.to_dict())
+            except GeneratorExit:
+                # The client went away mid-answer: finish it anyway, so the reply is in the chat when they reopen it
+                if not saved:
+                    for kind, payload in replies:
+                        if kind == 'result': result = payload
+                    if result is not None: save_ai_reply(session, user_prompt, result)
+                raise
+        return app.response_class(stream_with_context(event_stream()), mimetype='text/event-stream',
+                                  headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    ai_response_content = generate_outfit_with_llm(user_prompt, engine)
+    ai_message = save_ai_reply(session, user_prompt, ai_response_content)
+    return jsonify(ai_message.to_dict()), 201
 
-    ai_response_content = generate_outfit_with_llm(user_prompt)
-    
+def save_ai_reply(session, user_prompt, ai_response_content):
+    """
+    Stores the user's message with the stylist's answer and names new chats after their first prompt.
+    Both are written only now, in one short transaction: adding the user message before generating would
+    hold SQLite's write lock for the whole Gemini round trip and block every other writer.
+    """
     outfit_data = ai_response_content.get('outfit')
     stylist_notes = ai_response_content.get('notes')
 
+    db.session.add(ChatMessage(session_id=session.id, role='user', content=user_prompt))
     ai_message = ChatMessage(
         session_id=session.id,
         role='ai',
         content=stylist_notes,
-        outfit_data=json.dumps(outfit_data) if outfit_data else None
+        outfit_data=outfit_data or None
     )
     db.session.add(ai_message)
 
     if session.title == "New Outfit Chat":
         session.title = user_prompt[:50]
 
-    db.session.commit()
-    return jsonify(ai_message.to_dict()), 201
+    with stage('chat.commit'):
+        db.session.commit()
+    return ai_message
+
+def paginate_newest_first(query, model):
+    """
+    Keyset pagination over a query ordered by (created_at desc, id desc). The cursor is the
+    "<created_at>/<id>" of the last row returned, so every page costs one index range scan.
+    Returns (rows, next_cursor); raises ValueError for a bad limit or cursor.
+    """
+    try:
+        limit = min(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 1: raise ValueError("limit must be positive")
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            created_at, last_id = cursor.rsplit('/', 1)
+            created_at, last_id = datetime.fromisoformat(created_at), int(last_id)
+        except ValueError:
+            raise ValueError("Invalid cursor")
+        query = query.filter(or_(model.created_at < created_at, and_(model.created_at == created_at, model.id < last_id)))
+    rows = query.limit(limit + 1).all()
+    next_cursor = f"{rows[limit - 1].created_at.isoformat()}/{rows[limit - 1].id}" if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+def sse_event(event, data): return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 
 # --- HELPER DICTIONARIES & FUNCTIONS ---
@@ -150,14 +467,127 @@ def post_message(session_id):
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
 def allowed_file(filename): return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-CLOTHING_TYPES = {'top': ['T-Shirt', 'Shirt', 'Blouse', 'Suit', 'Sweater'], 'bottom': ['Jeans', 'Skirt', 'Trousers'],'dress': ['Dress'],'outerwear': ['Jacket', 'Coat'],'shoes': ['Heels', 'Flats', 'Sneakers']}
-OCCASION_RULES = {'Formal': ['Suit', 'Dress', 'Shirt', 'Trousers', 'Heels'],'Casual': ['T-Shirt', 'Jeans', 'Sweater', 'Skirt', 'Jacket', 'Dress', 'Sneakers', 'Flats'],'Party': ['Dress', 'Skirt', 'Blouse', 'Heels'],'Work': ['Suit', 'Shirt', 'Blouse', 'Trousers', 'Skirt', 'Flats', 'Heels'],'Dinner': ['Dress', 'Blouse', 'Skirt', 'Trousers', 'Heels'],'Date Night': ['Dress', 'Blouse', 'Skirt', 'Heels'],'Chill': ['T-Shirt', 'Jeans', 'Sweater', 'Sneakers']}
+CLOTHING_FIELDS = ('id', 'filename', 'category', 'color')
+DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE = 50, 500
+def iter_bulk_files(sources):
+    """
+    Yields (name, file, error) for every image in the uploaded parts, unpacking zip archives
+    member by member straight from the spooled upload. error is None for acceptable images.
+    """
+    for source in sources:
+        if source.filename and source.filename.lower().endswith('.zip'):
+            try:
+                archive = zipfile.ZipFile(source.stream)
+            except zipfile.BadZipFile:
+                yield source.filename, None, "Not a valid zip archive"
+                continue
+            with archive:
+                for member in archive.infolist():
+                    name = member.filename
+                    if member.is_dir() or os.path.basename(name).startswith('.') or name.startswith('__MACOSX/'): continue
+                    if not allowed_file(name): yield name, None, "Invalid file type"
+                    elif member.file_size > app.config['BULK_UPLOAD_MAX_FILE_SIZE']: yield name, None, "File is too large"
+                    else:
+                        with archive.open(member) as stream:
+                            yield name, FileStorage(stream=stream, filename=os.path.basename(name)), None
+        elif not source.filename or not allowed_file(source.filename):
+            yield source.filename or '', None, "Invalid file type"
+        else:
+            yield source.filename, source, None
+
+def csv_arg(name):
+    value = request.args.get(name)
+    return [v.strip() for v in value.split(',') if v.strip()] if value else None
+
+def decode_upload(file_path):
+    """The upload as a DecodedImage, or its path if it can't be decoded (the consumers then report the error)."""
+    try:
+        return DecodedImage.open(file_path)
+    except Exception as e:
+        print(f"Error decoding {file_path}: {e}")
+        return file_path
+
+def classify_upload(image, sha256):
+    """
+    Classifies an upload (a path or DecodedImage), skipping inference when the same (or a near-identical)
+    image was classified before. Returns (category, embedding); the embedding is None on a cache hit.
+    """
+    with stage('classify.hash'):
+        phash = perceptual_hash(image) if app.config['PERCEPTUAL_HASH'] else None
+        cached_category = classification_cache.get(sha256, phash)
+    if cached_category: return cached_category, None
+    with stage('classify.model'):
+        category, embedding = analyze_images([image])[0]
+    if category != "Uncategorized": classification_cache.put(sha256, category, phash)
+    return category, embedding
+
+def classify_uploaded_item(item_id, image, sha256):
+    """Background job: classifies an upload and fills in the category of its pending ClothingItem."""
+    with app.app_context():
+        category, embedding = classify_upload(image, sha256)
+        item = ClothingItem.query.get(item_id)
+        if item is None: return None  # Deleted while it was being classified
+        if item.category is None:  # Don't overwrite a category the user set in the meantime
+            item.category = category
+            wardrobe.bump_version()
+            db.session.commit()
+        index_item_embedding(item, embedding)
+        return item.category
+
+def index_item_embedding(item, embedding=None):
+    """
+    Adds an item to the similarity index. Without an embedding at hand, the vector of another
+    item sharing the same image is reused, or else it is computed in the background.
+    """
+    if not app.config['SIMILARITY_INDEX']: return
+    if embedding is None:
+        for (other_id,) in db.session.query(ClothingItem.id).filter(ClothingItem.filename == item.filename, ClothingItem.id != item.id):
+            embedding = embedding_index.get(other_id)
+            if embedding is not None: break
+    if embedding is not None:
+        embedding_index.add(item.id, embedding)
+    elif model_loader.state != 'failed':
+        try:
+            upload_jobs.submit(embed_item, item.id, os.path.join(app.config['UPLOAD_FOLDER'], item.filename), item_id=item.id)
+        except JobQueueFull:
+            print(f"Skipping embedding for item {item.id}: job queue is full. Run 'flask index-embeddings' later.")
+
+def embed_item(item_id, file_path):
+    """Background job: computes an item's embedding and adds it to the similarity index."""
+    _, embedding = analyze_images([file_path])[0]
+    if embedding is None: return None
+    with app.app_context():
+        if ClothingItem.query.get(item_id) is None: return None
+        embedding_index.add(item_id, embedding)
+    return item_id
+
+def remove_upload_if_unused(filename):
+    """Uploads are shared by every item with the same image bytes; delete the file with its last reference."""
+    if ClothingItem.query.filter_by(filename=filename).first() is not None: return
+    try:
+        os.remove(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+        thumbnails.remove_derivatives(app.config['THUMBNAIL_FOLDER'], filename)
+    except OSError as e:
+        print(f"Error deleting file {filename}: {e}")
+
+def make_http_session(pool_size):
+    """Shared session so upstream calls reuse pooled keep-alive connections instead of a new TCP+DNS handshake each time."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+http_session = make_http_session(app.config['HTTP_POOL_SIZE'])
+weather_cache = TTLCache(maxsize=app.config['WEATHER_CACHE_SIZE'], ttl=app.config['WEATHER_CACHE_TTL'])
+# Only successful outfits are cached; error notes are retried on the next request
+llm_cache = TTLCache(maxsize=app.config['LLM_CACHE_SIZE'], ttl=app.config['LLM_CACHE_TTL'], should_cache=lambda result: result.get('outfit') is not None)
 
 def parse_prompt(prompt):
     prompt_lower = prompt.lower()
     parsed_info = {'occasion': 'Casual', 'color': None, 'city': 'New Delhi'}
     occasions = ['casual', 'formal', 'party', 'work', 'dinner', 'date night', 'chill']
-    colors = ['black', 'white', 'red', 'blue', 'green', 'pink', 'grey', 'beige', 'navy']
+    colors = PALETTE[:-1]  # The names color extraction labels uploads with
     for occ in occasions:
         if occ in prompt_lower: parsed_info['occasion'] = occ.title()
     for col in colors:
@@ -169,10 +599,13 @@ def parse_prompt(prompt):
 def get_weather(city):
     api_key = os.getenv('WEATHER_API_KEY')
     if not api_key: return None
-    base_url = "http://api.openweathermap.org/data/2.5/weather"
+    # Weather barely changes within minutes: serve repeat cities from the cache, one upstream call per city
+    return weather_cache.get_or_compute(city.strip().lower(), lambda: fetch_weather(city, api_key))
+
+def fetch_weather(city, api_key):
     params = {"q": city, "appid": api_key, "units": "metric"}
     try:
-        response = requests.get(base_url, params=params)
+        response = http_session.get(app.config['WEATHER_API_URL'], params=params, timeout=app.config['WEATHER_TIMEOUT'])
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -181,36 +614,131 @@ def get_weather(city):
 
 # --- FULL LLM OUTFIT GENERATION ---
 
-def generate_outfit_with_llm(user_prompt):
+def plan_outfit_request(user_prompt, engine):
+    """
+    Everything that happens before an outfit is picked: parse the prompt, get the weather and
+    pick the candidate clothes. Returns (early_result, None) when there is nothing to pick from,
+    otherwise (None, plan). plan['prompt'] is None when the local engine should answer.
+    """
     gemini_api_key = os.getenv('GEMINI_API_KEY')
-    if not gemini_api_key:
-        return {"outfit": None, "notes": "The Gemini API key is missing. Please add it to your .env file."}
-    
-    api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-preview-05-20:generateContent?key={gemini_api_key}"
+    use_llm = engine == 'llm' and bool(gemini_api_key)
+    if engine == 'llm' and not gemini_api_key and not app.config['LOCAL_FALLBACK']:
+        return {"outfit": None, "notes": "The Gemini API key is missing. Please add it to your .env file."}, None
 
-    parsed_info = parse_prompt(user_prompt)
+    with stage('chat.parse_prompt'):
+        parsed_info = parse_prompt(user_prompt)
     occasion, city, preferred_color = parsed_info['occasion'], parsed_info['city'], parsed_info['color']
-    weather_data = get_weather(city)
-    if not weather_data:
-        return {"outfit": None, "notes": "I couldn't get the weather right now. Please check the city name."}
-    
-    temp = weather_data['main']['temp']
-    weather_condition = weather_data['weather'][0]['main']
-    weather_info = f"{city}: {temp}°C, {weather_condition}"
-
-    all_items = ClothingItem.query.all()
-    warm_clothes = ['Sweater', 'Jacket', 'Coat']
-    cold_clothes = ['T-Shirt', 'Skirt']
-    if temp > 25: weather_appropriate_items = [item for item in all_items if item.category not in warm_clothes]
-    elif temp < 15: weather_appropriate_items = [item for item in all_items if item.category not in cold_clothes]
-    else: weather_appropriate_items = all_items
-    allowed_categories = OCCASION_RULES.get(occasion, [])
-    wardrobe = [item for item in weather_appropriate_items if item.category in allowed_categories]
+    with stage('chat.weather'):
+        weather_data = get_weather(city)
+    if weather_data:
+        temp = weather_data['main']['temp']
+        weather_condition = weather_data['weather'][0]['main']
+        weather_info, band = f"{city}: {temp}°C, {weather_condition}", temperature_band(temp)
+    elif use_llm and not app.config['LOCAL_FALLBACK']:
+        return {"outfit": None, "notes": "I couldn't get the weather right now. Please check the city name."}, None
+    else:
+        # No API key, no network or an unknown city: the local engine still answers, for in-between weather
+        weather_info, band, use_llm = city, 'mild', False
+
+    # Candidates come from this worker's in-memory snapshot, not from a scan of the clothing table
+    with stage('chat.wardrobe'):
+        snapshot = wardrobe_cache.current()
+        categories = [c for c in OCCASION_RULES.get(occasion, []) if c not in BAND_EXCLUDES[band]]
+        candidates = snapshot.in_categories(categories)
     
-    wardrobe_list_str = "\n".join([f"- Item ID {item.id}: A {item.color} {item.category}" for item in wardrobe])
-    if not wardrobe:
-        return {"outfit": None, "notes": f"I looked through your wardrobe but couldn't find enough items for a '{occasion}' outfit suitable for this weather."}
-
+    if not candidates:
+        return {"outfit": None, "notes": f"I looked through your wardrobe but couldn't find enough items for a '{occasion}' outfit suitable for this weather."}, None
+
+    plan = {"occasion": occasion, "band": band, "preferred_color": preferred_color, "weather_info": weather_info,
+            "snapshot": snapshot, "api_key": gemini_api_key, "prompt": None}
+    if use_llm and app.config['INSTANT_OUTFITS'] and precomputed_outfit(plan):
+        use_llm = False  # A precomputed outfit answers right away, without the Gemini round trip
+    if use_llm:
+        # Same context + same candidate clothes => reuse the previous answer instead of another LLM round trip.
+        # Uploading, editing or deleting a candidate item changes the wardrobe hash, so stale answers are never served.
+        with stage('chat.build_prompt'):
+            plan['cache_key'] = (occasion, (preferred_color or '').lower(), city.lower(), band, snapshot.fingerprint(categories))
+            wardrobe_list_str = "\n".join([f"- Item ID {item.id}: A {item.color} {item.category}" for item in candidates])
+            plan['prompt'] = build_stylist_prompt(user_prompt, occasion, weather_info, preferred_color, wardrobe_list_str)
+    return None, plan
+
+def precomputed_outfit(plan):
+    """The ranked outfits precomputed for the plan's slot, or None if they aren't ready for the current wardrobe."""
+    if precomputed_outfits is None: return None
+    with stage('chat.precomputed'):
+        return precomputed_outfits.lookup(plan['snapshot'], plan['occasion'], plan['band'], plan['preferred_color'])
+
+@stage('chat.local_engine')
+def local_outfit(plan):
+    """
+    Picks the outfit with the local recommender: no network round trip, answers in milliseconds.
+    The precomputed slot is used when it is up to date; otherwise the recommender runs now.
+    """
+    snapshot = plan['snapshot']
+    outfits = precomputed_outfit(plan)
+    if outfits is None:
+        outfits = snapshot.recommender.recommend(plan['occasion'], plan['band'], plan['preferred_color'], k=1)
+    if not outfits:
+        return {"outfit": None, "notes": f"I looked through your wardrobe but couldn't put together a complete '{plan['occasion']}' outfit for this weather."}
+    best = outfits[0]
+    outfit = {slot: snapshot.get(best[slot])._asdict() if best[slot] else None for slot in ('top', 'bottom', 'outerwear', 'shoes')}
+    items_by_id = {item['id']: item for item in outfit.values() if item}
+    return {"outfit": outfit, "notes": describe_outfit(best, items_by_id, plan['occasion'], plan['weather_info'])}
+
+def outfit_engine(requested=None):
+    """'llm' (Gemini, with the local engine as fallback) or 'local' (offline / instant)."""
+    return requested if requested in ('llm', 'local') else app.config['OUTFIT_ENGINE']
+
+def generate_outfit_with_llm(user_prompt, engine=None):
+    early_result, plan = plan_outfit_request(user_prompt, outfit_engine(engine))
+    if early_result: return early_result
+    if plan['prompt'] is None: return local_outfit(plan)
+    result = llm_cache.get_or_compute(plan['cache_key'], lambda: ask_llm_for_outfit(plan['api_key'], plan['prompt'], plan['snapshot']))
+    if result.get('outfit') is None and app.config['LOCAL_FALLBACK']:
+        # Gemini timed out or failed: answer from the local engine rather than with an error
+        fallback = local_outfit(plan)
+        if fallback.get('outfit'): return fallback
+    return result
+
+def stream_outfit_with_llm(user_prompt, engine=None):
+    """
+    Streaming version of generate_outfit_with_llm. Yields ('notes', text) pieces while the
+    stylist notes are being generated, then a single ('result', {"outfit": ..., "notes": ...}).
+    """
+    early_result, plan = plan_outfit_request(user_prompt, outfit_engine(engine))
+    if early_result:
+        yield 'result', early_result
+        return
+    if plan['prompt'] is None:
+        result = local_outfit(plan)
+        yield 'notes', result['notes']
+        yield 'result', result
+        return
+
+    def produce():
+        with app.app_context():
+            return (yield from stream_llm_for_outfit(plan['api_key'], plan['prompt'], plan['snapshot']))
+
+    # Identical concurrent prompts read one Gemini stream; it runs to completion even if this client goes away
+    stream, streamed = llm_cache.get_or_stream(plan['cache_key'], produce), False
+    for kind, payload in stream:
+        streamed = True
+        yield kind, payload
+    result = stream.result()
+    if result.get('outfit') is None and app.config['LOCAL_FALLBACK']:
+        fallback = local_outfit(plan)
+        if fallback.get('outfit'):
+            yield 'notes', fallback['notes']
+            result = fallback
+    elif not streamed:
+        yield 'notes', result['notes']  # Cached, or computed by a concurrent non-streaming request
+    yield 'result', result
+
+def gemini_url(method, api_key, **params):
+    query = "&".join(f"{k}={v}" for k, v in {**params, "key": api_key}.items())
+    return f"{app.config['GEMINI_API_BASE']}/models/{app.config['GEMINI_MODEL']}:{method}?{query}"
+
+def build_stylist_prompt(user_prompt, occasion, weather_info, preferred_color, wardrobe_list_str):
     prompt = f"""
     You are an expert fashion stylist. Your task is to act as a reasoning engine to select the perfect outfit from a user's available wardrobe.
     **User's Request:** "{user_prompt}"
@@ -237,41 +765,48 @@ def generate_outfit_with_llm(user_prompt):
     }}
     ```
     """
+    return prompt
+
+def parse_llm_outfit(text_response, snapshot):
+    """Pulls the JSON answer out of the LLM's text and swaps the item IDs for the items in the wardrobe snapshot."""
+    json_match = re.search(r'```json\s*(\{.*?\})\s*```', text_response, re.DOTALL)
+    if not json_match:
+        json_match = re.search(r'(\{.*?\})', text_response, re.DOTALL)
+
+    if not json_match:
+        raise ValueError("No valid JSON object found in the LLM response.")
+
+    json_string = json_match.group(1)
+    llm_response = json.loads(json_string)
+
+    outfit_ids = llm_response.get('outfit', {})
+    final_outfit_data = {}
+    for slot, item_id in outfit_ids.items():
+        if item_id:
+            item = snapshot.get(int(item_id))
+            if item:
+                final_outfit_data[slot] = item._asdict()
+            else:
+                print(f"Warning: LLM returned a non-existent item ID: {item_id}")
+                final_outfit_data[slot] = None
+        else:
+            final_outfit_data[slot] = None
+    
+    return {"outfit": final_outfit_data, "notes": llm_response.get('notes', "Here's a great look for you!")}
 
+def ask_llm_for_outfit(api_key, prompt, snapshot):
     payload = {"contents": [{"parts": [{"text": prompt}]}]}
     headers = {'Content-Type': 'application/json'}
     
     try:
-        response = requests.post(api_url, json=payload, headers=headers)
-        response.raise_for_status()
-        result = response.json()
+        with stage('chat.gemini'):
+            response = http_session.post(gemini_url('generateContent', api_key), json=payload, headers=headers, timeout=app.config['LLM_TIMEOUT'])
+            response.raise_for_status()
+            result = response.json()
         
         text_response = result['candidates'][0]['content']['parts'][0]['text']
-        
-        json_match = re.search(r'```json\s*(\{.*?\})\s*```', text_response, re.DOTALL)
-        if not json_match:
-            json_match = re.search(r'(\{.*?\})', text_response, re.DOTALL)
-
-        if not json_match:
-            raise ValueError("No valid JSON object found in the LLM response.")
-
-        json_string = json_match.group(1)
-        llm_response = json.loads(json_string)
-
-        outfit_ids = llm_response.get('outfit', {})
-        final_outfit_data = {}
-        for slot, item_id in outfit_ids.items():
-            if item_id:
-                item = ClothingItem.query.get(int(item_id))
-                if item:
-                    final_outfit_data[slot] = {"id": item.id, "filename": item.filename, "category": item.category, "color": item.color}
-                else:
-                    print(f"Warning: LLM returned a non-existent item ID: {item_id}")
-                    final_outfit_data[slot] = None
-            else:
-                final_outfit_data[slot] = None
-        
-        return {"outfit": final_outfit_data, "notes": llm_response.get('notes', "Here's a great look for you!")}
+        with stage('chat.parse_llm'):
+            return parse_llm_outfit(text_response, snapshot)
 
     except Exception as e:
         error_message = f"I encountered a technical issue. Details: {str(e)}"
@@ -280,8 +815,116 @@ def generate_outfit_with_llm(user_prompt):
             print(f"LLM Raw Response: {response.text}")
         return {"outfit": None, "notes": error_message}
 
+def stream_llm_for_outfit(api_key, prompt, snapshot):
+    """Generator: asks Gemini's streaming endpoint, yields ('notes', text) deltas and returns the parsed result."""
+    payload = {"contents": [{"parts": [{"text": prompt}]}]}
+    headers = {'Content-Type': 'application/json'}
+    notes = NotesStreamExtractor()
+    text_response = ""
+
+    try:
+        # Includes the time the client takes to receive the streamed notes
+        with stage('chat.gemini'), http_session.post(gemini_url('streamGenerateContent', api_key, alt='sse'), json=payload, headers=headers,
+                                                     timeout=app.config['LLM_TIMEOUT'], stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'): continue
+                chunk = json.loads(line[len('data:'):])
+                parts = chunk.get('candidates', [{}])[0].get('content', {}).get('parts', [])
+                text = "".join(part.get('text', '') for part in parts)
+                text_response += text
+                delta = notes.feed(text)
+                if delta: yield 'notes', delta
+        with stage('chat.parse_llm'):
+            return parse_llm_outfit(text_response, snapshot)
+
+    except Exception as e:
+        print(f"Error processing streamed LLM response: {e}")
+        if text_response:
+            print(f"LLM Raw Response: {text_response}")
+        return {"outfit": None, "notes": f"I encountered a technical issue. Details: {str(e)}"}
+
+class NotesStreamExtractor:
+    """Incrementally decodes the "notes" string of a JSON answer that is still being streamed."""
+
+    NOTES_START = re.compile(r'"notes"\s*:\s*"')
+
+    def __init__(self):
+        self.text = ""
+        self.emitted = 0
+
+    def feed(self, chunk):
+        """Adds the next piece of LLM output and returns the newly available part of the notes."""
+        self.text += chunk
+        match = self.NOTES_START.search(self.text)
+        if not match: return ""
+        raw = self.text[match.end():]
+        i, closed = 0, False
+        while i < len(raw):
+            if raw[i] == '\\': i += 2
+            elif raw[i] == '"': closed = True; break
+            else: i += 1
+        body = raw[:i] if closed else raw
+        # An escape sequence may be cut off at the end of the chunk; decode what is complete
+        for trim in range(0, 7 if not closed else 1):
+            try:
+                decoded = json.loads('"' + body[:len(body) - trim] + '"')
+                break
+            except ValueError:
+                continue
+        else:
+            return ""
+        delta = decoded[self.emitted:]
+        self.emitted = max(self.emitted, len(decoded))
+        return delta
+
+# --- CLI COMMANDS ---
+
+@app.cli.command('index-embeddings')
+def index_embeddings_command():
+    """Adds every clothing item that is missing from the similarity index."""
+    missing = [item for item in ClothingItem.query.order_by(ClothingItem.id) if embedding_index.get(item.id) is None]
+    print(f"Indexing {len(missing)} item(s)...")
+    for start in range(0, len(missing), 64):
+        batch = missing[start:start + 64]
+        results = analyze_images([os.path.join(app.config['UPLOAD_FOLDER'], item.filename) for item in batch])
+        embedded = [(item.id, embedding) for item, (_, embedding) in zip(batch, results) if embedding is not None]
+        if embedded: embedding_index.add_many([item_id for item_id, _ in embedded], [embedding for _, embedding in embedded])
+    print(f"✅ The similarity index now holds {len(embedding_index)} item(s).")
+
+@app.cli.command('backfill-colors')
+@click.option('--all', 'recompute_all', is_flag=True, help="Also recompute items that already have a color vector.")
+def backfill_colors_command(recompute_all):
+    """Extracts the dominant color of items uploaded before color extraction; unnamed items get its name too."""
+    query = db.session.query(ClothingItem.id, ClothingItem.filename, ClothingItem.color)
+    if not recompute_all: query = query.filter(ClothingItem.color_lab.is_(None))
+    by_file = {}
+    for item_id, filename, color in query.order_by(ClothingItem.id):
+        by_file.setdefault(filename, []).append((item_id, color))  # Items with the same image share one extraction
+    print(f"Extracting colors of {len(by_file)} image(s)...")
+
+    updates, updated = [], 0
+    for done, (filename, items) in enumerate(by_file.items(), 1):
+        extracted = dominant_color(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+        if extracted is not None:
+            for item_id, color in items:
+                unnamed = color in (None, '', 'Default Color')
+                updates.append({"id": item_id, "color_lab": extracted.lab, "color": (color_label(extracted) or color) if unnamed else color})
+        if updates and (len(updates) >= 500 or done == len(by_file)):
+            db.session.execute(update(ClothingItem), updates)
+            wardrobe.bump_version()
+            db.session.commit()
+            updated += len(updates)
+            updates = []
+            print(f"  {done}/{len(by_file)} images")
+    print(f"✅ Stored the dominant color of {updated} item(s).")
+
+@app.cli.command('db-upgrade')
+def db_upgrade_command():
+    """Creates missing tables and applies pending schema migrations."""
+    applied = migrations.upgrade()
+    print(f"✅ Database is at schema version {migrations.current_version()} ({len(applied)} migration(s) applied).")
+
 # --- Main Execution ---
 if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
     app.run(debug=True)
@@ -0,0 +1,117 @@
+# backend/benchmarks/bench_chat.py
+"""
+Measures POST /chats/<id>/messages latency on synthetic wardrobes, against local
+weather and Gemini stubs (no upstream latency, so only our own work is timed).
+'instant' is llm mode with INSTANT_OUTFITS, answered from the precomputed outfit slots;
+"precompute" times computing every slot, and the incremental refresh after one upload.
+Run from the backend folder:  python -m benchmarks.bench_chat [--sizes 1000 50000]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.stubs import weather_stub, gemini_stub
+
+# --- Configuration ---
+DEFAULT_SIZES = [1_000, 50_000]
+REQUESTS = 30
+COLORS = ['Black', 'White', 'Red', 'Blue', 'Green', 'Pink', 'Grey', 'Beige', 'Navy']
+PROMPTS = ['casual outfit in Paris', 'something for work in London', 'date night look in Mumbai', 'formal dinner in New Delhi']
+
+
+def percentiles(latencies):
+    return {"p50_ms": round(float(np.percentile(latencies, 50)), 2), "p95_ms": round(float(np.percentile(latencies, 95)), 2)}
+
+
+def fill_wardrobe(db, ClothingItem, wardrobe, size, rng):
+    from fashion_logic import CLOTHING_TYPES
+    categories = [c for group in CLOTHING_TYPES.values() for c in group]
+    db.session.query(ClothingItem).delete()
+    db.session.bulk_insert_mappings(ClothingItem, [
+        {"filename": f"{i}.jpg", "category": rng.choice(categories), "color": rng.choice(COLORS)} for i in range(size)])
+    wardrobe.bump_version()
+    db.session.commit()
+
+
+def bench_precompute(app, db, ClothingItem, wardrobe, precomputed_outfits):
+    with app.app_context():
+        started = time.perf_counter()
+        precomputed_outfits.refresh()
+        full_ms = (time.perf_counter() - started) * 1000
+        db.session.add(ClothingItem(filename="new.jpg", category='Heels', color='Black'))
+        wardrobe.bump_version()
+        db.session.commit()
+        started = time.perf_counter()
+        recomputed = precomputed_outfits.refresh()
+        return {"full_ms": round(full_ms, 2), "incremental_ms": round((time.perf_counter() - started) * 1000, 2), "groups_recomputed": recomputed}
+
+
+def bench_size(size, client, session_id, rng):
+    from app import app, db, ClothingItem, wardrobe, wardrobe_cache, precomputed_outfits
+    with app.app_context():
+        fill_wardrobe(db, ClothingItem, wardrobe, size, rng)
+
+    results = {"items": size}
+    if precomputed_outfits:
+        results["precompute"] = bench_precompute(app, db, ClothingItem, wardrobe, precomputed_outfits)
+    for mode in ('local', 'llm', 'instant'):
+        if mode == 'instant':
+            if not precomputed_outfits: continue
+            with app.app_context(): precomputed_outfits.refresh()
+        app.config['INSTANT_OUTFITS'] = mode == 'instant'
+        engine = 'llm' if mode == 'instant' else mode
+        # The first request after a change rebuilds the snapshot; the rest only check its version
+        started = time.perf_counter()
+        client.post(f'/chats/{session_id}/messages?mode={engine}', json={"prompt": PROMPTS[0]})
+        first_ms = (time.perf_counter() - started) * 1000
+        latencies = []
+        for i in range(REQUESTS):
+            started = time.perf_counter()
+            response = client.post(f'/chats/{session_id}/messages?mode={engine}', json={"prompt": PROMPTS[i % len(PROMPTS)]})
+            latencies.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 201 and response.json['outfit_data'], response.json
+        results[mode] = {"first_ms": round(first_ms, 2), **percentiles(latencies)}
+        with app.app_context():
+            wardrobe.bump_version()  # Make the next mode pay for its own snapshot rebuild
+            db.session.commit()
+    results["snapshot_reloads"] = wardrobe_cache.reloads
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    args = parser.parse_args()
+
+    with weather_stub(latency=0) as weather, gemini_stub(latency=0) as gemini:
+        os.environ.update({
+            'WEATHER_API_URL': f"{weather.url}/data/2.5/weather",
+            'WEATHER_API_KEY': 'stub',
+            'GEMINI_API_BASE': gemini.url,
+            'GEMINI_API_KEY': 'stub',
+            'LLM_CACHE_SIZE': '0',  # Time the full path on every request, not cache hits
+            'MODEL_PRELOAD': 'false',
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tempfile.mkdtemp()}/bench.db",
+        })
+        from app import app, db, ChatSession
+        with app.app_context():
+            db.create_all()
+            session = ChatSession()
+            db.session.add(session)
+            db.session.commit()
+            session_id = session.id
+
+        client = app.test_client()
+        rng = random.Random(0)
+        print(f"{REQUESTS} chat messages per mode and wardrobe size")
+        for size in args.sizes:
+            print(bench_size(size, client, session_id, rng))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+# backend/benchmarks/bench_db_concurrency.py
+"""
+Write throughput of a SQLite database under concurrent uploads, chat writes and wardrobe
+reads from several processes (like gunicorn workers), with the default connection settings
+and with DB_PROFILE=production (WAL, synchronous=NORMAL, busy timeout, mmap).
+Run from the backend folder:  python -m benchmarks.bench_db_concurrency [--writers 4 --readers 4 --seconds 5]
+"""
+
+import argparse
+import multiprocessing
+import tempfile
+import time
+
+import numpy as np
+
+# --- Configuration ---
+CATEGORIES = ['T-Shirt', 'Jeans', 'Dress', 'Jacket', 'Sneakers']
+
+
+def make_app(uri, profile):
+    from flask import Flask
+    from config import Config
+    from models.database import init_db
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config.update(SQLALCHEMY_DATABASE_URI=uri, DB_PROFILE=profile)
+    init_db(app)
+    return app
+
+
+def writer(uri, profile, seconds, worker_id, ready, start, results):
+    """Alternates an upload-like write (item + wardrobe version bump) with a chat message write."""
+    from sqlalchemy.exc import OperationalError
+    app = make_app(uri, profile)
+    from models.database import db, ClothingItem, ChatMessage
+    import wardrobe
+    latencies, errors = [], 0
+    with app.app_context():
+        db.session.execute(db.select(1))  # Connect (and run the profile's pragmas) now
+        ready.put(worker_id)
+        start.wait()
+        deadline, i = time.perf_counter() + seconds, 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                if i % 2 == 0:
+                    db.session.add(ClothingItem(filename=f"{worker_id}-{i}.jpg", category=CATEGORIES[i % len(CATEGORIES)], color='Black'))
+                    wardrobe.bump_version()
+                else:
+                    db.session.add(ChatMessage(session_id=1, role='user', content=f"message {i} from {worker_id}"))
+                db.session.commit()
+                latencies.append((time.perf_counter() - started) * 1000)
+            except OperationalError:  # "database is locked"
+                db.session.rollback()
+                errors += 1
+            i += 1
+    results.put({"kind": "writer", "latencies": latencies, "errors": errors})
+
+
+def reader(uri, profile, seconds, worker_id, ready, start, results):
+    """Reads what /clothes and the wardrobe snapshot read: the version and a filtered page of items."""
+    from sqlalchemy.exc import OperationalError
+    app = make_app(uri, profile)
+    from models.database import db, ClothingItem
+    import wardrobe
+    latencies, errors = [], 0
+    with app.app_context():
+        db.session.execute(db.select(1))  # Connect (and run the profile's pragmas) now
+        ready.put(worker_id)
+        start.wait()
+        deadline, i = time.perf_counter() + seconds, 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                wardrobe.current_version()
+                ClothingItem.query.filter(ClothingItem.category == CATEGORIES[i % len(CATEGORIES)]).order_by(ClothingItem.id).limit(50).all()
+                db.session.commit()
+                latencies.append((time.perf_counter() - started) * 1000)
+            except OperationalError:
+                db.session.rollback()
+                errors += 1
+            i += 1
+    results.put({"kind": "reader", "latencies": latencies, "errors": errors})
+
+
+def run(profile, writers, readers, seconds):
+    uri = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    app = make_app(uri, profile)
+    from models.database import db, ChatSession
+    with app.app_context():
+        db.session.add(ChatSession(id=1))
+        db.session.commit()
+        db.engine.dispose()
+
+    context = multiprocessing.get_context('spawn')
+    ready, start, results = context.Queue(), context.Event(), context.Queue()
+    processes = [context.Process(target=writer, args=(uri, profile, seconds, n, ready, start, results)) for n in range(writers)]
+    processes += [context.Process(target=reader, args=(uri, profile, seconds, n, ready, start, results)) for n in range(readers)]
+    for process in processes: process.start()
+    for _ in processes: ready.get()  # Imports and connection setup happen before the clock starts
+    start.set()
+    reports = [results.get() for _ in processes]
+    for process in processes: process.join()
+
+    summary = {"profile": profile}
+    for kind in ('writer', 'reader'):
+        latencies = [latency for report in reports if report['kind'] == kind for latency in report['latencies']]
+        summary[f"{kind}s"] = {
+            "per_sec": round(len(latencies) / seconds, 1),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 2) if latencies else None,
+            "p95_ms": round(float(np.percentile(latencies, 95)), 2) if latencies else None,
+            "errors": sum(report['errors'] for report in reports if report['kind'] == kind),
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+    print(f"{args.writers} writer and {args.readers} reader processes for {args.seconds:g}s per profile")
+    for profile in ('development', 'production'):
+        print(run(profile, args.writers, args.readers, args.seconds))
+
+
+if __name__ == '__main__':
+    main()
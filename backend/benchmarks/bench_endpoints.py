@@ -0,0 +1,162 @@
+# backend/benchmarks/bench_endpoints.py
+"""
+Load test of the HTTP endpoints: the app is served by a threaded local server against a
+temporary database seeded with a synthetic wardrobe, with local stubs standing in for
+OpenWeatherMap and Gemini (each with a configurable latency). Every endpoint gets a short
+sequential warm-up (thumbnails get rendered, the wardrobe snapshot and the weather cache
+filled), then `--requests` requests from `--concurrency` threads.
+Reports p50/p95/p99 latency, throughput and errors per endpoint.
+Run from the backend folder:  python -m benchmarks.bench_endpoints [--items 1000 --concurrency 8 --output results.json]
+"""
+
+import argparse
+import io
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+from PIL import Image
+
+from benchmarks.bench_chat import fill_wardrobe, PROMPTS
+from benchmarks.report import latency_summary, save_results, compare
+from benchmarks.stubs import weather_stub, gemini_stub
+
+# --- Configuration ---
+DEFAULT_ITEMS = 1_000
+DEFAULT_REQUESTS = 200
+DEFAULT_CONCURRENCY = 8
+WARMUP = 10
+IMAGE_FILES = 16  # Seeded items with a real image behind them, for /thumbnails
+THUMBNAIL_REQUESTS = [(128, 'webp'), (256, 'webp'), (512, 'jpeg')]
+
+
+def make_jpeg(rng, size=256):
+    """A small noisy JPEG; every call gives different bytes, so uploads aren't deduplicated."""
+    buffer = io.BytesIO()
+    Image.fromarray(rng.integers(0, 256, (size, size, 3), dtype=np.uint8)).save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def endpoint_calls(session_id, categories, uploads):
+    """name -> call(http, base_url, i) issuing the i-th request to that endpoint."""
+    return {
+        'clothes_page': lambda http, base, i: http.get(f"{base}/clothes", params={"limit": 50, "category": categories[i % len(categories)]}),
+        'clothes_all': lambda http, base, i: http.get(f"{base}/clothes", params={"fields": "id,category,color"}),
+        'thumbnail': lambda http, base, i: http.get(f"{base}/thumbnails/{THUMBNAIL_REQUESTS[i % len(THUMBNAIL_REQUESTS)][0]}/{i % IMAGE_FILES}.jpg",
+                                                    params={"format": THUMBNAIL_REQUESTS[i % len(THUMBNAIL_REQUESTS)][1]}),
+        'chat_messages': lambda http, base, i: http.get(f"{base}/chats/{session_id}/messages", params={"limit": 20}),
+        'chat_local': lambda http, base, i: http.post(f"{base}/chats/{session_id}/messages?mode=local", json={"prompt": PROMPTS[i % len(PROMPTS)]}),
+        'chat_llm': lambda http, base, i: http.post(f"{base}/chats/{session_id}/messages?mode=llm", json={"prompt": PROMPTS[i % len(PROMPTS)]}),
+        'upload': lambda http, base, i: http.post(f"{base}/upload?async=false", files={"image": (f"upload-{i}.jpg", uploads[i], 'image/jpeg')}),
+    }
+
+
+def run_endpoint(call, base, requests_count, concurrency):
+    local = threading.local()
+
+    def one(i):
+        http = getattr(local, 'http', None)
+        if http is None: http = local.http = requests.Session()
+        started = time.perf_counter()
+        response = call(http, base, i)
+        response.content  # Streamed responses are timed to their last byte
+        return (time.perf_counter() - started) * 1000, response.status_code < 400
+
+    for i in range(WARMUP):
+        one(requests_count + i)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        outcomes = list(pool.map(one, range(requests_count)))
+    seconds = time.perf_counter() - started
+    return {**latency_summary([latency for latency, ok in outcomes if ok], seconds), "errors": sum(not ok for _, ok in outcomes)}
+
+
+def seed(items, rng):
+    """Wardrobe of `items` clothes (the first IMAGE_FILES with real images) and one chat with some history."""
+    from app import app, db, ClothingItem, ChatSession, ChatMessage, wardrobe
+    with app.app_context():
+        db.create_all()
+        fill_wardrobe(db, ClothingItem, wardrobe, items, random.Random(0))
+        session = ChatSession(title="Benchmark")
+        db.session.add(session)
+        db.session.flush()
+        db.session.add_all([ChatMessage(session_id=session.id, role='user' if n % 2 == 0 else 'ai', content=f"message {n}") for n in range(40)])
+        db.session.commit()
+        session_id = session.id
+    for i in range(IMAGE_FILES):
+        with open(os.path.join(app.config['UPLOAD_FOLDER'], f"{i}.jpg"), 'wb') as f:
+            f.write(make_jpeg(rng, 640))
+    return session_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=DEFAULT_ITEMS, help="Size of the synthetic wardrobe")
+    parser.add_argument('--requests', type=int, default=DEFAULT_REQUESTS, help="Timed requests per endpoint")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--weather-latency', type=float, default=0.05, help="Seconds per weather stub call")
+    parser.add_argument('--gemini-latency', type=float, default=0.5, help="Seconds per Gemini stub call")
+    parser.add_argument('--llm-cache', action='store_true', help="Keep the LLM answer cache on (off by default, so chat_llm always calls Gemini)")
+    parser.add_argument('--db-profile', choices=['development', 'production'], default=os.getenv('DB_PROFILE', 'development'))
+    parser.add_argument('--endpoints', nargs='+', help="Subset of endpoints to run (default: all)")
+    parser.add_argument('--output', help="Save the results as JSON")
+    parser.add_argument('--compare', help="JSON results of an earlier run to compare with")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='endpoint-bench-')
+    with weather_stub(latency=args.weather_latency) as weather, gemini_stub(latency=args.gemini_latency) as gemini:
+        os.environ.update({
+            'WEATHER_API_URL': f"{weather.url}/data/2.5/weather",
+            'WEATHER_API_KEY': 'stub',
+            'GEMINI_API_BASE': gemini.url,
+            'GEMINI_API_KEY': 'stub',
+            'MODEL_PRELOAD': 'false',
+            'DB_PROFILE': args.db_profile,
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{workdir}/bench.db",
+            'UPLOAD_FOLDER': os.path.join(workdir, 'uploads'),
+            'THUMBNAIL_FOLDER': os.path.join(workdir, 'thumbnails'),
+            'EMBEDDING_INDEX_FOLDER': os.path.join(workdir, 'embeddings'),
+        })
+        if not args.llm_cache: os.environ['LLM_CACHE_SIZE'] = '0'
+        from app import app
+        from fashion_logic import CLOTHING_TYPES
+        from werkzeug.serving import make_server, WSGIRequestHandler
+
+        rng = np.random.default_rng(0)
+        session_id = seed(args.items, rng)
+        uploads = [make_jpeg(rng) for _ in range(args.requests + WARMUP)]
+        categories = [c for group in CLOTHING_TYPES.values() for c in group]
+        calls = endpoint_calls(session_id, categories, uploads)
+        names = args.endpoints or list(calls)
+        unknown = set(names) - set(calls)
+        if unknown: parser.error(f"unknown endpoints {sorted(unknown)}; choose from {list(calls)}")
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs): pass  # Keep benchmark output clean
+
+        server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_port}"
+        print(f"{args.items} items, {args.requests} requests per endpoint from {args.concurrency} threads, "
+              f"stub latency weather {args.weather_latency:g}s / Gemini {args.gemini_latency:g}s")
+        results = {}
+        try:
+            for name in names:
+                results[name] = run_endpoint(calls[name], base, args.requests, args.concurrency)
+                print(f"{name:>14}: {results[name]}")
+        finally:
+            server.shutdown()
+
+    if args.output:
+        save_results(args.output, 'endpoints', {k: v for k, v in vars(args).items() if k not in ('output', 'compare')}, results)
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+# backend/benchmarks/bench_inference_server.py
+"""
+Load test of classification with N web worker processes, each classifying one image per
+request like a sync gunicorn worker: every worker loading its own model (in-process) against
+all of them sharing inference_server.py over its Unix socket. Reports throughput, latency
+and the peak resident memory of all processes together. Needs the trained model files.
+Run from the backend folder:  python -m benchmarks.bench_inference_server [--workers 1 4 8 --requests 200]
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# --- Configuration ---
+DEFAULT_WORKERS = [1, 4, 8]
+REQUESTS_PER_WORKER = 200
+SERVER_START_TIMEOUT = 120  # Seconds for the server to load the model and listen
+
+
+def worker(requests, ready, start, results):
+    """One web worker: warms up (model load or server connection), then classifies `requests` single images."""
+    import ml_model
+    rng = np.random.default_rng(os.getpid())
+    images = [rng.integers(0, 256, (*ml_model.IMAGE_SIZE, 3), dtype=np.uint8) for _ in range(8)]
+    ml_model.analyze_images(images[:1])
+    ready.put(os.getpid())
+    start.wait()
+    latencies, started = [], time.perf_counter()
+    for i in range(requests):
+        request_started = time.perf_counter()
+        ml_model.analyze_images([images[i % len(images)]])
+        latencies.append((time.perf_counter() - request_started) * 1000)
+    results.put({"seconds": time.perf_counter() - started, "latencies": latencies,
+                 "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024})
+
+
+def peak_rss_mb(pid):
+    """Peak resident memory of another process (Linux)."""
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith('VmHWM:'): return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def start_server(socket_path):
+    from inference_server import InferenceClient
+    server = subprocess.Popen([sys.executable, 'inference_server.py', '--socket', socket_path])
+    client, deadline = InferenceClient(socket_path, retry_after=0), time.monotonic() + SERVER_START_TIMEOUT
+    while not (os.path.exists(socket_path) and client.ping()):
+        if server.poll() is not None or time.monotonic() > deadline:
+            server.kill()
+            raise RuntimeError("The inference server did not start")
+        time.sleep(0.2)
+    return server
+
+
+def run(mode, workers, requests, socket_path):
+    if mode == 'server':
+        os.environ['INFERENCE_SOCKET'] = socket_path
+        server = start_server(socket_path)
+    else:
+        os.environ.pop('INFERENCE_SOCKET', None)
+        server = None
+    context = multiprocessing.get_context('spawn')
+    ready, start, results = context.Queue(), context.Event(), context.Queue()
+    processes = [context.Process(target=worker, args=(requests, ready, start, results)) for _ in range(workers)]
+    try:
+        for process in processes: process.start()
+        for _ in processes: ready.get()  # Model loads and connections happen before the clock starts
+        start.set()
+        reports = [results.get() for _ in processes]
+        server_rss = peak_rss_mb(server.pid) if server else 0.0
+    finally:
+        for process in processes: process.join()
+        if server:
+            server.terminate()
+            server.wait()
+
+    latencies = np.concatenate([report['latencies'] for report in reports])
+    worker_rss = sum(report['rss_mb'] for report in reports)
+    return {
+        "mode": mode, "workers": workers,
+        "images_per_sec": round(workers * requests / max(report['seconds'] for report in reports), 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2), "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "rss_total_mb": round(worker_rss + server_rss), "rss_per_worker_mb": round(worker_rss / workers), "rss_server_mb": round(server_rss),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=DEFAULT_WORKERS)
+    parser.add_argument('--requests', type=int, default=REQUESTS_PER_WORKER, help="Classifications per worker")
+    parser.add_argument('--modes', nargs='+', choices=['inprocess', 'server'], default=['inprocess', 'server'])
+    args = parser.parse_args()
+
+    os.environ['MODEL_PRELOAD'] = 'false'
+    socket_path = os.path.join(tempfile.mkdtemp(), 'inference.sock')
+    print(f"{args.requests} single-image requests per worker")
+    for workers in args.workers:
+        for mode in args.modes:
+            print(run(mode, workers, args.requests, socket_path))
+
+
+if __name__ == '__main__':
+    main()
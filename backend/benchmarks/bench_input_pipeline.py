@@ -0,0 +1,91 @@
+# backend/benchmarks/bench_input_pipeline.py
+"""
+Compares training input throughput (images/sec) of the ImageDataGenerator pipeline and the
+tf.data pipeline in input_pipeline.py, including the first (cache-filling) and later epochs.
+No model is run: this measures how fast each pipeline can feed one.
+Run from the backend folder:  python -m benchmarks.bench_input_pipeline [--dataset-dir dataset | --synthetic 2000]
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+# --- Configuration ---
+BATCH_SIZE = 32
+EPOCHS = 3
+SYNTHETIC_CLASSES = 8
+
+
+def make_synthetic_dataset(directory, count, rng):
+    """Writes `count` random 600x800 JPEGs (about the size of the fashion dataset's photos) into class folders."""
+    for i in range(count):
+        class_dir = os.path.join(directory, f"class_{i % SYNTHETIC_CLASSES}")
+        os.makedirs(class_dir, exist_ok=True)
+        pixels = rng.integers(0, 256, (80, 60, 3), dtype=np.uint8)
+        Image.fromarray(pixels).resize((600, 800)).save(os.path.join(class_dir, f"{i}.jpg"), quality=90)
+
+
+def measure(batches, epochs, steps_per_epoch=None):
+    """
+    Pulls `steps_per_epoch` batches per epoch (the whole dataset when None: a tf.data disk cache
+    is only finalized once an epoch is read to the end). Returns images/sec for each epoch.
+    """
+    rates = []
+    for _ in range(epochs):
+        images, started = 0, time.perf_counter()
+        iterator = iter(batches())
+        for _ in range(steps_per_epoch) if steps_per_epoch else iter(int, 1):
+            try:
+                x, _ = next(iterator)
+            except StopIteration:
+                break
+            images += len(x)
+        rates.append(round(images / (time.perf_counter() - started), 1))
+    return rates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--dataset-dir', default='dataset')
+    parser.add_argument('--synthetic', type=int, default=0, help="Benchmark on N generated images instead of --dataset-dir")
+    parser.add_argument('--epochs', type=int, default=EPOCHS)
+    args = parser.parse_args()
+
+    from tensorflow.keras.preprocessing.image import ImageDataGenerator
+    import input_pipeline
+    import train_model
+    from image_preprocessing import preprocess_input
+
+    workdir = tempfile.mkdtemp(prefix='input-bench-')
+    try:
+        dataset_dir = args.dataset_dir
+        if args.synthetic:
+            dataset_dir = os.path.join(workdir, 'dataset')
+            make_synthetic_dataset(dataset_dir, args.synthetic, np.random.default_rng(0))
+
+        paths, labels, _ = input_pipeline.list_dataset(dataset_dir)
+        train_indices, _ = input_pipeline.split_dataset(paths, labels)
+        steps = len(train_indices) // BATCH_SIZE
+        print(f"{len(train_indices)} training images, {steps} batches of {BATCH_SIZE} per epoch, {args.epochs} epochs")
+
+        datagen = ImageDataGenerator(preprocessing_function=preprocess_input, validation_split=input_pipeline.VALIDATION_SPLIT, **train_model.AUGMENTATION)
+        generator = datagen.flow_from_directory(dataset_dir, target_size=input_pipeline.IMAGE_SIZE, batch_size=BATCH_SIZE,
+                                                class_mode='categorical', subset='training', seed=input_pipeline.SEED)
+        print("ImageDataGenerator        images/sec per epoch:", measure(lambda: generator, args.epochs, steps))
+
+        train_ds, _, _ = input_pipeline.make_datasets(dataset_dir, BATCH_SIZE, cache_dir=os.path.join(workdir, 'cache'))
+        print("tf.data (disk cache)      images/sec per epoch:", measure(lambda: train_ds, args.epochs))
+
+        train_ds, _, _ = input_pipeline.make_datasets(dataset_dir, BATCH_SIZE, cache_dir='')
+        print("tf.data (no cache)        images/sec per epoch:", measure(lambda: train_ds, args.epochs))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+# backend/benchmarks/bench_micro.py
+"""
+Micro-benchmarks of the hot functions behind the endpoints, without HTTP in the way:
+prompt parsing, wardrobe filtering (snapshot, candidate lookup, recommender, the /clothes
+SQL filter) on synthetic wardrobes, and the image preprocessing of one upload.
+Latencies are per call, in microseconds.
+Run from the backend folder:  python -m benchmarks.bench_micro [--sizes 1000 50000 --output micro.json --compare earlier.json]
+"""
+
+import argparse
+import io
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_chat import fill_wardrobe, PROMPTS
+from benchmarks.bench_preprocessing import make_photo
+from benchmarks.report import latency_summary, save_results, compare
+
+# --- Configuration ---
+DEFAULT_SIZES = [1_000, 50_000]
+SAMPLES = 30
+LONG_PROMPT = "I need a formal outfit for an evening dinner with my team, preferably something in navy or black, in New Delhi"
+
+
+def measure(fn, number=1, samples=SAMPLES):
+    """Times `samples` runs of `number` calls each. Returns the per-call summary in microseconds."""
+    latencies = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        latencies.append((time.perf_counter() - started) * 1e6 / number)
+    return latency_summary(latencies, unit='us')
+
+
+def bench_prompts(results):
+    from app import parse_prompt
+    prompts = PROMPTS + [LONG_PROMPT]
+    for n, prompt in enumerate(prompts):
+        results[f"parse_prompt[{n}]"] = measure(lambda: parse_prompt(prompt), number=2000)
+
+
+def bench_wardrobe(results, size):
+    from app import app, db, ClothingItem, wardrobe
+    from fashion_logic import OCCASION_RULES, BAND_EXCLUDES, OutfitRecommender
+    from wardrobe import WardrobeSnapshot, WardrobeItem
+    with app.app_context():
+        fill_wardrobe(db, ClothingItem, wardrobe, size, random.Random(0))
+        rows = db.session.query(ClothingItem.id, ClothingItem.filename, ClothingItem.category, ClothingItem.color).all()
+        items = [WardrobeItem(*row) for row in rows]
+        snapshot = WardrobeSnapshot(1, items)
+        categories = [c for c in OCCASION_RULES['Casual'] if c not in BAND_EXCLUDES['mild']]
+        recommender = snapshot.recommender
+
+        results[f"snapshot_build[{size}]"] = measure(lambda: WardrobeSnapshot(1, items), samples=10)
+        results[f"in_categories[{size}]"] = measure(lambda: snapshot.in_categories(categories), samples=SAMPLES)
+        results[f"fingerprint_cold[{size}]"] = measure(lambda: WardrobeSnapshot(1, items).fingerprint(categories), samples=10)
+        results[f"recommender_build[{size}]"] = measure(lambda: OutfitRecommender(items), samples=10)
+        results[f"recommend[{size}]"] = measure(lambda: recommender.recommend('Casual', 'mild', 'Blue', k=1), number=20)
+        page = (db.session.query(ClothingItem.id, ClothingItem.category, ClothingItem.color)
+                .filter(ClothingItem.category.in_(['Jeans', 'Skirt']), ClothingItem.color.in_(['Blue', 'Black']))
+                .order_by(ClothingItem.id).limit(50))
+        results[f"clothes_filter_sql[{size}]"] = measure(lambda: page.all(), number=10)
+
+
+def bench_image(results, rng):
+    from color_extraction import dominant_color
+    from image_preprocessing import DecodedImage
+    from image_store import perceptual_hash
+    import thumbnails
+    data = make_photo(3024, 4032, rng)
+    decoded = DecodedImage.open(io.BytesIO(data))
+    target = os.path.join(tempfile.mkdtemp(), 'thumb.webp')
+
+    results["image_decode_12mp"] = measure(lambda: DecodedImage.open(io.BytesIO(data)), samples=15)
+    results["image_model_pixels"] = measure(lambda: DecodedImage(decoded.image, decoded.original_size).model_pixels(), samples=15)
+    results["image_perceptual_hash"] = measure(lambda: perceptual_hash(decoded), samples=15)
+    results["image_dominant_color"] = measure(lambda: dominant_color(decoded), samples=15)
+    results["image_thumbnail_256_webp"] = measure(lambda: thumbnails.make_derivative(decoded, target, 256, 'webp'), samples=15)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Synthetic wardrobe sizes")
+    parser.add_argument('--output', help="Save the results as JSON")
+    parser.add_argument('--compare', help="JSON results of an earlier run to compare with")
+    args = parser.parse_args()
+
+    os.environ.update({
+        'MODEL_PRELOAD': 'false',
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tempfile.mkdtemp()}/bench.db",
+    })
+    from app import app, db
+    with app.app_context():
+        db.create_all()
+
+    results = {}
+    bench_prompts(results)
+    for size in args.sizes:
+        bench_wardrobe(results, size)
+    bench_image(results, np.random.default_rng(0))
+    for name, summary in results.items():
+        print(f"{name:>28}: p50 {summary['p50_us']:>10.1f} us   p95 {summary['p95_us']:>10.1f} us   p99 {summary['p99_us']:>10.1f} us")
+
+    if args.output:
+        save_results(args.output, 'micro', {"sizes": args.sizes}, results)
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+# backend/benchmarks/bench_preprocessing.py
+"""
+Per-stage time and memory of preparing one upload: the old path (a full decode for the
+classifier, another for the perceptual hash and one per thumbnail, plus float copies of the
+model input) against image_preprocessing's single draft-mode decode shared by all of them
+and by dominant-color extraction, which only the new path has.
+"alloc KB" is the peak NumPy/Python allocation of a stage (tracemalloc); "pixels KB" is the
+size of the RGB image(s) Pillow decoded, which tracemalloc can't see.
+Run from the backend folder:  python -m benchmarks.bench_preprocessing [--width 3024 --height 4032]
+"""
+
+import argparse
+import io
+import statistics
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from color_extraction import dominant_color
+from image_preprocessing import DecodedImage, MODEL_INPUT_SIZE
+from image_store import perceptual_hash
+import thumbnails
+
+# --- Configuration ---
+REPEATS = 15
+
+
+def make_photo(width, height, rng):
+    """A phone-sized JPEG with smooth shading plus noise, so it compresses like a real photo."""
+    y, x = np.mgrid[0:height:8, 0:width:8]
+    base = np.stack([x * 255 // width, y * 255 // height, (x + y) * 255 // (width + height)], axis=-1).astype(np.uint8)
+    base = np.clip(base.astype(np.int16) + rng.integers(-20, 20, base.shape), 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(base).resize((width, height), Image.BILINEAR).save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def measure(stage):
+    """Runs `stage` REPEATS times. Returns (its last result, median ms, peak traced KB)."""
+    times = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        result = stage()
+        times.append((time.perf_counter() - started) * 1000)
+    tracemalloc.start()
+    stage()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, statistics.median(times), peak / 1024
+
+
+def pixel_kb(image):
+    return image.width * image.height * len(image.getbands()) / 1024
+
+
+# --- The previous pipeline: every consumer decodes the file itself ---
+
+def old_model_input(data):
+    with Image.open(io.BytesIO(data)) as img:
+        img = img.convert('RGB')  # Full-resolution decode (keras load_img)
+        small = img.resize(MODEL_INPUT_SIZE, Image.NEAREST)
+    array = np.asarray(small, dtype=np.float32)  # img_to_array
+    batch = np.stack([np.expand_dims(array, 0)[0]])  # expand_dims + stacking into the batch
+    return batch / 127.5 - 1.0, img  # preprocess_input returns a new array
+
+
+def old_thumbnails(data):
+    """Returns the KB of pixels decoded for all the derivatives."""
+    decoded_kb = 0
+    for size in thumbnails.SIZES:
+        for _ in thumbnails.FORMATS:
+            with Image.open(io.BytesIO(data)) as img:
+                img.draft('RGB', (size, size))
+                img = ImageOps.exif_transpose(img).convert('RGB')
+                decoded_kb += pixel_kb(img)
+                img.thumbnail((size, size), Image.LANCZOS)
+    return decoded_kb
+
+
+# --- The shared single decode ---
+
+def new_model_input(image):
+    batch = np.empty((1, *MODEL_INPUT_SIZE, 3), dtype=np.float32)
+    batch[0] = image.model_pixels()
+    batch /= 127.5
+    batch -= 1.0
+    return batch
+
+
+def new_thumbnails(image):
+    for size in thumbnails.SIZES:
+        for _ in thumbnails.FORMATS:
+            copy = image.image.copy()
+            copy.thumbnail((size, size), Image.LANCZOS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--width', type=int, default=3024)
+    parser.add_argument('--height', type=int, default=4032)
+    args = parser.parse_args()
+
+    data = make_photo(args.width, args.height, np.random.default_rng(0))
+    print(f"{args.width}x{args.height} JPEG, {len(data) / 1024:.0f} KB; median of {REPEATS} runs per stage\n")
+    print(f"{'stage':<44} {'ms':>8} {'alloc KB':>9} {'pixels KB':>10}")
+
+    def row(name, ms, alloc_kb=None, pixels=None):
+        alloc = f"{alloc_kb:.0f}" if alloc_kb is not None else ''
+        print(f"{name:<44} {ms:>8.2f} {alloc:>9} {pixels if pixels is not None else '':>10}")
+        return ms
+
+    total_old = 0
+    (_, full), ms, kb = measure(lambda: old_model_input(data))
+    total_old += row("old: full decode + model input (float copies)", ms, kb, f"{pixel_kb(full):.0f}")
+    _, ms, kb = measure(lambda: perceptual_hash(io.BytesIO(data)))
+    total_old += row("old: perceptual hash (own decode)", ms, kb)
+    variants = len(thumbnails.SIZES) * len(thumbnails.FORMATS)
+    decoded_kb, ms, kb = measure(lambda: old_thumbnails(data))
+    total_old += row(f"old: {variants} thumbnails (one decode each, no encode)", ms, kb, f"{decoded_kb:.0f}")
+    row("old: total", total_old)
+    print()
+
+    total_new = 0
+    image, ms, kb = measure(lambda: DecodedImage.open(io.BytesIO(data)))
+    total_new += row("new: draft-mode decode", ms, kb, f"{pixel_kb(image.image):.0f}")
+    _, ms, kb = measure(lambda: new_model_input(DecodedImage(image.image, image.original_size)))
+    total_new += row("new: model input (uint8 -> batch, in place)", ms, kb)
+    _, ms, kb = measure(lambda: perceptual_hash(image))
+    total_new += row("new: perceptual hash (shared decode)", ms, kb)
+    _, ms, kb = measure(lambda: new_thumbnails(image))
+    total_new += row(f"new: {variants} thumbnails (shared decode, no encode)", ms, kb)
+    _, ms, kb = measure(lambda: dominant_color(image))
+    total_new += row("new: dominant color (shared decode)", ms, kb)
+    row("new: total", total_new)
+    print(f"\n{total_old / total_new:.1f}x less time per upload")
+
+
+if __name__ == '__main__':
+    main()
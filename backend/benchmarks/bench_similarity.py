@@ -0,0 +1,80 @@
+# backend/benchmarks/bench_similarity.py
+"""
+Measures /clothes/<id>/similar query latency on synthetic embedding indexes.
+Run from the backend folder:  python -m benchmarks.bench_similarity [--sizes 10000 100000 1000000]
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from embedding_index import EmbeddingIndex
+
+# --- Configuration ---
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+EMBEDDING_DIM = 1280  # MobileNetV2 pooled features
+QUERIES = 50
+TOP_K = 10
+INSERT_BATCH = 50_000
+
+
+def build_index(directory, size, dim, dtype, rng):
+    index = EmbeddingIndex(directory, dtype=dtype, initial_capacity=size + 1024)
+    for start in range(0, size, INSERT_BATCH):
+        count = min(INSERT_BATCH, size - start)
+        index.add_many(range(start + 1, start + count + 1), rng.standard_normal((count, dim), dtype=np.float32))
+    return index
+
+
+def bench_size(size, dim, dtype, rng):
+    directory = tempfile.mkdtemp(prefix='embedding-bench-')
+    try:
+        started = time.perf_counter()
+        index = build_index(directory, size, dim, dtype, rng)
+        build_seconds = time.perf_counter() - started
+
+        # Incremental maintenance: a single upload and a single delete
+        started = time.perf_counter()
+        index.add(size + 1, rng.standard_normal(dim, dtype=np.float32))
+        add_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        index.delete(size + 1)
+        delete_ms = (time.perf_counter() - started) * 1000
+
+        query_ids = rng.integers(1, size + 1, QUERIES)
+        index.search(index.get(int(query_ids[0])), k=TOP_K)  # Warm the page cache
+        latencies = []
+        for item_id in query_ids:
+            started = time.perf_counter()
+            index.search(index.get(int(item_id)), k=TOP_K, exclude_ids=[int(item_id)])
+            latencies.append((time.perf_counter() - started) * 1000)
+        return {
+            "items": size,
+            "build_s": round(build_seconds, 2),
+            "add_ms": round(add_ms, 2),
+            "delete_ms": round(delete_ms, 2),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--dim', type=int, default=EMBEDDING_DIM)
+    parser.add_argument('--dtype', default='float32', choices=['float16', 'float32'])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"Top-{TOP_K} cosine search, {args.dim}-d {args.dtype} embeddings, {QUERIES} queries per size")
+    for size in args.sizes:
+        print(bench_size(size, args.dim, args.dtype, rng))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+# backend/benchmarks/bench_weather.py
+"""
+Checks the weather cache against a local OpenWeatherMap stub: concurrent requests
+for the same city must make one upstream call, and repeat lookups must skip the network.
+Run from the backend folder:  python -m benchmarks.bench_weather
+"""
+
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.stubs import weather_stub
+
+# --- Configuration ---
+CITIES = ['New Delhi', 'Mumbai', 'Paris', 'London']
+CONCURRENT_REQUESTS = 64
+UPSTREAM_LATENCY = 0.2
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    with weather_stub(latency=UPSTREAM_LATENCY) as stub:
+        os.environ.update({
+            'WEATHER_API_URL': f"{stub.url}/data/2.5/weather",
+            'WEATHER_API_KEY': 'stub',
+            'MODEL_PRELOAD': 'false',
+        })
+        os.environ.setdefault('SQLALCHEMY_DATABASE_URI', f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+        from app import get_weather, weather_cache
+
+        cities = [CITIES[i % len(CITIES)] for i in range(CONCURRENT_REQUESTS)]
+        with ThreadPoolExecutor(max_workers=CONCURRENT_REQUESTS) as pool:
+            started = time.perf_counter()
+            list(pool.map(lambda city: timed(get_weather, city), cities))
+            cold_wall = time.perf_counter() - started
+        print(f"Cold: {CONCURRENT_REQUESTS} concurrent requests for {len(CITIES)} cities took {cold_wall * 1000:.0f} ms "
+              f"and made {stub.calls} upstream call(s) (expected {len(CITIES)})")
+
+        warm = [timed(get_weather, city) for city in cities]
+        print(f"Warm: mean {sum(warm) / len(warm):.3f} ms per lookup, upstream calls still {stub.calls}")
+        print("Cache stats:", weather_cache.stats())
+        assert stub.calls == len(CITIES), "Concurrent requests for the same city were not coalesced"
+
+
+if __name__ == '__main__':
+    main()
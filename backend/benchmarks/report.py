@@ -0,0 +1,68 @@
+# backend/benchmarks/report.py
+"""
+Latency summaries and JSON result files for the benchmarks, so runs from different
+commits can be compared: `--output before.json` on one, `--compare before.json` on the next.
+"""
+
+import json
+import platform
+import subprocess
+import time
+
+import numpy as np
+
+# --- Configuration ---
+PERCENTILES = (50, 95, 99)
+
+
+def latency_summary(latencies, seconds=None, unit='ms'):
+    """Count, p50/p95/p99 and (given the wall time they took) throughput of a list of latencies."""
+    summary = {"count": len(latencies)}
+    if len(latencies):
+        for p in PERCENTILES:
+            summary[f"p{p}_{unit}"] = round(float(np.percentile(latencies, p)), 3)
+    if seconds:
+        summary["per_sec"] = round(len(latencies) / seconds, 1)
+    return summary
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(path, benchmark, params, results):
+    """Writes {name: summary} results with what is needed to tell runs apart."""
+    payload = {
+        "benchmark": benchmark,
+        "created": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "params": params,
+        "results": results,
+    }
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=2)
+    print(f"Results saved to {path}")
+
+
+def compare(baseline_path, results):
+    """Prints each latency and throughput metric next to the same metric of a saved run."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} (revision {baseline.get('revision')}, {baseline.get('created')}):")
+    for name, summary in results.items():
+        before = baseline['results'].get(name)
+        if not before:
+            print(f"  {name}: not in the baseline")
+            continue
+        changes = []
+        for metric, value in summary.items():
+            old = before.get(metric)
+            if metric == 'count' or old is None or not isinstance(value, (int, float)) or old == value == 0: continue
+            change = f"{(value - old) / old * 100:+.1f}%" if old else "new"
+            changes.append(f"{metric} {old:g} -> {value:g} ({change})")
+        print(f"  {name}: " + ", ".join(changes))
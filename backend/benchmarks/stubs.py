@@ -0,0 +1,121 @@
+# backend/benchmarks/stubs.py
+"""
+Local stand-ins for the external APIs the backend calls, so benchmarks and
+checks run offline with a controllable latency.
+"""
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class StubServer:
+    """Runs a ThreadingHTTPServer on a free local port in a background thread."""
+
+    def __init__(self, handler_class, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(handler_class):
+            server_stub = stub
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def record_call(self, delay=True):
+        with self._lock:
+            self.calls += 1
+        if delay and self.latency:
+            time.sleep(self.latency)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class JSONHandler(BaseHTTPRequestHandler):
+    server_stub = None
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+
+class WeatherHandler(JSONHandler):
+    """Mimics OpenWeatherMap's /data/2.5/weather response for any city but UNKNOWN_CITY, which gets its 404."""
+
+    UNKNOWN_CITY = 'Atlantis'
+
+    def do_GET(self):
+        self.server_stub.record_call()
+        city = parse_qs(urlparse(self.path).query).get('q', ['Nowhere'])[0]
+        if city.lower() == self.UNKNOWN_CITY.lower():
+            self.send_json({"cod": "404", "message": "city not found"}, status=404)
+            return
+        temp = 10 + sum(map(ord, city.lower())) % 25  # Deterministic per city: spans all three temperature bands
+        self.send_json({"name": city, "main": {"temp": temp}, "weather": [{"main": "Clear"}]})
+
+
+def weather_stub(latency=0.05):
+    return StubServer(WeatherHandler, latency)
+
+
+class GeminiHandler(JSONHandler):
+    """
+    Mimics Gemini's generateContent and streamGenerateContent (alt=sse) endpoints.
+    It "picks" the first two item IDs listed in the prompt and answers in the JSON format the stylist prompt asks for.
+    """
+
+    NOTES = "A relaxed, effortless pairing that works for the weather and the occasion. Keep accessories minimal and let the colours do the talking."
+    CHUNK_SIZE = 24
+
+    def answer(self):
+        length = int(self.headers.get('Content-Length', 0))
+        prompt = json.loads(self.rfile.read(length))['contents'][0]['parts'][0]['text']
+        item_ids = [int(i) for i in re.findall(r'Item ID (\d+)', prompt)]
+        outfit = {"top": item_ids[0] if item_ids else None, "bottom": item_ids[1] if len(item_ids) > 1 else None, "outerwear": None}
+        return f"```json\n{json.dumps({'outfit': outfit, 'notes': self.NOTES})}\n```"
+
+    def do_POST(self):
+        text = self.answer()
+        if ':streamGenerateContent' not in self.path:
+            self.server_stub.record_call()
+            self.send_json({"candidates": [{"content": {"parts": [{"text": text}]}}]})
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        chunks = [text[i:i + self.CHUNK_SIZE] for i in range(0, len(text), self.CHUNK_SIZE)]
+        stub = self.server_stub
+        stub.record_call(delay=False)
+        for chunk in chunks:
+            if stub.latency: time.sleep(stub.latency / len(chunks))  # Spread the latency over the stream
+            event = {"candidates": [{"content": {"parts": [{"text": chunk}]}}]}
+            self.wfile.write(f"data: {json.dumps(event)}\r\n\r\n".encode())
+            self.wfile.flush()
+
+
+def gemini_stub(latency=1.0):
+    return StubServer(GeminiHandler, latency)
@@ -0,0 +1,204 @@
+# backend/cache.py
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache with a per-entry time to live and LRU eviction.
+
+    `get_or_compute` and `get_or_stream` also coalesce requests: while a value for
+    a key is being computed, concurrent callers for the same key wait for that one
+    computation instead of starting their own. Values for which `should_cache` returns False
+    (e.g. a failed upstream call returning None) are handed to the waiting
+    callers but not stored.
+    """
+
+    def __init__(self, maxsize=256, ttl=600, should_cache=lambda value: value is not None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.should_cache = should_cache
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._in_flight = {}  # key -> Future
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._store(key, value)
+
+    def _store(self, key, value):
+        self._entries[key] = (self.clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                self.misses += 1
+                future = self._in_flight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not owner:
+            return future.result()  # Another caller is already computing this key
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            if self.should_cache(value):
+                self._store(key, value)
+            del self._in_flight[key]
+        future.set_result(value)
+        return value
+
+    def get_or_stream(self, key, produce):
+        """
+        Streaming counterpart of get_or_compute. `produce()` returns a generator that yields partial
+        results (e.g. text as it is generated) and returns the value. Returns a SharedStream: concurrent
+        callers for the same key all read the one running stream, which runs to completion even if
+        they stop reading. A cached value comes back as a finished stream with no partial results.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return SharedStream.finished(entry[1])
+            if entry is not None:
+                del self._entries[key]
+            in_flight = self._in_flight.get(key)
+            if in_flight is None:
+                self.misses += 1
+                stream = self._in_flight[key] = SharedStream()
+            else:
+                self.coalesced += 1
+        if in_flight is not None:
+            # Another caller is already producing this key (get_or_compute callers hold a plain Future)
+            return in_flight if isinstance(in_flight, SharedStream) else SharedStream.finished(in_flight.result())
+
+        def done(value, error):
+            with self._lock:
+                if error is None and self.should_cache(value):
+                    self._store(key, value)
+                del self._in_flight[key]
+
+        stream.start(produce(), on_done=done)
+        return stream
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else None,
+            }
+
+
+class SharedStream:
+    """
+    Runs a generator on its own thread and keeps what it yields, so any number of readers can each
+    iterate the items from the start while it runs. `result()` waits for the generator's return
+    value like Future.result() (so get_or_compute callers can wait on a stream too).
+    """
+
+    def __init__(self):
+        self._items = []
+        self._done = False
+        self._value = None
+        self._error = None
+        self._condition = threading.Condition()
+
+    @classmethod
+    def finished(cls, value):
+        stream = cls()
+        stream._finish(value, None)
+        return stream
+
+    def start(self, generator, on_done=None):
+        threading.Thread(target=self._run, args=(generator, on_done), name="shared-stream", daemon=True).start()
+
+    def _run(self, generator, on_done):
+        value, error = None, None
+        try:
+            while True:
+                item = next(generator)
+                with self._condition:
+                    self._items.append(item)
+                    self._condition.notify_all()
+        except StopIteration as stop:
+            value = stop.value
+        except BaseException as e:
+            print(f"Error in shared stream: {e}")
+            error = e
+        if on_done: on_done(value, error)
+        self._finish(value, error)
+
+    def _finish(self, value, error):
+        with self._condition:
+            self._value, self._error, self._done = value, error, True
+            self._condition.notify_all()
+
+    def __iter__(self):
+        position = 0
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: position < len(self._items) or self._done)
+                if position == len(self._items): return
+                item = self._items[position]
+            position += 1
+            yield item
+
+    def result(self, timeout=None):
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._done, timeout):
+                raise TimeoutError("The stream has not finished yet")
+        if self._error is not None: raise self._error
+        return self._value
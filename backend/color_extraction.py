@@ -0,0 +1,123 @@
+# backend/color_extraction.py
+
+from collections import namedtuple
+
+import numpy as np
+from PIL import Image
+
+from fashion_logic import PALETTE
+from image_preprocessing import decode
+
+# --- Configuration ---
+SAMPLE_SIZE = 64  # Colors are estimated on a 64x64 downsample: ~4k pixels, a few milliseconds in total
+DECODE_SIZE = 128  # How large a path is decoded when no DecodedImage is at hand
+CLUSTERS = 3
+ITERATIONS = 8
+BORDER = 4  # Pixels of the outer ring used to estimate the background
+BACKGROUND_SPREAD = 12.0  # Max median distance (CIELAB ΔE) of the border to its median for a plain background
+BACKGROUND_DISTANCE = 18.0  # Pixels this close to a plain background are masked out
+MIN_FOREGROUND = 0.05  # Below this share of pixels left, the mask is not trusted
+MAX_PALETTE_DISTANCE = 40.0  # Farther than this from every palette shade, the name is left unknown
+
+# sRGB shades per palette name; several per name so e.g. maroon, denim or olive land on the right one,
+# from muted to fully saturated (vivid dyes sit far from the muted shades in CIELAB)
+PALETTE_SHADES = {
+    'black': [(15, 15, 15), (40, 40, 45)],
+    'white': [(250, 250, 250), (235, 235, 228)],
+    'grey': [(128, 128, 128), (90, 90, 95), (180, 180, 182)],
+    'red': [(200, 30, 40), (130, 20, 35), (230, 80, 60), (255, 0, 0), (220, 20, 60)],
+    'pink': [(240, 150, 180), (220, 80, 140), (250, 200, 210), (255, 20, 147), (255, 105, 180), (255, 0, 255)],
+    'blue': [(40, 90, 200), (110, 160, 220), (70, 110, 160), (0, 0, 255), (30, 100, 255), (0, 150, 255), (0, 70, 180)],
+    'navy': [(25, 35, 80), (35, 45, 70), (0, 0, 128)],
+    'green': [(40, 140, 60), (100, 110, 60), (120, 200, 140), (0, 200, 0), (0, 255, 0), (0, 128, 0), (50, 205, 50)],
+    'beige': [(220, 200, 160), (195, 165, 125), (150, 115, 80)],
+}
+if set(PALETTE_SHADES) != set(PALETTE[:-1]):
+    raise RuntimeError(f"PALETTE_SHADES must cover exactly the named palette colors {PALETTE[:-1]}")
+
+# name: a palette color ('navy') or None; lab: [L, a, b] of the dominant color; coverage: its share of the garment
+DominantColor = namedtuple('DominantColor', ['name', 'lab', 'coverage'])
+
+
+def srgb_to_lab(rgb):
+    """(..., 3) sRGB values in 0-255 -> CIELAB (D65), vectorized."""
+    c = np.asarray(rgb, dtype=np.float32) / 255.0
+    c = np.where(c > 0.04045, ((c + 0.055) / 1.055) ** 2.4, c / 12.92)
+    xyz = c @ np.array([[0.4124, 0.2126, 0.0193], [0.3576, 0.7152, 0.1192], [0.1805, 0.0722, 0.9505]], dtype=np.float32)
+    xyz /= np.array([0.95047, 1.0, 1.08883], dtype=np.float32)
+    f = np.where(xyz > 0.008856, np.cbrt(xyz), 7.787 * xyz + 16 / 116)
+    return np.stack([116 * f[..., 1] - 16, 500 * (f[..., 0] - f[..., 1]), 200 * (f[..., 1] - f[..., 2])], axis=-1)
+
+
+_SHADE_NAMES = [name for name, shades in PALETTE_SHADES.items() for _ in shades]
+_SHADE_LAB = srgb_to_lab([shade for shades in PALETTE_SHADES.values() for shade in shades])
+
+
+def palette_name(lab):
+    """The palette name closest to a CIELAB color, or None when nothing in the palette is close."""
+    distances = np.linalg.norm(_SHADE_LAB - np.asarray(lab, dtype=np.float32), axis=1)
+    nearest = int(np.argmin(distances))
+    return _SHADE_NAMES[nearest] if distances[nearest] <= MAX_PALETTE_DISTANCE else None
+
+
+def foreground_pixels(lab):
+    """
+    The garment's pixels of a (h, w, 3) CIELAB image. A plain backdrop (the usual product
+    or flat-lay photo) is recognized from the border and masked out; on a busy background
+    the center of the frame is used instead.
+    """
+    border = np.concatenate([lab[:BORDER].reshape(-1, 3), lab[-BORDER:].reshape(-1, 3),
+                             lab[:, :BORDER].reshape(-1, 3), lab[:, -BORDER:].reshape(-1, 3)])
+    background = np.median(border, axis=0)
+    if np.median(np.linalg.norm(border - background, axis=1)) <= BACKGROUND_SPREAD:
+        pixels = lab.reshape(-1, 3)
+        foreground = pixels[np.linalg.norm(pixels - background, axis=1) > BACKGROUND_DISTANCE]
+        if len(foreground) >= MIN_FOREGROUND * len(pixels):
+            return foreground
+    h, w = lab.shape[:2]
+    return lab[h // 4:h - h // 4, w // 4:w - w // 4].reshape(-1, 3)
+
+
+def kmeans(pixels, k=CLUSTERS, iterations=ITERATIONS):
+    """
+    Plain Lloyd's k-means over (n, 3) pixels, seeded deterministically from lightness
+    quantiles. Returns (centers, cluster sizes).
+    """
+    order = np.argsort(pixels[:, 0], kind='stable')
+    centers = pixels[order[((np.arange(k) + 0.5) * len(pixels) / k).astype(int)]].copy()
+    for _ in range(iterations):
+        labels = np.argmin(((pixels[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2), axis=1)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, pixels)
+        nonempty = counts > 0
+        centers[nonempty] = sums[nonempty] / counts[nonempty, None]
+    return centers, counts
+
+
+def dominant_color(image):
+    """
+    The dominant garment color of a path or DecodedImage: background masked out, then
+    k-means in CIELAB on a 64x64 downsample. Returns a DominantColor, or None if unreadable.
+    """
+    try:
+        decoded = decode(image, DECODE_SIZE)
+    except Exception as e:
+        print(f"Error reading {image} for color extraction: {e}")
+        return None
+    small = decoded.image.resize((SAMPLE_SIZE, SAMPLE_SIZE), Image.BILINEAR, reducing_gap=2.0)
+    pixels = foreground_pixels(srgb_to_lab(np.asarray(small)))
+    centers, counts = kmeans(pixels)
+    # Clusters of the same palette color (one fabric under light and shadow) count together
+    groups = {}
+    for center, count in zip(centers, counts):
+        if count: groups.setdefault(palette_name(center), []).append((center, count))
+    name, members = max(groups.items(), key=lambda group: sum(count for _, count in group[1]))
+    total = sum(count for _, count in members)
+    lab = sum(center * count for center, count in members) / total
+    return DominantColor(name, [round(float(v), 1) for v in lab], round(float(total / len(pixels)), 3))
+
+
+def color_label(color):
+    """How an extracted color is stored in ClothingItem.color: 'Navy', like the upload form's options."""
+    return color.name.title() if color is not None and color.name else None
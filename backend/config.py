@@ -3,5 +3,73 @@ import os
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("SQLALCHEMY_DATABASE_URI")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # 'production' tunes the connections: WAL, synchronous=NORMAL, a busy timeout and mmap for SQLite;
+    # pool size, pre-ping and recycling for other databases (see models/database.py)
+    DB_PROFILE = os.getenv("DB_PROFILE", "development")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Seconds, below the server's idle connection timeout
+    # Create tables and apply pending migrations when the app starts (gunicorn workers take turns)
+    DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "true").lower() == "true"
     UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", "uploads")
+    # Resized WebP/JPEG variants of the uploads, generated once and cached on disk
+    THUMBNAIL_FOLDER = os.getenv("THUMBNAIL_FOLDER", "thumbnails")
+    THUMBNAILS_ON_UPLOAD = os.getenv("THUMBNAILS_ON_UPLOAD", "false").lower() == "true"
+    # Pre-generation runs on its own pool, so a burst of uploads never fills the classification queue
+    THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "1"))
+    THUMBNAIL_MAX_PENDING = int(os.getenv("THUMBNAIL_MAX_PENDING", "100"))
+    # Uploaded images are never modified in place, so browsers may cache them for a long time
+    UPLOAD_CACHE_MAX_AGE = int(os.getenv("UPLOAD_CACHE_MAX_AGE", str(365 * 24 * 3600)))
     ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "*")
+    # Start loading the classifier in the background at startup instead of on the first upload
+    MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "true").lower() == "true"
+    # Classify uploads on a background pool and answer /upload with 202 + a job id
+    ASYNC_UPLOADS = os.getenv("ASYNC_UPLOADS", "false").lower() == "true"
+    UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "2"))
+    UPLOAD_MAX_PENDING = int(os.getenv("UPLOAD_MAX_PENDING", "100"))
+    # /upload/bulk: files per request (zip members included), largest zip member, images per classifier call
+    BULK_UPLOAD_MAX_FILES = int(os.getenv("BULK_UPLOAD_MAX_FILES", "500"))
+    BULK_UPLOAD_MAX_FILE_SIZE = int(os.getenv("BULK_UPLOAD_MAX_FILE_SIZE", str(20 * 1024 * 1024)))
+    BULK_CLASSIFY_BATCH_SIZE = int(os.getenv("BULK_CLASSIFY_BATCH_SIZE", "64"))
+    # Classifier results are cached by image hash; least recently used entries are evicted
+    CLASSIFICATION_CACHE_SIZE = int(os.getenv("CLASSIFICATION_CACHE_SIZE", "10000"))
+    # Also treat near-duplicate photos (perceptual hash within N bits) as cache hits
+    PERCEPTUAL_HASH = os.getenv("PERCEPTUAL_HASH", "false").lower() == "true"
+    PERCEPTUAL_HASH_MAX_DISTANCE = int(os.getenv("PERCEPTUAL_HASH_MAX_DISTANCE", "4"))
+    # Per-item image embeddings for /clothes/<id>/similar, memory-mapped from this folder
+    SIMILARITY_INDEX = os.getenv("SIMILARITY_INDEX", "true").lower() == "true"
+    EMBEDDING_INDEX_FOLDER = os.getenv("EMBEDDING_INDEX_FOLDER", "embeddings")
+    EMBEDDING_DTYPE = os.getenv("EMBEDDING_DTYPE", "float32")  # float16 halves the file, but scoring it is slower
+    # Outbound HTTP calls share one pooled session; weather results are cached per city
+    HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+    WEATHER_API_URL = os.getenv("WEATHER_API_URL", "http://api.openweathermap.org/data/2.5/weather")
+    WEATHER_TIMEOUT = float(os.getenv("WEATHER_TIMEOUT", "5"))
+    WEATHER_CACHE_TTL = int(os.getenv("WEATHER_CACHE_TTL", "600"))
+    WEATHER_CACHE_SIZE = int(os.getenv("WEATHER_CACHE_SIZE", "256"))
+    GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+    GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash-preview-05-20")
+    # Outfit answers from the LLM, keyed on the parsed request, temperature band and candidate wardrobe
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+    LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "1800"))
+    LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "512"))
+    # 'llm' asks Gemini, 'local' always uses the on-box recommender in fashion_logic.
+    # With LOCAL_FALLBACK the recommender also answers when Gemini has no API key, fails or times out.
+    OUTFIT_ENGINE = os.getenv("OUTFIT_ENGINE", "llm")
+    LOCAL_FALLBACK = os.getenv("LOCAL_FALLBACK", "true").lower() == "true"
+    # Ranked outfits for every (occasion, temperature band, color preference), kept up to date in the background
+    # and served to local-engine chats; other workers' changes are picked up every POLL_SECONDS
+    OUTFIT_PRECOMPUTE = os.getenv("OUTFIT_PRECOMPUTE", "true").lower() == "true"
+    OUTFIT_PRECOMPUTE_TOP_K = int(os.getenv("OUTFIT_PRECOMPUTE_TOP_K", "5"))
+    OUTFIT_PRECOMPUTE_POLL_SECONDS = float(os.getenv("OUTFIT_PRECOMPUTE_POLL_SECONDS", "5"))
+    # Also answer llm-engine chats from a precomputed slot when one matches, instead of waiting on Gemini
+    # (false: every llm-engine chat goes to Gemini)
+    INSTANT_OUTFITS = os.getenv("INSTANT_OUTFITS", "true").lower() == "true"
+    # Prometheus histograms at /metrics, and per-stage timings of each request in a Server-Timing header
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    SERVER_TIMING = os.getenv("SERVER_TIMING", "true").lower() == "true"
+    # Sample the stacks of requests slower than this and save them as folded stacks for a flame graph (0: off)
+    PROFILE_SLOW_REQUEST_MS = float(os.getenv("PROFILE_SLOW_REQUEST_MS", "0"))
+    PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+    PROFILE_FOLDER = os.getenv("PROFILE_FOLDER", "profiles")
@@ -0,0 +1,208 @@
+# backend/embedding_index.py
+
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+CHUNK_ROWS = 8192  # Rows scored per step; bounds the float32 scratch memory of a search
+
+
+class EmbeddingIndex:
+    """
+    Memory-mapped matrix of L2-normalised item embeddings, kept in step with ClothingItem ids.
+
+    Layout on disk (one "generation" is live at a time):
+        current               -> number of the live generation
+        ids-<gen>.npy         -> int64[capacity], the item id stored in each row (0 = free row).
+                                 Row 0 is reserved: it holds a write counter instead of an id.
+        vectors-<gen>.npy     -> dtype[capacity, dim]
+
+    Adds reuse free rows and deletes just free their row, so neither forces a
+    rebuild. Only when every row is taken is a new generation with twice the
+    capacity written and swapped in. Several processes can share one index:
+    writes happen under a file lock, and a process re-reads the id table only
+    when the write counter or the generation shows someone else changed it.
+    """
+
+    def __init__(self, directory, dtype='float32', initial_capacity=1024):
+        self.directory = directory
+        self.dtype = np.dtype(dtype)
+        self.initial_capacity = max(2, initial_capacity)
+        self._generation = None
+        self._ids = None
+        self._vectors = None
+        self._seen_writes = None
+        self._rows = {}  # item id -> row
+        self._free = []  # free rows, lowest last
+        self._end = 1  # one past the highest row that was ever used
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    # --- Storage ---
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _read_generation(self):
+        try:
+            with open(self._path('current')) as f:
+                return int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _refresh(self):
+        """Re-maps the live generation and re-reads the id table if anything changed on disk."""
+        generation = self._read_generation()
+        if generation is None:
+            return False
+        if generation != self._generation:
+            self._ids = np.load(self._path(f'ids-{generation}.npy'), mmap_mode='r+')
+            self._vectors = np.load(self._path(f'vectors-{generation}.npy'), mmap_mode='r+')
+            self._generation = generation
+            self._seen_writes = None
+        if self._ids[0] != self._seen_writes:
+            ids = np.array(self._ids)
+            used = np.flatnonzero(ids[1:]) + 1
+            self._rows = dict(zip(ids[used].tolist(), used.tolist()))
+            self._free = (np.flatnonzero(ids[1:] == 0) + 1)[::-1].tolist()
+            self._end = int(used[-1]) + 1 if len(used) else 1
+            self._seen_writes = int(ids[0])
+        return True
+
+    def _record_write(self):
+        self._ids[0] += 1
+        self._seen_writes = int(self._ids[0])
+
+    def _create_generation(self, capacity, dim):
+        generation = (self._generation or 0) + 1
+        ids = np.lib.format.open_memmap(self._path(f'ids-{generation}.npy'), mode='w+', dtype=np.int64, shape=(capacity,))
+        vectors = np.lib.format.open_memmap(self._path(f'vectors-{generation}.npy'), mode='w+', dtype=self.dtype, shape=(capacity, dim))
+        if self._ids is not None:
+            ids[:len(self._ids)] = self._ids
+            vectors[:len(self._vectors)] = self._vectors
+        ids.flush()
+        vectors.flush()
+        del ids, vectors
+
+        old_generation = self._generation
+        temp_path = self._path('current.tmp')
+        with open(temp_path, 'w') as f:
+            f.write(str(generation))
+        os.replace(temp_path, self._path('current'))
+        self._refresh()
+        if old_generation is not None:
+            # Processes that still map the old files keep their (unlinked) copy until they refresh
+            for name in (f'ids-{old_generation}.npy', f'vectors-{old_generation}.npy'):
+                try:
+                    os.remove(self._path(name))
+                except OSError:
+                    pass
+
+    @contextmanager
+    def _write_lock(self):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self._path('.lock'), 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # --- Public API ---
+
+    def __len__(self):
+        with self._lock:
+            return len(self._rows) if self._refresh() else 0
+
+    def add(self, item_id, vector):
+        self.add_many([item_id], [vector])
+
+    def add_many(self, item_ids, vectors):
+        """Adds (or replaces) the embeddings of several items under one lock."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(item_ids), -1)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        keep = norms[:, 0] > 0
+        item_ids, vectors = [int(i) for i, k in zip(item_ids, keep) if k], vectors[keep] / norms[keep]
+        if not item_ids: return
+        with self._write_lock():
+            if not self._refresh():
+                self._create_generation(max(self.initial_capacity, len(item_ids) + 1), vectors.shape[1])
+            if vectors.shape[1] != self._vectors.shape[1]:
+                raise ValueError(f"Expected {self._vectors.shape[1]}-d embeddings, got {vectors.shape[1]}")
+            new_count = len(set(item_ids) - self._rows.keys())
+            if new_count > len(self._free):
+                capacity = len(self._ids)
+                while capacity - 1 - len(self._rows) < new_count:
+                    capacity *= 2
+                self._create_generation(capacity, vectors.shape[1])
+
+            rows = []
+            for item_id in item_ids:
+                row = self._rows.get(item_id)
+                if row is None:
+                    row = self._free.pop()
+                    self._rows[item_id] = row
+                rows.append(row)
+            # Write the vectors before the ids so readers never see an id with a half-written row
+            self._vectors[rows] = vectors
+            self._ids[rows] = item_ids
+            self._end = max(self._end, max(rows) + 1)
+            self._record_write()
+
+    def delete(self, item_id):
+        with self._write_lock():
+            if not self._refresh(): return
+            row = self._rows.pop(item_id, None)
+            if row is not None:
+                self._ids[row] = 0
+                self._free.append(row)
+                self._record_write()
+
+    def get(self, item_id):
+        with self._lock:
+            if not self._refresh(): return None
+            row = self._rows.get(item_id)
+            return np.array(self._vectors[row], dtype=np.float32) if row is not None else None
+
+    def search(self, vector, k=10, exclude_ids=()):
+        """
+        Top-k cosine search. Returns a list of (item_id, score), best first.
+        The matrix is scored in fixed-size chunks so memory use doesn't grow with the index.
+        """
+        with self._lock:
+            if not self._refresh() or not self._rows: return []
+            ids, vectors, end = self._ids, self._vectors, self._end
+
+        query = np.asarray(vector, dtype=np.float32).ravel()
+        query = query / (np.linalg.norm(query) or 1.0)
+        exclude_ids = np.asarray(list(exclude_ids), dtype=np.int64)
+
+        candidate_ids, candidate_scores = [], []
+        for start in range(1, end, CHUNK_ROWS):
+            chunk_ids = np.array(ids[start:min(start + CHUNK_ROWS, end)])
+            live = chunk_ids != 0
+            if len(exclude_ids): live &= ~np.isin(chunk_ids, exclude_ids)
+            if not live.any(): continue
+            scores = vectors[start:start + len(chunk_ids)].astype(np.float32, copy=False) @ query
+            scores[~live] = -np.inf
+            if len(scores) > k:
+                top = np.argpartition(scores, -k)[-k:]
+                chunk_ids, scores = chunk_ids[top], scores[top]
+            candidate_ids.append(chunk_ids)
+            candidate_scores.append(scores)
+        if not candidate_ids: return []
+
+        candidate_ids = np.concatenate(candidate_ids)
+        candidate_scores = np.concatenate(candidate_scores)
+        order = np.argsort(-candidate_scores)[:k]
+        return [(int(candidate_ids[i]), float(candidate_scores[i])) for i in order if np.isfinite(candidate_scores[i])]
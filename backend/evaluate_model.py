@@ -0,0 +1,103 @@
+# backend/evaluate_model.py
+"""
+Compares the Keras model with its quantized TFLite exports on the validation split:
+accuracy (and the difference to Keras), file size, resident memory after loading and
+per-image CPU latency at batch size 1, the way uploads are classified one by one.
+Each variant runs in its own process, so memory numbers don't include the others.
+Run from the backend folder after train_model.py:  python evaluate_model.py [--limit 500]
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import time
+
+import numpy as np
+
+# --- Configuration ---
+VARIANTS = {
+    'keras': ('keras', 'fashion_model.h5'),
+    'dynamic': ('tflite', 'fashion_model_dynamic.tflite'),
+    'int8': ('tflite', 'fashion_model_int8.tflite'),
+}
+LATENCY_IMAGES = 100  # Images timed one at a time for the latency percentiles
+THREADS = 1  # Pin inference to one core so the variants are compared like for like
+
+
+def peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1e6 if os.uname().sysname == 'Darwin' else rss / 1e3  # bytes on macOS, KiB on Linux
+
+
+def evaluate_variant(runtime, model_path, paths, labels, class_indices):
+    """Worker process: loads one variant and measures it."""
+    for variable in ('TF_NUM_INTEROP_THREADS', 'TF_NUM_INTRAOP_THREADS', 'TFLITE_THREADS'):
+        os.environ[variable] = str(THREADS)
+    import ml_model
+    from image_preprocessing import model_pixels
+
+    rss_before = peak_rss_mb()
+    loader = ml_model.ModelLoader(model_path, warmup=True, runtime=runtime)
+    if not loader.load():
+        return {"error": loader.error}
+    rss_loaded = peak_rss_mb()
+
+    class_names = {i: name for name, i in class_indices.items()}
+    latencies, correct = [], 0
+    for i, (path, label) in enumerate(zip(paths, labels)):
+        image = model_pixels(path)[np.newaxis]
+        started = time.perf_counter()
+        categories, _ = loader.predict(image)
+        if i < LATENCY_IMAGES:
+            latencies.append((time.perf_counter() - started) * 1000)
+        correct += categories[0] == class_names[label]
+    return {
+        "accuracy": correct / len(paths),
+        "size_mb": os.path.getsize(model_path) / 1e6,
+        "load_rss_mb": rss_loaded - rss_before,
+        "peak_rss_mb": peak_rss_mb(),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dataset-dir', default='dataset')
+    parser.add_argument('--limit', type=int, default=0, help="Evaluate on at most N validation images (0: all)")
+    parser.add_argument('--variants', nargs='*', choices=list(VARIANTS), default=list(VARIANTS))
+    args = parser.parse_args()
+
+    # The same seeded split as training, so none of these images were trained on
+    import input_pipeline
+    paths, labels, class_indices = input_pipeline.list_dataset(args.dataset_dir)
+    _, validation_indices = input_pipeline.split_dataset(paths, labels)
+    if args.limit:
+        validation_indices = validation_indices[:args.limit]
+    paths, labels = [paths[i] for i in validation_indices], labels[validation_indices].tolist()
+    print(f"Evaluating on {len(paths)} validation images\n")
+
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    for name in args.variants:
+        runtime, model_path = VARIANTS[name]
+        if not os.path.exists(model_path):
+            print(f"Skipping {name}: '{model_path}' not found (run train_model.py --export-only).")
+            continue
+        with context.Pool(1) as pool:
+            results[name] = pool.apply(evaluate_variant, (runtime, model_path, paths, labels, class_indices))
+
+    baseline = results.get('keras', {}).get('accuracy')
+    print(f"{'variant':<9} {'accuracy':>9} {'Δ vs keras':>11} {'size MB':>8} {'load RSS MB':>12} {'peak RSS MB':>12} {'p50 ms':>7} {'p95 ms':>7}")
+    for name, r in results.items():
+        if 'error' in r:
+            print(f"{name:<9} failed: {r['error']}")
+            continue
+        delta = f"{(r['accuracy'] - baseline) * 100:+.2f} pt" if baseline is not None else "-"
+        print(f"{name:<9} {r['accuracy']:>9.2%} {delta:>11} {r['size_mb']:>8.1f} {r['load_rss_mb']:>12.0f} {r['peak_rss_mb']:>12.0f} "
+              f"{r['p50_ms']:>7.1f} {r['p95_ms']:>7.1f}")
+
+
+if __name__ == '__main__':
+    main()
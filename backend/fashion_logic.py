@@ -1,64 +1,188 @@
 # backend/fashion_logic.py
-import random
+import numpy as np
 
 # Define which of our AI categories fit into general clothing types
 # This helps the logic know what's a top, bottom, etc.
-CLOTHING_TYPES = {
-    'top': ['T-Shirt', 'Suit', 'Sweater', 'Scarf'],
-    'bottom': ['Jeans', 'Skirt'],
-    'dress': ['Dress'],
-    'outerwear': ['Jacket'],
-    'shoes': ['Shoes']
-}
+CLOTHING_TYPES = {'top': ['T-Shirt', 'Shirt', 'Blouse', 'Suit', 'Sweater'], 'bottom': ['Jeans', 'Skirt', 'Trousers'],'dress': ['Dress'],'outerwear': ['Jacket', 'Coat'],'shoes': ['Heels', 'Flats', 'Sneakers']}
 
 # Simple rules mapping occasion to clothing categories
-# For example, a 'Formal' occasion requires items categorized as 'Suit'.
-OCCASION_RULES = {
-    'Formal': ['Suit'],
-    'Casual': ['T-Shirt', 'Jeans', 'Sweater', 'Skirt', 'Jacket', 'Shoes'],
-    'Party': ['Dress', 'Skirt', 'T-Shirt'],
-    'Work': ['Suit', 'Skirt', 'T-Shirt']
-}
-
-def generate_outfit_from_wardrobe(all_items, occasion):
+# For example, a 'Formal' occasion requires items like a 'Suit' or 'Trousers'.
+OCCASION_RULES = {'Formal': ['Suit', 'Dress', 'Shirt', 'Trousers', 'Heels'],'Casual': ['T-Shirt', 'Jeans', 'Sweater', 'Skirt', 'Jacket', 'Dress', 'Sneakers', 'Flats'],'Party': ['Dress', 'Skirt', 'Blouse', 'Heels'],'Work': ['Suit', 'Shirt', 'Blouse', 'Trousers', 'Skirt', 'Flats', 'Heels'],'Dinner': ['Dress', 'Blouse', 'Skirt', 'Trousers', 'Heels'],'Date Night': ['Dress', 'Blouse', 'Skirt', 'Heels'],'Chill': ['T-Shirt', 'Jeans', 'Sweater', 'Sneakers']}
+
+# Temperature only matters in three bands; each band rules out some clothes entirely
+TEMPERATURE_BANDS = ('hot', 'mild', 'cold')
+BAND_EXCLUDES = {'hot': ['Sweater', 'Jacket', 'Coat'], 'mild': [], 'cold': ['T-Shirt', 'Skirt']}
+
+def temperature_band(temp): return 'hot' if temp > 25 else 'cold' if temp < 15 else 'mild'
+
+# --- Scoring tables ---
+
+# Named colours we can reason about; anything else is 'unknown'
+PALETTE = ['black', 'white', 'red', 'blue', 'green', 'pink', 'grey', 'beige', 'navy', 'unknown']
+NEUTRALS = {'black', 'white', 'grey', 'beige', 'navy'}
+GOOD_PAIRS = {('blue', 'white'), ('pink', 'grey'), ('green', 'beige'), ('red', 'navy'), ('blue', 'beige'), ('pink', 'navy'), ('black', 'white')}
+CLASHING_PAIRS = {('red', 'pink'), ('red', 'green'), ('black', 'navy'), ('green', 'pink')}
+
+def palette_index(color):
+    """Maps a free-text colour like 'Light Blue' or 'Gray' onto PALETTE."""
+    color = (color or '').lower().replace('gray', 'grey')
+    for i, name in enumerate(PALETTE[:-1]):
+        if name in color: return i
+    return len(PALETTE) - 1
+
+def _color_compatibility():
+    n = len(PALETTE)
+    matrix = np.full((n, n), 0.4, dtype=np.float32)
+    for i, a in enumerate(PALETTE):
+        for j, b in enumerate(PALETTE):
+            if 'unknown' in (a, b): matrix[i, j] = 0.6
+            elif (a, b) in GOOD_PAIRS or (b, a) in GOOD_PAIRS: matrix[i, j] = 1.0
+            elif (a, b) in CLASHING_PAIRS or (b, a) in CLASHING_PAIRS: matrix[i, j] = 0.1
+            elif a in NEUTRALS and b in NEUTRALS: matrix[i, j] = 0.9
+            elif a in NEUTRALS or b in NEUTRALS: matrix[i, j] = 0.8
+            elif a == b: matrix[i, j] = 0.5  # Head-to-toe single colour is hard to pull off
+    return matrix
+
+COLOR_COMPATIBILITY = _color_compatibility()
+
+# How warm each category is, against how warm the outfit should be in each band
+WARMTH = {'T-Shirt': 0, 'Skirt': 0, 'Blouse': 1, 'Shirt': 1, 'Dress': 1, 'Heels': 1, 'Flats': 1, 'Sneakers': 2,
+          'Jeans': 2, 'Trousers': 2, 'Suit': 2, 'Sweater': 3, 'Jacket': 3, 'Coat': 4}
+TARGET_WARMTH = {'hot': 0.5, 'mild': 1.5, 'cold': 3.0}
+# Going without outerwear / shoes in a given band
+NO_OUTERWEAR_FIT = {'hot': 1.0, 'mild': 0.6, 'cold': 0.0}
+NO_SHOES_FIT = 0.3
+
+COLOR_WEIGHT = 1.5
+PREFERRED_COLOR_BONUS = 0.5
+SLOT_CANDIDATES = 16  # Best items kept per slot before combining
+UPPER_CANDIDATES = 32  # Best top/bottom (or dress) pairs kept before adding outerwear and shoes
+
+
+class OutfitRecommender:
+    """
+    Local outfit engine that needs no network round trip.
+
+    Built once per wardrobe state: it precomputes, for every (occasion, temperature
+    band, clothing type), the items that qualify. `recommend` then scores all
+    top/bottom/outerwear/shoes combinations of the best candidates at once with
+    NumPy broadcasting (colour compatibility, occasion fit, weather fit) and
+    returns the best k outfits.
+    """
+
+    def __init__(self, items):
+        """items: iterable of objects (or dicts) with id, category and color."""
+        rows = [(i['id'], i['category'], i['color']) if isinstance(i, dict) else (i.id, i.category, i.color) for i in items]
+        self.ids = np.array([r[0] for r in rows], dtype=np.int64)
+        self.categories = [r[1] for r in rows]
+        self.colors = np.array([palette_index(r[2]) for r in rows], dtype=np.int64)
+        warmth = np.array([WARMTH.get(c, 1.5) for c in self.categories], dtype=np.float32)
+        self.weather_fit = {band: 1 - np.abs(warmth - TARGET_WARMTH[band]) / 4 for band in TEMPERATURE_BANDS}
+
+        category_rows = {}
+        for row, category in enumerate(self.categories):
+            category_rows.setdefault(category, []).append(row)
+        self.index = {}
+        for occasion, allowed in OCCASION_RULES.items():
+            for band in TEMPERATURE_BANDS:
+                for clothing_type, type_categories in CLOTHING_TYPES.items():
+                    wanted = [c for c in type_categories if c in allowed and c not in BAND_EXCLUDES[band]]
+                    self.index[(occasion, band, clothing_type)] = np.array(
+                        sorted(row for c in wanted for row in category_rows.get(c, [])), dtype=np.int64)
+
+    def candidates(self, occasion, band, clothing_type):
+        """Item ids that fit an occasion, temperature band and clothing type."""
+        return self.ids[self.index.get((occasion, band, clothing_type), np.empty(0, dtype=np.int64))]
+
+    def _best(self, rows, scores, n):
+        if len(rows) > n:
+            keep = np.argpartition(-scores, n)[:n]
+            rows, scores = rows[keep], scores[keep]
+        return rows, scores
+
+    def recommend(self, occasion, band, preferred_color=None, k=3):
+        """
+        Returns up to k outfits, best first, as dicts:
+        {"top": id, "bottom": id or None, "outerwear": id or None, "shoes": id or None, "score": float}
+        """
+        def slot(clothing_type):
+            rows = self.index.get((occasion, band, clothing_type), np.empty(0, dtype=np.int64))
+            scores = self.weather_fit[band][rows] + 1.0  # +1: it fits the occasion, or it wouldn't be in the index
+            if preferred_color:
+                scores = scores + PREFERRED_COLOR_BONUS * (self.colors[rows] == palette_index(preferred_color))
+            return self._best(rows, scores, SLOT_CANDIDATES)
+
+        tops, top_scores = slot('top')
+        bottoms, bottom_scores = slot('bottom')
+        dresses, dress_scores = slot('dress')
+        outerwear, outerwear_scores = slot('outerwear')
+        shoes, shoe_scores = slot('shoes')
+
+        # Upper body: every top x bottom pair, plus dresses on their own
+        pair_scores = (top_scores[:, None] + bottom_scores[None, :]
+                       + COLOR_WEIGHT * COLOR_COMPATIBILITY[self.colors[tops][:, None], self.colors[bottoms][None, :]])
+        upper_tops = np.concatenate([np.repeat(tops, len(bottoms)), dresses])
+        upper_bottoms = np.concatenate([np.tile(bottoms, len(tops)), np.full(len(dresses), -1)])
+        upper_scores = np.concatenate([pair_scores.ravel(), 2 * dress_scores + COLOR_WEIGHT * 0.8])
+        if len(upper_scores) == 0: return []
+        keep = np.argsort(-upper_scores)[:UPPER_CANDIDATES]
+        upper_tops, upper_bottoms, upper_scores = upper_tops[keep], upper_bottoms[keep], upper_scores[keep]
+
+        # Optional layers: index -1 stands for "none"
+        outerwear = np.append(outerwear, -1)
+        outerwear_scores = np.append(outerwear_scores, NO_OUTERWEAR_FIT[band] + 1.0)
+        shoes = np.append(shoes, -1)
+        shoe_scores = np.append(shoe_scores, NO_SHOES_FIT)
+        upper_colors = self.colors[upper_tops]
+
+        def layer_colors(rows):
+            # "None" goes with everything
+            return np.where(rows[None, :] >= 0, COLOR_COMPATIBILITY[upper_colors[:, None], self.colors[rows.clip(0)][None, :]], 1.0)
+
+        totals = (upper_scores[:, None, None]
+                  + (outerwear_scores[None, :] + COLOR_WEIGHT * layer_colors(outerwear))[:, :, None]
+                  + (shoe_scores[None, :] + COLOR_WEIGHT * layer_colors(shoes))[:, None, :])
+
+        flat = totals.ravel()
+        best = np.argpartition(-flat, k - 1)[:k] if len(flat) > k else np.arange(len(flat))
+        best = best[np.argsort(-flat[best])]
+        outfits = []
+        for index in best:
+            u, o, s = np.unravel_index(index, totals.shape)
+            outfits.append({
+                "top": int(self.ids[upper_tops[u]]),
+                "bottom": int(self.ids[upper_bottoms[u]]) if upper_bottoms[u] >= 0 else None,
+                "outerwear": int(self.ids[outerwear[o]]) if outerwear[o] >= 0 else None,
+                "shoes": int(self.ids[shoes[s]]) if shoes[s] >= 0 else None,
+                "score": round(float(flat[index]), 3),
+            })
+        return outfits
+
+
+def describe_outfit(outfit, items_by_id, occasion, weather_info):
+    """Short stylist-style notes for a locally generated outfit."""
+    def name(item_id):
+        item = items_by_id[item_id]
+        return f"{item['color']} {item['category']}".lower() if item['color'] and item['color'] != 'Default Color' else item['category'].lower()
+
+    pieces = [name(outfit['top'])]
+    if outfit.get('bottom'): pieces.append(f"paired with your {name(outfit['bottom'])}")
+    if outfit.get('outerwear'): pieces.append(f"layered under the {name(outfit['outerwear'])}")
+    notes = f"Go for your {' '.join(pieces)}"
+    if outfit.get('shoes'): notes += f", finished with the {name(outfit['shoes'])}"
+    return f"{notes}. The colours work well together, and it's a great fit for a {occasion.lower()} look in {weather_info}."
+
+
+def generate_outfit_from_wardrobe(all_items, occasion, band='mild', preferred_color=None):
     """
-    Generates a simple outfit based on the user's wardrobe and a given occasion.
+    Generates an outfit based on the user's wardrobe and a given occasion.
 
     Args:
-        all_items (list): A list of ClothingItem objects from the database.
+        all_items (list): ClothingItem objects (or dicts with id, category and color).
         occasion (str): The requested occasion (e.g., "Casual", "Formal").
 
     Returns:
-        A dictionary representing the outfit, or None if no suitable outfit can be found.
+        The best outfit as {"top": id, "bottom": id, ...}, or None if no suitable outfit can be found.
     """
-    
-    # Get the list of allowed categories for the given occasion
-    allowed_categories = OCCASION_RULES.get(occasion, [])
-    if not allowed_categories:
-        return None
-
-    # Filter the user's wardrobe to only include items matching the occasion
-    wardrobe = [item for item in all_items if item.category in allowed_categories]
-
-    # Separate the filtered wardrobe into lists by clothing type
-    tops = [item for item in wardrobe if item.category in CLOTHING_TYPES['top']]
-    bottoms = [item for item in wardrobe if item.category in CLOTHING_TYPES['bottom']]
-    
-    # --- Basic Outfit Generation Logic ---
-    # For now, we'll just try to find one top and one bottom.
-    # This can be expanded with more complex rules later!
-    
-    if not tops or not bottoms:
-        # Not enough items to make a basic outfit
-        return None
-
-    # Select a random top and bottom from the suitable items
-    selected_top = random.choice(tops)
-    selected_bottom = random.choice(bottoms)
-
-    # Return the selected outfit
-    return {
-        'top': selected_top.to_dict(),
-        'bottom': selected_bottom.to_dict(),
-        'outerwear': None # Placeholder for now
-    }
+    outfits = OutfitRecommender(all_items).recommend(occasion, band, preferred_color, k=1)
+    return outfits[0] if outfits else None
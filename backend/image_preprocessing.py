@@ -0,0 +1,76 @@
+# backend/image_preprocessing.py
+
+import numpy as np
+from PIL import Image, ImageOps
+
+# --- Configuration ---
+MODEL_INPUT_SIZE = (224, 224)
+# Big enough for the largest thumbnail (thumbnails.SIZES); JPEG draft mode decodes straight to about this size
+DECODE_SIZE = 512
+
+
+class DecodedImage:
+    """
+    One decode of an uploaded image, shared by everything that needs its pixels:
+    the classifier input, the perceptual hash, the thumbnails and color extraction.
+
+    JPEGs are decoded in draft mode, so the decoder itself scales them down by 1/2, 1/4
+    or 1/8 to the smallest size that still covers `decode_size`; a 12 MP photo never
+    exists in memory at full resolution. The image is upright (EXIF orientation applied) RGB.
+    """
+
+    def __init__(self, image, original_size):
+        self.image = image
+        self.original_size = original_size
+        self._model_pixels = None
+
+    @classmethod
+    def open(cls, source, decode_size=DECODE_SIZE):
+        """`source` is a path or a binary file object."""
+        with Image.open(source) as img:
+            original_size = img.size
+            img.draft('RGB', (decode_size, decode_size))
+            image = ImageOps.exif_transpose(img)  # Loads the pixels into a new image, rotated if needed
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        return cls(image, original_size)
+
+    def model_pixels(self):
+        """
+        The (224, 224, 3) uint8 array the classifier sees, computed once. Nearest-neighbour
+        resizing, like the keras load_img used in training. Scaling to float happens when
+        it is copied into the batch (see ml_model), so no float copy of a single image is made.
+        """
+        if self._model_pixels is None:
+            self._model_pixels = np.asarray(self.image.resize(MODEL_INPUT_SIZE, Image.NEAREST))
+        return self._model_pixels
+
+
+def preprocess_input(images):
+    """
+    MobileNetV2 scaling of 0-255 RGB pixels to [-1, 1]. The one normalization used for training
+    (both pipelines), int8 calibration and inference, so the model always sees the same input range.
+    float32 numpy batches are scaled in place; other arrays are converted first, tensors get a new one.
+    """
+    if not isinstance(images, np.ndarray):
+        return images / 127.5 - 1.0
+    if images.dtype != np.float32:
+        images = images.astype(np.float32)
+    images /= 127.5
+    images -= 1.0
+    return images
+
+
+def decode(source, decode_size=DECODE_SIZE):
+    """Returns `source` as a DecodedImage, decoding it if it's a path."""
+    return source if isinstance(source, DecodedImage) else DecodedImage.open(source, decode_size)
+
+
+def model_pixels(source):
+    """
+    The classifier input of a path or DecodedImage. Paths are decoded only as large as the model needs;
+    a uint8 array (pixels sent by a web worker to inference_server.py) is already the input.
+    """
+    if isinstance(source, np.ndarray):
+        return source
+    return decode(source, max(MODEL_INPUT_SIZE)).model_pixels()
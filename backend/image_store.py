@@ -0,0 +1,195 @@
+# backend/image_store.py
+
+import hashlib
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+from PIL import Image
+from sqlalchemy import update
+
+from image_preprocessing import decode
+from models.database import db, ClassificationCacheEntry
+
+CHUNK_SIZE = 1024 * 1024
+IN_CLAUSE_CHUNK = 500  # Keeps IN (...) lists under SQLite's bound-parameter limit
+_POPCOUNT = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.uint8)  # Set bits per byte value
+
+
+def save_content_addressed(file, upload_folder, extension):
+    """
+    Streams an uploaded file to disk under the sha256 of its bytes.
+
+    Identical uploads map to the same `<sha256>.<ext>` file, so the bytes are
+    stored once no matter how many ClothingItem rows reference them.
+    Returns (filename, sha256 hex digest, full path).
+    """
+    extension = 'jpg' if extension == 'jpeg' else extension
+    temp_path = os.path.join(upload_folder, f".{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    with open(temp_path, 'wb') as out:
+        while True:
+            chunk = file.stream.read(CHUNK_SIZE)
+            if not chunk: break
+            digest.update(chunk)
+            out.write(chunk)
+
+    sha256 = digest.hexdigest()
+    filename = f"{sha256}.{extension}"
+    file_path = os.path.join(upload_folder, filename)
+    if os.path.exists(file_path):
+        os.remove(temp_path)  # Already stored
+    else:
+        os.replace(temp_path, file_path)
+    return filename, sha256, file_path
+
+
+def perceptual_hash(image_path):
+    """
+    64-bit difference hash (dHash) as 16 hex chars, or None if the image can't be read.
+    Re-encoded or resized copies of the same photo end up a few bits apart.
+    Takes a path or an already DecodedImage; either way the hash is taken from the same
+    upright (EXIF-rotated) decode, so a photo hashes alike whichever upload path it came through.
+    """
+    try:
+        pixels = list(decode(image_path).image.resize((9, 8), Image.LANCZOS, reducing_gap=2.0).convert('L').getdata())
+    except Exception as e:
+        print(f"Error computing perceptual hash for {image_path}: {e}")
+        return None
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return f"{bits:016x}"
+
+
+class ClassificationCache:
+    """
+    Persistent classifier results keyed by the sha256 of the image bytes.
+
+    Entries live in the database so they survive restarts and are shared by all
+    workers. The cache holds at most `max_entries` rows; the least recently used
+    ones are evicted first. When a perceptual hash is given, an image within
+    `max_distance` bits of a cached one counts as a hit too.
+
+    Near-duplicate lookups compare against an in-memory array of the cached hashes
+    (XOR + popcount in numpy), reloaded every `refresh_seconds` to pick up other
+    workers' entries. Hits are remembered and their `last_used_at` written in one
+    UPDATE at most every `touch_seconds` (and before each eviction), not on every read.
+    """
+
+    def __init__(self, max_entries=10000, max_distance=4, refresh_seconds=60.0, touch_seconds=60.0):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.refresh_seconds = refresh_seconds
+        self.touch_seconds = touch_seconds
+        self._hashes = np.empty(0, dtype=np.uint64)  # Perceptual hashes of the cached entries...
+        self._shas = []  # ...and their sha256, position for position
+        self._loaded_at = None
+        self._touched = set()  # Hits whose last_used_at hasn't been written yet
+        self._touched_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def get(self, sha256, phash=None):
+        entry = ClassificationCacheEntry.query.get(sha256)
+        if entry is None and phash is not None:
+            entry = self._nearest(phash)
+        if entry is None:
+            return None
+        self._touch([entry.sha256])
+        return entry.category
+
+    def get_many(self, keys):
+        """Looks up several (sha256, phash) pairs at once. Returns {sha256: category} for the hits."""
+        shas = list({sha256 for sha256, _ in keys})
+        entries = {}
+        for start in range(0, len(shas), IN_CLAUSE_CHUNK):
+            for entry in ClassificationCacheEntry.query.filter(ClassificationCacheEntry.sha256.in_(shas[start:start + IN_CLAUSE_CHUNK])):
+                entries[entry.sha256] = entry
+        for sha256, phash in keys:
+            if sha256 not in entries and phash is not None:
+                entry = self._nearest(phash)
+                if entry is not None: entries[sha256] = entry
+        if not entries: return {}
+        self._touch([entry.sha256 for entry in entries.values()])
+        return {sha256: entry.category for sha256, entry in entries.items()}
+
+    def _nearest(self, phash):
+        hashes, shas = self._index()
+        if not len(hashes): return None
+        distances = _POPCOUNT[(hashes ^ np.uint64(int(phash, 16))).view(np.uint8)].reshape(-1, 8).sum(axis=1)
+        candidates = np.flatnonzero(distances <= self.max_distance)
+        for position in candidates[np.argsort(distances[candidates], kind='stable')]:
+            entry = ClassificationCacheEntry.query.get(shas[position])
+            if entry is not None: return entry  # Else evicted (possibly by another worker) since the index was loaded
+        return None
+
+    def _index(self):
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh_seconds:
+                rows = db.session.query(ClassificationCacheEntry.sha256, ClassificationCacheEntry.phash).filter(ClassificationCacheEntry.phash.isnot(None)).all()
+                self._shas = [sha256 for sha256, _ in rows]
+                self._hashes = np.array([int(phash, 16) for _, phash in rows], dtype=np.uint64)
+                self._loaded_at = time.monotonic()
+            return self._hashes, self._shas
+
+    def _add_to_index(self, entries):
+        with self._lock:
+            if self._loaded_at is None: return  # Loaded with them on first use
+            added = [(sha256, phash) for sha256, phash in entries if phash is not None]
+            if not added: return
+            self._shas = self._shas + [sha256 for sha256, _ in added]
+            self._hashes = np.concatenate([self._hashes, np.array([int(phash, 16) for _, phash in added], dtype=np.uint64)])
+
+    def _touch(self, shas):
+        with self._lock:
+            self._touched.update(shas)
+            due = time.monotonic() - self._touched_at >= self.touch_seconds
+        if due:
+            self._write_touched()
+            db.session.commit()
+
+    def _write_touched(self):
+        """Bumps last_used_at of the hits since the last write, in the current transaction."""
+        with self._lock:
+            shas, self._touched, self._touched_at = list(self._touched), set(), time.monotonic()
+        now = datetime.utcnow()
+        for start in range(0, len(shas), IN_CLAUSE_CHUNK):
+            db.session.execute(update(ClassificationCacheEntry)
+                               .where(ClassificationCacheEntry.sha256.in_(shas[start:start + IN_CLAUSE_CHUNK]))
+                               .values(last_used_at=now).execution_options(synchronize_session=False))
+
+    def put(self, sha256, category, phash=None):
+        self.put_many([(sha256, category, phash)])
+
+    def put_many(self, results):
+        """Stores several (sha256, category, phash) results with a single commit."""
+        if not results: return
+        results = {sha256: (category, phash) for sha256, category, phash in results}
+        shas = list(results)
+        existing = {}
+        for start in range(0, len(shas), IN_CLAUSE_CHUNK):
+            for entry in ClassificationCacheEntry.query.filter(ClassificationCacheEntry.sha256.in_(shas[start:start + IN_CLAUSE_CHUNK])):
+                existing[entry.sha256] = entry
+        now = datetime.utcnow()
+        for sha256, (category, phash) in results.items():
+            entry = existing.get(sha256)
+            if entry is None:
+                entry = ClassificationCacheEntry(sha256=sha256)
+                db.session.add(entry)
+            entry.category, entry.phash, entry.last_used_at = category, phash, now
+        self._write_touched()  # So the eviction below sees recent hits as recently used
+        db.session.flush()
+        self._evict()
+        db.session.commit()
+        self._add_to_index([(sha256, phash) for sha256, (_, phash) in results.items()])
+
+    def _evict(self):
+        overflow = ClassificationCacheEntry.query.count() - self.max_entries
+        if overflow <= 0: return
+        stale = [sha256 for (sha256,) in db.session.query(ClassificationCacheEntry.sha256)
+                 .order_by(ClassificationCacheEntry.last_used_at.asc()).limit(overflow)]
+        ClassificationCacheEntry.query.filter(ClassificationCacheEntry.sha256.in_(stale)).delete(synchronize_session=False)
@@ -0,0 +1,233 @@
+# backend/inference_server.py
+"""
+One process that owns the classifier for every web worker on the machine.
+
+Each gunicorn worker that classified in-process held its own TensorFlow runtime and model
+copy. With INFERENCE_SOCKET set, ml_model sends the 224x224 uint8 pixels of each image to
+this server over a Unix domain socket instead. The server feeds requests from all workers
+into one BatchingClassifier, so they also share batches.
+Run from the backend folder:  python inference_server.py [--socket /tmp/fashion-inference.sock]
+
+Protocol (network byte order, any number of request/response pairs per connection):
+  request   magic "FWI1", u8 op, u16 count, u16 height, u16 width, then count*height*width*3 uint8 pixels
+  response  magic "FWI1", u8 status, u16 count, u16 embedding dim, then
+            OK:    count x (u8 length, UTF-8 category), count x u8 has-embedding, count*dim float32 embeddings
+                   (native byte order: both ends are on the same machine)
+            ERROR: u16 length, UTF-8 message
+"""
+
+import argparse
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+import numpy as np
+
+# --- Configuration ---
+DEFAULT_SOCKET = '/tmp/fashion-inference.sock'
+MAGIC = b'FWI1'
+OP_CLASSIFY, OP_PING = 1, 2
+STATUS_OK, STATUS_ERROR = 0, 1
+REQUEST_HEADER = struct.Struct('!4sBHHH')
+RESPONSE_HEADER = struct.Struct('!4sBHH')
+MAX_IMAGES_PER_REQUEST = 1024
+
+
+class ProtocolError(ConnectionError):
+    """The peer sent something that isn't this protocol, or hung up mid-message."""
+
+
+class InferenceError(RuntimeError):
+    """The server got the request but couldn't classify it (e.g. one bad batch); it is still up."""
+
+
+def recv_exact(sock, size):
+    """Reads exactly `size` bytes into one writable buffer."""
+    buffer = bytearray(size)
+    view, received = memoryview(buffer), 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            raise ProtocolError("Connection closed mid-message" if received else "Connection closed")
+        received += n
+    return buffer
+
+
+def encode_results(results):
+    """[(category, embedding or None)] -> OK response bytes."""
+    dims = {len(embedding) for _, embedding in results if embedding is not None}
+    dim = dims.pop() if len(dims) == 1 else 0
+    names = [category.encode()[:255] for category, _ in results]
+    parts = [RESPONSE_HEADER.pack(MAGIC, STATUS_OK, len(results), dim)]
+    parts += [bytes([len(name)]) + name for name in names]
+    parts.append(bytes(int(dim > 0 and embedding is not None) for _, embedding in results))
+    if dim:
+        embeddings = np.zeros((len(results), dim), dtype=np.float32)
+        for row, (_, embedding) in enumerate(results):
+            if embedding is not None: embeddings[row] = embedding
+        parts.append(embeddings.tobytes())
+    return b''.join(parts)
+
+
+def encode_error(message):
+    message = message.encode()[:65535]
+    return RESPONSE_HEADER.pack(MAGIC, STATUS_ERROR, 0, 0) + struct.pack('!H', len(message)) + message
+
+
+# --- Server ---
+
+class _ConnectionHandler(socketserver.BaseRequestHandler):
+    """Serves one web worker connection until it hangs up."""
+
+    def handle(self):
+        while True:
+            try:
+                magic, op, count, height, width = REQUEST_HEADER.unpack(recv_exact(self.request, REQUEST_HEADER.size))
+            except ProtocolError:
+                return
+            if magic != MAGIC:
+                return  # Not a client of ours; drop the connection
+            if op == OP_PING:
+                self.request.sendall(RESPONSE_HEADER.pack(MAGIC, STATUS_OK, 0, 0))
+                continue
+            if op != OP_CLASSIFY or count > MAX_IMAGES_PER_REQUEST or (height, width) != self.server.image_size:
+                self.request.sendall(encode_error(f"Bad request: op {op}, {count} image(s) of {height}x{width}"))
+                return
+            try:
+                pixels = np.frombuffer(recv_exact(self.request, count * height * width * 3), dtype=np.uint8)
+            except ProtocolError:
+                return
+            images = list(pixels.reshape(count, height, width, 3))
+            try:
+                response = encode_results(self.server.analyze_images(images))
+            except Exception as e:
+                print(f"Error classifying {count} image(s): {e}")
+                response = encode_error(str(e))
+            self.request.sendall(response)
+
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, analyze_images, image_size=(224, 224)):
+        self.analyze_images = analyze_images
+        self.image_size = image_size
+        if os.path.exists(socket_path): os.remove(socket_path)  # Left over from a previous run
+        super().__init__(socket_path, _ConnectionHandler)
+        os.chmod(socket_path, 0o660)  # Only this user and group (the web workers) may connect
+
+
+# --- Client, used by ml_model in each web worker ---
+
+class InferenceClient:
+    """
+    Talks to the inference server over one persistent connection per thread.
+    After a transport failure the server is considered down for `retry_after` seconds, so callers
+    fall back to in-process inference without waiting on a dead socket every time. An error the
+    server reports about a request (InferenceError) doesn't mark it down.
+    """
+
+    def __init__(self, socket_path, timeout=30.0, retry_after=10.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._down_until = 0.0
+        self._local = threading.local()
+
+    def available(self):
+        return time.monotonic() >= self._down_until
+
+    def analyze(self, images):
+        """
+        Classifies (height, width, 3) uint8 pixel arrays. Returns one (category, embedding or None)
+        per image, in order. Raises OSError when the server can't be reached, InferenceError when it
+        couldn't classify the images.
+        """
+        if not images: return []
+        height, width = images[0].shape[:2]
+        return self._call(REQUEST_HEADER.pack(MAGIC, OP_CLASSIFY, len(images), height, width),
+                          [np.ascontiguousarray(image, dtype=np.uint8) for image in images])
+
+    def ping(self):
+        """True if the server answers."""
+        try:
+            return self._call(REQUEST_HEADER.pack(MAGIC, OP_PING, 0, 0, 0), []) == []
+        except OSError:
+            return False
+
+    def _call(self, header, payloads):
+        for attempt in range(2):
+            reused = getattr(self._local, 'sock', None) is not None
+            try:
+                sock = self._connection()
+                sock.sendall(header)
+                for payload in payloads:
+                    sock.sendall(payload)  # Straight from the array's buffer, no joined copy
+                return self._read_response(sock)
+            except InferenceError:
+                self._close()  # The server may hang up after rejecting a request; start the next call afresh
+                raise
+            except OSError:
+                self._close()
+                if reused and attempt == 0: continue  # The server may have restarted since this connection was opened
+                self._down_until = time.monotonic() + self.retry_after
+                raise
+
+    def _connection(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, 'sock', None)
+        self._local.sock = None
+        if sock is not None: sock.close()
+
+    @staticmethod
+    def _read_response(sock):
+        magic, status, count, dim = RESPONSE_HEADER.unpack(recv_exact(sock, RESPONSE_HEADER.size))
+        if magic != MAGIC: raise ProtocolError("Unexpected response from the inference server")
+        if status != STATUS_OK:
+            (length,) = struct.unpack('!H', recv_exact(sock, 2))
+            raise InferenceError(f"Inference server error: {recv_exact(sock, length).decode(errors='replace')}")
+        names = []
+        for _ in range(count):
+            names.append(recv_exact(sock, recv_exact(sock, 1)[0]).decode())
+        has_embedding = recv_exact(sock, count) if count else b''
+        embeddings = np.frombuffer(recv_exact(sock, count * dim * 4), dtype=np.float32).reshape(count, dim) if dim else None
+        return [(name, embeddings[i] if dim and has_embedding[i] else None) for i, name in enumerate(names)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--socket', default=os.getenv('INFERENCE_SOCKET') or DEFAULT_SOCKET)
+    args = parser.parse_args()
+
+    import ml_model
+    ml_model.inference_client = None  # This process is the server: always classify in-process
+    if not ml_model.model_loader.load():
+        print("⚠️ Model not available; every image will be answered as Uncategorized.")
+    server = InferenceServer(args.socket, ml_model.analyze_images, ml_model.IMAGE_SIZE)
+    print(f"✅ Inference server listening on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(args.socket): os.remove(args.socket)
+
+
+if __name__ == '__main__':
+    main()
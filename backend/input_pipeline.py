@@ -0,0 +1,115 @@
+# backend/input_pipeline.py
+
+import hashlib
+import os
+import random
+
+import numpy as np
+import tensorflow as tf
+
+from image_preprocessing import preprocess_input
+
+# --- Configuration ---
+DATASET_DIR = 'dataset'
+IMAGE_SIZE = (224, 224)
+BATCH_SIZE = 32
+VALIDATION_SPLIT = 0.2
+SEED = 42
+CACHE_DIR = 'tfdata_cache'  # Decoded, resized images, written during the first epoch and read back afterwards
+SHUFFLE_BUFFER = 2048
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+# --- Dataset listing and the seeded train/validation split ---
+
+def list_dataset(dataset_dir=DATASET_DIR):
+    """
+    Returns (paths, labels, class_indices) for every image in the class folders of dataset_dir.
+    Classes are numbered alphabetically, like flow_from_directory does.
+    """
+    classes = sorted(d for d in os.listdir(dataset_dir) if os.path.isdir(os.path.join(dataset_dir, d)))
+    class_indices = {name: i for i, name in enumerate(classes)}
+    paths, labels = [], []
+    for name in classes:
+        class_dir = os.path.join(dataset_dir, name)
+        for filename in sorted(os.listdir(class_dir)):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(class_dir, filename))
+                labels.append(class_indices[name])
+    return paths, np.array(labels, dtype=np.int32), class_indices
+
+
+def split_dataset(paths, labels, validation_split=VALIDATION_SPLIT, seed=SEED):
+    """Shuffles with a fixed seed and splits per class, so the same images always land in validation."""
+    rng = random.Random(seed)
+    train, validation = [], []
+    for label in sorted(set(labels.tolist())):
+        indices = [i for i, l in enumerate(labels) if l == label]
+        rng.shuffle(indices)
+        n_validation = int(round(len(indices) * validation_split))
+        validation += indices[:n_validation]
+        train += indices[n_validation:]
+    return sorted(train), sorted(validation)
+
+
+# --- tf.data pipeline ---
+
+def decode_and_resize(path, label):
+    image = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+    image = tf.image.resize(image, IMAGE_SIZE)
+    return tf.cast(tf.clip_by_value(tf.round(image), 0, 255), tf.uint8), label  # uint8 keeps the cache 4x smaller
+
+
+def make_augmenter(seed=SEED):
+    """
+    Random flip / rotation / shift / zoom, applied to whole batches at once.
+    The same ranges as the ImageDataGenerator pipeline, minus shear, which has no vectorized equivalent here.
+    """
+    return tf.keras.Sequential([
+        tf.keras.layers.RandomFlip('horizontal', seed=seed),
+        tf.keras.layers.RandomRotation(20 / 360, fill_mode='nearest', seed=seed),
+        tf.keras.layers.RandomTranslation(0.2, 0.2, fill_mode='nearest', seed=seed),
+        tf.keras.layers.RandomZoom(0.2, fill_mode='nearest', seed=seed),
+    ])
+
+
+def build_dataset(paths, labels, num_classes, training, batch_size=BATCH_SIZE, cache_path=None, seed=SEED):
+    """
+    paths -> parallel decode + resize -> cache -> (shuffle) -> batch -> (augment) -> rescale -> prefetch.
+    cache_path=None caches in memory; '' disables caching.
+    """
+    ds = tf.data.Dataset.from_tensor_slices((list(paths), np.asarray(labels, dtype=np.int32)))
+    ds = ds.map(decode_and_resize, num_parallel_calls=tf.data.AUTOTUNE, deterministic=True)
+    if cache_path is not None and cache_path != '':
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        ds = ds.cache(cache_path)
+    elif cache_path is None:
+        ds = ds.cache()
+    if training:
+        ds = ds.shuffle(min(SHUFFLE_BUFFER, len(paths)), seed=seed, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size, num_parallel_calls=tf.data.AUTOTUNE)
+    if training:
+        augmenter = make_augmenter(seed)
+        ds = ds.map(lambda images, y: (augmenter(tf.cast(images, tf.float32), training=True), y), num_parallel_calls=tf.data.AUTOTUNE)
+    # Same normalization as the generator pipeline and inference ([-1, 1]), and one-hot labels for categorical_crossentropy
+    ds = ds.map(lambda images, y: (preprocess_input(tf.cast(images, tf.float32)), tf.one_hot(y, num_classes)), num_parallel_calls=tf.data.AUTOTUNE)
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+
+def make_datasets(dataset_dir=DATASET_DIR, batch_size=BATCH_SIZE, cache_dir=CACHE_DIR, seed=SEED, validation_split=VALIDATION_SPLIT):
+    """
+    Returns (train_ds, validation_ds, class_indices). The split is seeded, so reruns train and
+    validate on the same images. The on-disk caches are keyed on the files and the split.
+    """
+    paths, labels, class_indices = list_dataset(dataset_dir)
+    train_indices, validation_indices = split_dataset(paths, labels, validation_split, seed)
+    num_classes = len(class_indices)
+    # Any added, removed or modified image (or a different split) gives a new cache file
+    fingerprint = hashlib.sha1(repr([(p, os.path.getsize(p), os.path.getmtime(p)) for p in paths]).encode()).hexdigest()[:12]
+    cache_key = f"seed{seed}-split{validation_split}-{fingerprint}"
+
+    def subset(indices, name, training):
+        cache_path = os.path.join(cache_dir, f"{name}-{cache_key}") if cache_dir else ''
+        return build_dataset([paths[i] for i in indices], labels[indices], num_classes, training, batch_size, cache_path, seed)
+
+    return subset(train_indices, 'train', True), subset(validation_indices, 'validation', False), class_indices
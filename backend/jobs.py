@@ -0,0 +1,69 @@
+# backend/jobs.py
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobQueueFull(Exception):
+    """Raised when more jobs are pending than the queue is allowed to hold."""
+
+
+class JobQueue:
+    """
+    Runs background jobs (e.g. classifying an upload) on a bounded thread pool.
+
+    Every job gets an id whose status can be looked up while it runs and for a
+    while after it finishes. At most `max_pending` jobs may be queued or running;
+    beyond that `submit` raises JobQueueFull so the caller can shed load.
+    """
+
+    def __init__(self, max_workers=2, max_pending=100, max_finished=1000):
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-worker")
+        self._jobs = OrderedDict()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **metadata):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFull(f"{self._pending} jobs are already pending")
+            self._pending += 1
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {"id": job_id, "status": "pending", "result": None, "error": None,
+                                  "created_at": time.time(), "finished_at": None, **metadata}
+        self._executor.submit(self._run, job_id, fn, args)
+        return job_id
+
+    def _run(self, job_id, fn, args):
+        self._update(job_id, status="running")
+        try:
+            result = fn(*args)
+            self._update(job_id, status="done", result=result)
+        except Exception as e:
+            print(f"Background job {job_id} failed: {e}")
+            self._update(job_id, status="failed", error=str(e))
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._jobs[job_id]["finished_at"] = time.time()
+                self._forget_old_jobs()
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def _forget_old_jobs(self):
+        # Keep only the most recent `max_finished` finished jobs around for status lookups
+        finished = [job_id for job_id, job in self._jobs.items() if job["finished_at"] is not None]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
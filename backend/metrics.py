@@ -0,0 +1,220 @@
+# backend/metrics.py
+"""
+Hot-path instrumentation: `stage()` timers around the steps of a request (or a background
+job), database query counts per request, Prometheus histograms served at /metrics, and an
+opt-in sampling profiler that saves folded stacks of slow requests for a flame graph
+(flamegraph.pl, speedscope or inferno read them directly).
+
+Metrics are kept in process memory: with several gunicorn workers each exposes its own.
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# --- Configuration ---
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+MAX_STACK_DEPTH = 128
+
+
+class Histogram:
+    """A Prometheus histogram with labels: cumulative buckets, a sum and a count per label set."""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [count per bucket (last one is +Inf), sum]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(key, list(counts), total) for key, (counts, total) in sorted(self._series.items())]
+        for key, counts, total in series:
+            labels = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+            cumulative = 0
+            for bound, count in zip([*self.buckets, '+Inf'], counts):
+                cumulative += count
+                le = 'le="{}"'.format(bound if bound == '+Inf' else f"{bound:g}")
+                lines.append(f"{self.name}_bucket{{{','.join([*labels, le])}}} {cumulative}")
+            suffix = f"{{{','.join(labels)}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {total:.6g}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return "\n".join(lines)
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REGISTRY = []
+REQUEST_SECONDS = Histogram('fashion_http_request_duration_seconds', "Time to handle a request, streamed bodies included.",
+                            ['method', 'endpoint', 'status'])
+STAGE_SECONDS = Histogram('fashion_stage_duration_seconds', "Time spent in each instrumented stage of a request or background job.",
+                          ['stage'])
+REQUEST_QUERIES = Histogram('fashion_db_queries_per_request', "Database queries executed per request.", ['endpoint'], QUERY_BUCKETS)
+REQUEST_DB_SECONDS = Histogram('fashion_db_duration_seconds', "Time spent executing database queries per request.", ['endpoint'])
+INFERENCE_BATCH_SIZE = Histogram('fashion_inference_batch_size', "Images per forward pass of the in-process classifier.",
+                                 buckets=BATCH_BUCKETS)
+
+
+def render_metrics():
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+@contextmanager
+def stage(name):
+    """
+    Times a block (or, as a decorator, a function) into the stage histogram and, inside a
+    request, into that request's Server-Timing header. Nested stages are each counted in full.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        if has_request_context():
+            stages = g.get('metrics_stages')
+            if stages is not None: stages[name] = stages.get(name, 0.0) + elapsed
+
+
+# --- Database queries per request ---
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['metrics_query_started'].pop()
+    if has_request_context() and 'metrics_queries' in g:
+        g.metrics_queries += 1
+        g.metrics_db_seconds += elapsed
+
+
+# --- Slow request profiler ---
+
+class SlowRequestProfiler:
+    """
+    Samples the Python stack of every thread that is handling a request, every `interval_ms`.
+    When a request turns out slower than `threshold_ms`, its samples are written to `folder`
+    as folded stacks ("frame;frame;frame count" per line); faster requests' samples are dropped.
+    Work done for the request on other threads (the inference worker, Gemini's HTTP pool) shows
+    up as the request thread waiting on it.
+    """
+
+    def __init__(self, folder, threshold_ms, interval_ms=5.0):
+        self.folder = folder
+        self.threshold_ms = threshold_ms
+        self.interval = max(interval_ms, 1.0) / 1000.0
+        self._active = {}  # thread id -> Counter of folded stacks
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def begin(self):
+        with self._lock:
+            self._active[threading.get_ident()] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="slow-request-profiler", daemon=True)
+                self._thread.start()
+
+    def end(self, thread_id, name, elapsed_ms):
+        """Stops sampling a thread; returns the profile's path if its request was slow."""
+        with self._lock:
+            samples = self._active.pop(thread_id, None)
+        if not samples or elapsed_ms < self.threshold_ms: return None
+        os.makedirs(self.folder, exist_ok=True)
+        path = os.path.join(self.folder, f"{time.strftime('%Y%m%d-%H%M%S')}-{re.sub(r'[^A-Za-z0-9_.-]', '_', name)}-{elapsed_ms:.0f}ms-{uuid.uuid4().hex[:6]}.folded")
+        with open(path, 'w') as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in samples.most_common())
+        return path
+
+    def _run(self):
+        own = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, samples in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None and thread_id != own: samples[self.fold(frame)] += 1
+
+    @staticmethod
+    def fold(frame):
+        """Root-first "file:function" frames joined by ';'."""
+        names = []
+        while frame is not None and len(names) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+
+# --- Flask integration ---
+
+def init_app(app):
+    """Times every request, counts its queries, and serves /metrics (all per METRICS_ENABLED and the PROFILE_* settings)."""
+    if not app.config['METRICS_ENABLED']: return
+    profiler = None
+    if app.config['PROFILE_SLOW_REQUEST_MS'] > 0:
+        profiler = SlowRequestProfiler(app.config['PROFILE_FOLDER'], app.config['PROFILE_SLOW_REQUEST_MS'], app.config['PROFILE_SAMPLE_INTERVAL_MS'])
+        print(f"⏱️ Profiling requests slower than {app.config['PROFILE_SLOW_REQUEST_MS']:g}ms into {app.config['PROFILE_FOLDER']}/")
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        g.metrics_stages, g.metrics_queries, g.metrics_db_seconds = {}, 0, 0.0
+        if profiler: profiler.begin()
+
+    @app.after_request
+    def finish_request_metrics(response):
+        if 'metrics_started' not in g: return response
+        if app.config['SERVER_TIMING']:
+            timings = [f'db;dur={g.metrics_db_seconds * 1000:.1f};desc="{g.metrics_queries} queries"']
+            timings += [f"{name};dur={seconds * 1000:.1f}" for name, seconds in g.metrics_stages.items()]
+            timings.append(f"app;dur={(time.perf_counter() - g.metrics_started) * 1000:.1f}")
+            response.headers['Server-Timing'] = ", ".join(timings)
+
+        # Recorded once the body has been sent, so streamed responses (and the queries they run) are included
+        state, method, path, endpoint = g._get_current_object(), request.method, request.path, request.endpoint or 'unmatched'
+        thread_id, status = threading.get_ident(), response.status_code
+
+        def record():
+            elapsed = time.perf_counter() - state.metrics_started
+            REQUEST_SECONDS.observe(elapsed, method=method, endpoint=endpoint, status=status)
+            REQUEST_QUERIES.observe(state.metrics_queries, endpoint=endpoint)
+            REQUEST_DB_SECONDS.observe(state.metrics_db_seconds, endpoint=endpoint)
+            profile = profiler.end(thread_id, endpoint, elapsed * 1000) if profiler else None
+            if profile: print(f"🐢 {method} {path} took {elapsed * 1000:.0f}ms ({state.metrics_queries} queries); profile saved to {profile}")
+
+        response.call_on_close(record)
+        return response
+
+    app.add_url_rule('/metrics', 'metrics', lambda: Response(render_metrics(), mimetype='text/plain; version=0.0.4'))
@@ -0,0 +1,105 @@
+# backend/migrations.py
+"""
+Versioned schema changes for databases created before a model changed.
+db.create_all() only creates missing tables, so new indexes and column changes on
+existing tables are applied here, in order, and recorded in the schema_version table.
+Run with `flask db-upgrade`; the app also runs it at startup unless DB_AUTO_MIGRATE=false.
+"""
+
+import json
+
+from sqlalchemy import inspect, text
+
+from models.database import db, SchemaVersion
+
+MIGRATIONS = []
+
+
+def migration(version):
+    def register(fn):
+        MIGRATIONS.append((version, fn))
+        return fn
+    return register
+
+
+def current_version():
+    return db.session.query(SchemaVersion.version).filter(SchemaVersion.id == 1).scalar() or 0
+
+
+def upgrade():
+    """Applies every migration newer than the database's schema version. Returns the versions applied."""
+    db.create_all()  # Makes sure schema_version (and any brand new table) exists
+    applied = []
+    for version, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version <= current_version(): continue
+        print(f"Applying migration {version}: {fn.__doc__.strip().splitlines()[0]}")
+        fn()
+        state = db.session.get(SchemaVersion, 1) or SchemaVersion(id=1)
+        state.version = version
+        db.session.add(state)
+        db.session.commit()
+        applied.append(version)
+    return applied
+
+
+def create_index(table, name, *columns):
+    """CREATE INDEX unless it exists already (databases made by create_all() after the model change have it)."""
+    if any(index['name'] == name for index in inspect(db.engine).get_indexes(table)): return
+    db.session.execute(text(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})"))
+
+
+def add_column(table, name, column_type):
+    """ALTER TABLE ... ADD COLUMN unless the column exists already."""
+    if any(column['name'] == name for column in inspect(db.engine).get_columns(table)): return
+    db.session.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}"))
+
+
+# --- Migrations ---
+
+@migration(1)
+def clothing_filter_indexes():
+    """Indexes behind the /clothes category and color filters."""
+    create_index('clothing_item', 'ix_clothing_item_category_id', 'category', 'id')
+    create_index('clothing_item', 'ix_clothing_item_color_id', 'color', 'id')
+
+
+@migration(2)
+def chat_history_indexes_and_json_outfits():
+    """Chat pagination indexes, and outfit_data stored as JSON instead of a JSON string in a Text column."""
+    create_index('chat_session', 'ix_chat_session_created_at', 'created_at')
+    create_index('chat_message', 'ix_chat_message_session_id_created_at', 'session_id', 'created_at')
+
+    # Clean up rows the JSON type could not read: empty strings, invalid JSON, strings encoded twice
+    fixes = []
+    for message_id, raw in db.session.execute(text("SELECT id, outfit_data FROM chat_message WHERE outfit_data IS NOT NULL")):
+        if not isinstance(raw, str): continue  # Already a native JSON value
+        try:
+            value = json.loads(raw) if raw.strip() else None
+            if isinstance(value, str): value = json.loads(value)
+        except ValueError:
+            print(f"Dropping unreadable outfit_data of chat message {message_id}")
+            value = None
+        normalized = json.dumps(value) if value else None
+        if normalized != raw: fixes.append({"id": message_id, "outfit_data": normalized})
+    if fixes:
+        db.session.execute(text("UPDATE chat_message SET outfit_data = :outfit_data WHERE id = :id"), fixes)
+
+    # SQLite stores JSON as text either way; other databases get a real JSON column
+    column = next(c for c in inspect(db.engine).get_columns('chat_message') if c['name'] == 'outfit_data')
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql' and 'JSON' not in str(column['type']).upper():
+        db.session.execute(text("ALTER TABLE chat_message ALTER COLUMN outfit_data TYPE JSON USING outfit_data::json"))
+    elif dialect == 'mysql' and 'JSON' not in str(column['type']).upper():
+        db.session.execute(text("ALTER TABLE chat_message MODIFY outfit_data JSON NULL"))
+
+
+@migration(3)
+def clothing_color_vector():
+    """Extracted dominant color of each item as a CIELAB vector (fill it in with `flask backfill-colors`)."""
+    add_column('clothing_item', 'color_lab', 'JSON' if db.engine.dialect.name in ('postgresql', 'mysql', 'sqlite') else 'TEXT')
+
+
+@migration(4)
+def clothing_filename_index():
+    """Index on clothing_item.filename, looked up on every upload (shared images) and delete."""
+    create_index('clothing_item', 'ix_clothing_item_filename', 'filename')
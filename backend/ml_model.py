@@ -1,65 +1,339 @@
 # backend/ml_model.py
 
-import tensorflow as tf
-from tensorflow.keras.preprocessing import image
-from tensorflow.keras.applications.mobilenet_v2 import preprocess_input
 import numpy as np
 import os
 import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from image_preprocessing import model_pixels, preprocess_input
+from metrics import stage, INFERENCE_BATCH_SIZE
+from inference_server import InferenceClient, InferenceError
 
 # --- Configuration ---
 MODEL_PATH = 'fashion_model.h5'
 CLASS_INDICES_PATH = 'class_indices.json'
+IMAGE_SIZE = (224, 224)
+# Uploads that arrive within MAX_WAIT_MS of each other share one forward pass.
+MAX_BATCH_SIZE = int(os.getenv('INFERENCE_MAX_BATCH_SIZE', '16'))
+MAX_WAIT_MS = float(os.getenv('INFERENCE_MAX_WAIT_MS', '10'))
+# Run one dummy prediction right after loading so the first real upload isn't slow.
+WARMUP_ON_LOAD = os.getenv('MODEL_WARMUP', 'true').lower() == 'true'
+# 'keras' loads MODEL_PATH with TensorFlow; 'tflite' runs a quantized export made by train_model.py,
+# which only needs the small tflite-runtime package instead of all of TensorFlow.
+INFERENCE_RUNTIME = os.getenv('INFERENCE_RUNTIME', 'keras')
+TFLITE_MODEL_PATH = os.getenv('TFLITE_MODEL_PATH', 'fashion_model_int8.tflite')
+TFLITE_THREADS = int(os.getenv('TFLITE_THREADS', '0')) or None  # None: let TFLite decide
+# Unix socket of a shared inference_server.py; when set, web workers don't load the model themselves
+INFERENCE_SOCKET = os.getenv('INFERENCE_SOCKET', '')
+INFERENCE_SOCKET_TIMEOUT = float(os.getenv('INFERENCE_SOCKET_TIMEOUT', '30'))
+
+
+class TFLiteModel:
+    """
+    Runs a .tflite export behind the same predict_on_batch interface as the Keras models.
+    With an embedding output in the export it returns [features, probabilities], like the feature model.
+    """
+
+    def __init__(self, model_path, num_classes, num_threads=TFLITE_THREADS):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        outputs = self.interpreter.get_output_details()
+        self.probabilities = next(o for o in outputs if o['shape'][-1] == num_classes)
+        self.features = next((o for o in outputs if o['shape'][-1] != num_classes), None)
+        self.batch_size = int(self.input['shape'][0])
+
+    def predict_on_batch(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        if len(batch) != self.batch_size:
+            self.interpreter.resize_tensor_input(self.input['index'], batch.shape)
+            self.interpreter.allocate_tensors()
+            self.input = self.interpreter.get_input_details()[0]
+            self.batch_size = len(batch)
+        scale, zero_point = self.input['quantization']
+        if self.input['dtype'] != np.float32 and scale:
+            batch = np.clip(np.round(batch / scale + zero_point), np.iinfo(self.input['dtype']).min, np.iinfo(self.input['dtype']).max)
+        self.interpreter.set_tensor(self.input['index'], batch.astype(self.input['dtype']))
+        self.interpreter.invoke()
+        probabilities = self._output(self.probabilities)
+        return probabilities if self.features is None else [self._output(self.features), probabilities]
+
+    def _output(self, detail):
+        value = self.interpreter.get_tensor(detail['index'])
+        scale, zero_point = detail['quantization']
+        return (value.astype(np.float32) - zero_point) * scale if detail['dtype'] != np.float32 and scale else value.copy()
+
+
+class ModelLoader:
+    """
+    Loads the custom model and class mappings on first use instead of at import time.
+
+    TensorFlow is only imported inside `load()`, so code that never classifies
+    anything (the web tier serving /clothes and /chats, CLIs, tests) doesn't pay
+    for it. `status()` reports the load state and how long loading took.
+    """
+
+    def __init__(self, model_path=None, class_indices_path=CLASS_INDICES_PATH, warmup=WARMUP_ON_LOAD, runtime=INFERENCE_RUNTIME):
+        self.runtime = runtime
+        self.model_path = model_path or (TFLITE_MODEL_PATH if runtime == 'tflite' else MODEL_PATH)
+        self.class_indices_path = class_indices_path
+        self.warmup = warmup
+        self.state = 'not_loaded'  # 'not_loaded' | 'loading' | 'ready' | 'failed'
+        self.error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.model = None
+        self.feature_model = None
+        self.index_to_class = {}
+        self.preprocess_input = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self.state == 'ready'
+
+    def load(self):
+        """Loads the model if it isn't loaded yet. Safe to call from many threads."""
+        if self.state in ('ready', 'failed'):
+            return self.ready
+        with self._lock:
+            if self.state in ('ready', 'failed'):
+                return self.ready
+            self.state = 'loading'
+            started = time.perf_counter()
+            try:
+                # Load the class indices file that was saved during training
+                with open(self.class_indices_path, 'r') as f:
+                    class_indices = json.load(f)
+
+                if self.runtime == 'tflite':
+                    model = TFLiteModel(self.model_path, num_classes=len(class_indices))
+                    feature_model = model if model.features is not None else None
+                else:
+                    import tensorflow as tf
+
+                    # Load our newly trained model
+                    model = tf.keras.models.load_model(self.model_path)
+                    feature_model = self._build_feature_model(tf, model)
+
+                # Invert the dictionary to map the model's output index back to a category name
+                # e.g., {'0': 'T-Shirt', '1': 'Jeans', ...}
+                self.index_to_class = {str(v): k for k, v in class_indices.items()}
+                self.preprocess_input = preprocess_input
+                self.model = model
+                self.feature_model = feature_model
+                self.load_seconds = time.perf_counter() - started
+                print(f"✅ Custom fashion model ({self.runtime}) and class indices loaded successfully in {self.load_seconds:.2f}s.")
+
+                if self.warmup:
+                    self._warm_up()
+                self.state = 'ready'
+
+            except Exception as e:
+                print(f"❌ Error loading custom model: {e}")
+                print(f"Uploads will be saved as 'Uncategorized' until it loads. Please ensure '{self.model_path}' and '{self.class_indices_path}' exist.")
+                self.model = None
+                self.feature_model = None
+                self.index_to_class = {}
+                self.error = str(e)
+                self.load_seconds = time.perf_counter() - started
+                self.state = 'failed'
+        return self.ready
+
+    @staticmethod
+    def _build_feature_model(tf, model):
+        """
+        Wraps the classifier so one forward pass returns both the pooled MobileNetV2
+        features (used as the item's embedding) and the class probabilities.
+        """
+        pooling = [layer for layer in model.layers if isinstance(layer, tf.keras.layers.GlobalAveragePooling2D)]
+        if not pooling:
+            print("Model has no pooling layer; similarity search will be unavailable.")
+            return None
+        return tf.keras.Model(inputs=model.inputs, outputs=[pooling[-1].output, model.output])
+
+    def load_in_background(self):
+        """Starts loading on a daemon thread so the web tier can serve requests meanwhile."""
+        thread = threading.Thread(target=self.load, name="model-loader", daemon=True)
+        thread.start()
+        return thread
+
+    def _warm_up(self):
+        started = time.perf_counter()
+        # Through predict() itself, so the model that serves requests (feature_model when there is one) gets traced
+        self.predict(np.zeros((1, *IMAGE_SIZE, 3), dtype=np.float32))
+        self.warmup_seconds = time.perf_counter() - started
+        print(f"✅ Model warm-up pass finished in {self.warmup_seconds:.2f}s.")
+
+    def predict(self, images):
+        """
+        One forward pass over a (n, 224, 224, 3) batch of RGB pixels.
+        Returns (category per image, embedding per image); embeddings are None when the model has none.
+        """
+        batch_input = self.preprocess_input(images)
+        if self.feature_model is not None:
+            features, predictions = self.feature_model.predict_on_batch(batch_input)
+            features = np.asarray(features, dtype=np.float32)
+        else:
+            predictions, features = self.model.predict_on_batch(batch_input), [None] * len(images)
+        predicted_indices = np.argmax(np.asarray(predictions), axis=1)
+        return [self.index_to_class.get(str(i), "Uncategorized") for i in predicted_indices], features
+
+    def status(self):
+        if inference_client is not None and self.state == 'not_loaded':
+            # The shared server does the inference; this worker only loads the model as a fallback
+            ready = inference_client.ping()
+            return {"state": "remote" if ready else "remote_unavailable", "ready": ready, "runtime": "inference_server",
+                    "socket": inference_client.socket_path, "model_path": self.model_path, "load_seconds": None,
+                    "warmup_seconds": None, "error": None}
+        return {
+            "state": self.state,
+            "ready": self.ready,
+            "runtime": self.runtime,
+            "model_path": self.model_path,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "warmup_seconds": round(self.warmup_seconds, 3) if self.warmup_seconds is not None else None,
+            "error": self.error,
+        }
+
 
-# --- Load the Custom Model and Class Mappings ---
-try:
-    # Load our newly trained model
-    model = tf.keras.models.load_model(MODEL_PATH)
-    
-    # Load the class indices file that was saved during training
-    with open(CLASS_INDICES_PATH, 'r') as f:
-        class_indices = json.load(f)
-    
-    # Invert the dictionary to map the model's output index back to a category name
-    # e.g., {'0': 'T-Shirt', '1': 'Jeans', ...}
-    index_to_class = {str(v): k for k, v in class_indices.items()}
-    
-    print("✅ Custom fashion model and class indices loaded successfully.")
-
-except Exception as e:
-    print(f"❌ Error loading custom model: {e}")
-    print("Falling back to the generic model. Please ensure 'fashion_model.h5' and 'class_indices.json' exist.")
-    model = None
-    index_to_class = {}
+model_loader = ModelLoader()
+
+
+class BatchingClassifier:
+    """
+    Background inference worker.
+
+    Callers submit image paths (or DecodedImages from image_preprocessing) and get a Future of (category, embedding) back.
+    A single worker thread drains the queue, groups up to `max_batch_size` images
+    (waiting at most `max_wait_ms` for the batch to fill up), and runs one forward
+    pass per batch.
+    """
+
+    def __init__(self, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, image):
+        future = Future()
+        self._ensure_started()
+        self._queue.put((image, future))
+        return future
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="inference-worker", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._process_batch(batch)
+
+    def _process_batch(self, batch):
+        # Each image's uint8 pixels are cast straight into one float32 batch buffer, then scaled in place
+        pixels, futures = np.empty((len(batch), *IMAGE_SIZE, 3), dtype=np.float32), []
+        with stage('classify.preprocess'):
+            for image, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    pixels[len(futures)] = model_pixels(image)
+                    futures.append(future)
+                except Exception as e:
+                    print(f"Error loading image {image}: {e}")
+                    future.set_result(("Uncategorized", None))
+        if not futures:
+            return
+
+        try:
+            # One forward pass for the whole batch
+            INFERENCE_BATCH_SIZE.observe(len(futures))
+            with stage('classify.predict'):
+                categories, features = model_loader.predict(pixels[:len(futures)])
+        except Exception as e:
+            print(f"Error during custom classification: {e}")
+            for future in futures:
+                future.set_result(("Uncategorized", None))
+            return
+
+        for future, category, embedding in zip(futures, categories, features):
+            future.set_result((category, embedding))
+
+
+classifier = BatchingClassifier()
+inference_client = InferenceClient(INFERENCE_SOCKET, timeout=INFERENCE_SOCKET_TIMEOUT) if INFERENCE_SOCKET else None
+
+
+def _analyze_remotely(images):
+    """Classifies on the inference server. Images that can't be read are Uncategorized; raises OSError if the server is down."""
+    results, pixels, loaded = [("Uncategorized", None)] * len(images), [], []
+    for i, image in enumerate(images):
+        try:
+            pixels.append(model_pixels(image))
+            loaded.append(i)
+        except Exception as e:
+            print(f"Error loading image {image}: {e}")
+    with stage('classify.remote'):
+        remote_results = inference_client.analyze(pixels)
+    for i, result in zip(loaded, remote_results):
+        results[i] = result
+    return results
+
+
+def analyze_images(image_paths):
+    """
+    Runs the model over several images (paths, DecodedImages or their model_pixels arrays) at once. Returns one
+    (category, embedding) pair per image, in order; the embedding is None when it isn't available.
+    With INFERENCE_SOCKET set this goes to the shared inference server, falling back to the
+    in-process model while the server can't be reached.
+    """
+    if inference_client is not None and inference_client.available():
+        try:
+            return _analyze_remotely(image_paths)
+        except InferenceError as e:
+            # The server is up but failed on these images; loading the model here wouldn't do better
+            print(e)
+            return [("Uncategorized", None)] * len(image_paths)
+        except OSError as e:
+            print(f"Inference server unavailable ({e}); classifying in-process.")
+    if not model_loader.load() or not model_loader.index_to_class:
+        print("Custom model not available. Cannot classify image.")
+        return [("Uncategorized", None)] * len(image_paths)
+
+    futures = [classifier.submit(path) for path in image_paths]
+    return [future.result() for future in futures]
+
+
+def classify_images(image_paths):
+    """
+    Classifies several clothing items at once. Returns one category per path, in order.
+    """
+    return [category for category, _ in analyze_images(image_paths)]
 
 
 def classify_image(image_path):
     """
     Classifies a clothing item using our custom-trained fashion model.
+    Concurrent calls are batched together by the background inference worker.
     """
-    if model is None or not index_to_class:
-        print("Custom model not available. Cannot classify image.")
-        return "Uncategorized"
-        
-    try:
-        # Load and preprocess the image
-        img = image.load_img(image_path, target_size=(224, 224))
-        img_array = image.img_to_array(img)
-        img_array_expanded = np.expand_dims(img_array, axis=0)
-        processed_img = preprocess_input(img_array_expanded)
-
-        # Make a prediction with our custom model
-        predictions = model.predict(processed_img)
-        
-        # The prediction is an array of probabilities. The highest one is our answer.
-        predicted_index = np.argmax(predictions[0])
-        
-        # Use our mapping to find the category name for that index
-        predicted_category = index_to_class.get(str(predicted_index), "Uncategorized")
-        
-        print(f"DEBUG: Custom model predicted: '{predicted_category}'")
-        return predicted_category
-
-    except Exception as e:
-        print(f"Error during custom classification: {e}")
-        return "Uncategorized"
+    return classify_images([image_path])[0]
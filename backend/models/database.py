@@ -1,21 +1,105 @@
 # backend/models/database.py
 
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from contextlib import contextmanager
 from datetime import datetime
+import os
 
 db = SQLAlchemy()
 
+
+# --- Engine setup for the configured DB_PROFILE ---
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for the profile and database in `config`."""
+    if config.get('DB_PROFILE') != 'production': return {}
+    if (config.get('SQLALCHEMY_DATABASE_URI') or '').startswith('sqlite'):
+        # sqlite3's timeout is its busy handler: wait for the current writer instead of failing with "database is locked"
+        return {"connect_args": {"timeout": config['SQLITE_BUSY_TIMEOUT_MS'] / 1000}}
+    return {"pool_size": config['DB_POOL_SIZE'], "max_overflow": config['DB_MAX_OVERFLOW'],
+            "pool_pre_ping": True, "pool_recycle": config['DB_POOL_RECYCLE']}
+
+
+def sqlite_pragmas(busy_timeout_ms, mmap_size):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")  # Readers and the writer no longer block each other
+        cursor.execute("PRAGMA synchronous=NORMAL")  # Durable with WAL; fsyncs at checkpoints instead of every commit
+        cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        cursor.execute(f"PRAGMA mmap_size={int(mmap_size)}")  # Reads come straight from the page cache
+        cursor.close()
+    return on_connect
+
+
+@contextmanager
+def startup_lock(app):
+    """Lets one process of the machine at a time migrate at startup (gunicorn starts all workers at once)."""
+    try:
+        import fcntl
+    except ImportError:  # Windows: the single development server
+        yield
+        return
+    os.makedirs(app.instance_path, exist_ok=True)
+    with open(os.path.join(app.instance_path, 'db-startup.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def init_db(app):
+    """Binds `db` to the app with the profile's engine options and, with DB_AUTO_MIGRATE, brings the schema up to date."""
+    if not app.config.get('SQLALCHEMY_ENGINE_OPTIONS'):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    db.init_app(app)
+    with app.app_context():
+        if app.config.get('DB_PROFILE') == 'production' and db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', sqlite_pragmas(app.config['SQLITE_BUSY_TIMEOUT_MS'], app.config['SQLITE_MMAP_SIZE']))
+        if app.config.get('DB_AUTO_MIGRATE'):
+            import migrations
+            with startup_lock(app):
+                migrations.upgrade()
+
 class ClothingItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(255), nullable=False)
     category = db.Column(db.String(100), nullable=True)
     color = db.Column(db.String(50), nullable=True)
+    # CIELAB [L, a, b] of the dominant color found in the photo at upload (color_extraction.py)
+    color_lab = db.Column(db.JSON(none_as_null=True), nullable=True)
+
+    # Back the /clothes filters; the trailing id serves the keyset ordering.
+    # filename: items sharing an uploaded image are looked up on every upload and delete
+    __table_args__ = (
+        db.Index('ix_clothing_item_category_id', 'category', 'id'),
+        db.Index('ix_clothing_item_color_id', 'color', 'id'),
+        db.Index('ix_clothing_item_filename', 'filename'),
+    )
+
+# --- Single-row counter bumped on every wardrobe change, so each worker knows when its snapshot is stale ---
+class WardrobeState(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+# --- Schema version of the database, advanced by migrations.py ---
+class SchemaVersion(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+# --- Classifier results cached by the sha256 of the image bytes ---
+class ClassificationCacheEntry(db.Model):
+    sha256 = db.Column(db.String(64), primary_key=True)
+    phash = db.Column(db.String(16), nullable=True)  # Perceptual hash for near-duplicate lookups
+    category = db.Column(db.String(100), nullable=False)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
 # --- NEW: Model for storing chat sessions ---
 class ChatSession(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False, default="New Outfit Chat")
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     messages = db.relationship('ChatMessage', backref='session', lazy=True, cascade="all, delete-orphan")
 
     def to_dict(self):
@@ -31,10 +115,13 @@ class ChatMessage(db.Model):
     session_id = db.Column(db.Integer, db.ForeignKey('chat_session.id'), nullable=False)
     role = db.Column(db.String(50), nullable=False)  # 'user' or 'ai'
     content = db.Column(db.Text, nullable=False) # The user's prompt or the AI's notes
-    # Store outfit data as a JSON string
-    outfit_data = db.Column(db.Text, nullable=True) 
+    # The outfit as a JSON object: {"top": {...}, "bottom": {...}, ...}
+    outfit_data = db.Column(db.JSON(none_as_null=True), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Serves "the newest page of this chat" straight from the index
+    __table_args__ = (db.Index('ix_chat_message_session_id_created_at', 'session_id', 'created_at'),)
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -0,0 +1,103 @@
+# backend/outfit_precompute.py
+
+import threading
+import time
+
+from fashion_logic import OCCASION_RULES, BAND_EXCLUDES, TEMPERATURE_BANDS, PALETTE
+from metrics import stage
+
+# --- Configuration ---
+COLOR_PREFERENCES = [None] + [color.title() for color in PALETTE[:-1]]  # What parse_prompt can return
+
+
+def group_categories(occasion, band):
+    """The categories an (occasion, band) group draws from; its outfits depend on nothing else."""
+    return [c for c in OCCASION_RULES.get(occasion, []) if c not in BAND_EXCLUDES[band]]
+
+
+class OutfitPrecomputer:
+    """
+    Keeps ranked outfits ready for every (occasion, temperature band, color preference) slot of
+    the current wardrobe, so a chat that matches a slot is answered without running the recommender.
+
+    A background thread refreshes the slots after every wardrobe change made in this process
+    (wardrobe.on_change) and polls the wardrobe version every `poll_seconds` for changes made
+    by other workers. Slots are grouped by (occasion, band): a group only depends on the items
+    in its categories, so after an upload, edit or delete only the groups whose categories'
+    fingerprint changed are recomputed; the others are carried over.
+    """
+
+    def __init__(self, app, wardrobe_cache, top_k=5, poll_seconds=5.0):
+        self.app = app
+        self.wardrobe_cache = wardrobe_cache
+        self.top_k = top_k
+        self.poll_seconds = poll_seconds
+        self.version = None  # Wardrobe version the slots were last brought up to date with
+        self.recomputed_groups = 0
+        self._groups = {}  # (occasion, band) -> (fingerprint of its categories, {color preference: [outfit, ...]})
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def lookup(self, snapshot, occasion, band, preferred_color=None):
+        """
+        The ranked outfits (best first, as OutfitRecommender.recommend returns them) of a slot,
+        if they were computed from the same items `snapshot` has in that slot's categories; else None.
+        """
+        self._ensure_started()
+        group = self._groups.get((occasion, band))
+        if group is None: return None
+        fingerprint, slots = group
+        if fingerprint != snapshot.fingerprint(group_categories(occasion, band)):
+            self._wake.set()  # Changed in another worker since the last poll
+            return None
+        return slots.get(preferred_color.title() if preferred_color else None)
+
+    def notify(self):
+        """The wardrobe changed: refresh the affected slots now rather than at the next poll."""
+        self._ensure_started()
+        self._wake.set()
+
+    def refresh(self):
+        """Brings the slots up to date with the current wardrobe. Needs an app context."""
+        with self._refresh_lock:
+            snapshot = self.wardrobe_cache.current()
+            if snapshot.version == self.version: return 0
+            started, groups, recomputed = time.perf_counter(), {}, 0
+            with stage('precompute.refresh'):
+                for occasion in OCCASION_RULES:
+                    for band in TEMPERATURE_BANDS:
+                        fingerprint = snapshot.fingerprint(group_categories(occasion, band))
+                        previous = self._groups.get((occasion, band))
+                        if previous is not None and previous[0] == fingerprint:
+                            groups[(occasion, band)] = previous
+                            continue
+                        recommender = snapshot.recommender
+                        groups[(occasion, band)] = (fingerprint, {color: recommender.recommend(occasion, band, color, k=self.top_k)
+                                                                  for color in COLOR_PREFERENCES})
+                        recomputed += 1
+            self._groups, self.version = groups, snapshot.version
+            self.recomputed_groups += recomputed
+            if recomputed:
+                self.app.logger.debug(f"Precomputed outfits for wardrobe version {snapshot.version}: {recomputed} of {len(groups)} "
+                                      f"occasion/weather groups recomputed in {(time.perf_counter() - started) * 1000:.0f}ms.")
+            return recomputed
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive(): return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._wake.set()  # Compute everything right away
+                self._thread = threading.Thread(target=self._run, name="outfit-precompute", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    self.refresh()
+            except Exception:
+                self.app.logger.debug("Error precomputing outfits", exc_info=True)
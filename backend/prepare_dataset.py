@@ -1,125 +1,239 @@
 # backend/prepare_dataset.py
 
+import argparse
+import json
 import os
+import random
+import shutil
 import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import pandas as pd
-import shutil
 from tqdm import tqdm
-import random
 
 # --- Configuration ---
 ZIP_FILE_PATH = 'archive.zip'
 DATA_DIR = 'fashion_data'
 OUTPUT_DIR = 'dataset'
-IMAGE_DIR = ''
-CSV_FILE = ''
+MANIFEST_FILE = 'manifest.json'
+CHUNK_SIZE = 256  # Images per task handed to a worker process
+SEED = 42
 
 CATEGORY_MAPPING = {
-    'Topwear': 'T-Shirt', 'Tshirts': 'T-Shirt', 'Shirts': 'Shirt', 
-    'Blouses': 'Blouse', 'Sweaters': 'Sweater', 'Tops': 'T-Shirt', 
-    'Jeans': 'Jeans', 'Skirts': 'Skirt', 'Trousers': 'Trousers', 
-    'Shorts': 'Jeans', 'Bottomwear': 'Trousers', 'Dresses': 'Dress', 
+    'Topwear': 'T-Shirt', 'Tshirts': 'T-Shirt', 'Shirts': 'Shirt',
+    'Blouses': 'Blouse', 'Sweaters': 'Sweater', 'Tops': 'T-Shirt',
+    'Jeans': 'Jeans', 'Skirts': 'Skirt', 'Trousers': 'Trousers',
+    'Shorts': 'Jeans', 'Bottomwear': 'Trousers', 'Dresses': 'Dress',
     'Jackets': 'Jacket', 'Blazers': 'Jacket', 'Coats': 'Coat',
-    'Sandal': 'Flats', 'Heels': 'Heels', 'Flats': 'Flats', 
-    'Flip Flops': 'Flats', 'Shoes': 'Sneakers', 'Sports Shoes': 'Sneakers', 
+    'Sandal': 'Flats', 'Heels': 'Heels', 'Flats': 'Flats',
+    'Flip Flops': 'Flats', 'Shoes': 'Sneakers', 'Sports Shoes': 'Sneakers',
     'Casual Shoes': 'Sneakers',
 }
 
-def find_data_paths(base_dir):
-    global IMAGE_DIR, CSV_FILE
-    for root, dirs, files in os.walk(base_dir):
-        if 'images' in dirs and 'styles.csv' in files:
-            IMAGE_DIR = os.path.join(root, 'images')
-            CSV_FILE = os.path.join(root, 'styles.csv')
-            return True
-    return False
-
-def prepare_dataset():
-    if not os.path.exists(DATA_DIR):
-        print(f"Unzipping {ZIP_FILE_PATH}...")
-        with zipfile.ZipFile(ZIP_FILE_PATH, 'r') as zip_ref:
-            zip_ref.extractall(DATA_DIR)
-        print("Unzipping complete.")
-    
-    if not find_data_paths(DATA_DIR):
-        print(f"Error: Could not find 'images' and 'styles.csv' in '{DATA_DIR}'.")
-        return
+# --- Sources: where the images are read from ---
 
-    try:
-        df = pd.read_csv(CSV_FILE, on_bad_lines='skip')
-        df.set_index('id', inplace=True)
-        id_to_subcategory_map = df['subCategory'].to_dict()
-    except Exception as e:
-        print(f"Error reading or processing '{CSV_FILE}': {e}")
-        return
+class ZipSource:
+    """Reads styles.csv and the images straight out of the archive; nothing is extracted first."""
+
+    def __init__(self, zip_path):
+        self.zip_path = zip_path
+        with zipfile.ZipFile(zip_path) as archive:
+            members = archive.infolist()
+        csv_names = [m.filename for m in members if m.filename.endswith('styles.csv')]
+        if not csv_names: raise FileNotFoundError(f"No styles.csv in '{zip_path}'")
+        self.csv_member = min(csv_names, key=len)
+        image_prefix = os.path.dirname(self.csv_member) + ('/' if '/' in self.csv_member else '') + 'images/'
+        # The central directory already has each member's size and CRC: enough to spot changed files without reading them
+        self.images = {os.path.basename(m.filename): (m.filename, f"{m.file_size}:{m.CRC:08x}")
+                       for m in members if m.filename.startswith(image_prefix) and m.filename.endswith('.jpg')}
 
-    # Use a temporary directory for initial organization
-    TEMP_OUTPUT_DIR = 'dataset_temp'
-    if os.path.exists(TEMP_OUTPUT_DIR):
-        shutil.rmtree(TEMP_OUTPUT_DIR)
-    os.makedirs(TEMP_OUTPUT_DIR, exist_ok=True)
+    def read_csv(self):
+        with zipfile.ZipFile(self.zip_path) as archive, archive.open(self.csv_member) as f:
+            return pd.read_csv(f, on_bad_lines='skip')
 
-    print("Organizing all available images into temporary folders...")
-    actual_filenames = os.listdir(IMAGE_DIR)
-    for filename in tqdm(actual_filenames):
-        if not filename.endswith('.jpg'): continue
+
+class FolderSource:
+    """Uses an already extracted copy of the archive; images are hardlinked or symlinked, not copied."""
+
+    def __init__(self, base_dir):
+        for root, dirs, files in os.walk(base_dir):
+            if 'images' in dirs and 'styles.csv' in files:
+                self.csv_path = os.path.join(root, 'styles.csv')
+                image_dir = os.path.join(root, 'images')
+                break
+        else:
+            raise FileNotFoundError(f"Could not find 'images' and 'styles.csv' in '{base_dir}'")
+        self.images = {}
+        with os.scandir(image_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.jpg'): continue
+                stat = entry.stat()
+                self.images[entry.name] = (os.path.abspath(entry.path), f"{stat.st_size}:{stat.st_mtime_ns}")
+
+    def read_csv(self):
+        return pd.read_csv(self.csv_path, on_bad_lines='skip')
+
+
+# --- Worker processes ---
+
+_archive = None
+
+def _open_archive(zip_path):
+    """Pool initializer: each worker opens the zip once and keeps it for all its tasks."""
+    global _archive
+    _archive = zipfile.ZipFile(zip_path) if zip_path else None
+
+def _materialize(tasks, link_mode):
+    """Writes one chunk of (source, destination) pairs. Returns the destinations that failed."""
+    failed = []
+    for source, dest in tasks:
         try:
-            image_id = int(filename.split('.')[0])
-        except ValueError:
-            continue
-        subcategory = id_to_subcategory_map.get(image_id)
-        if subcategory and subcategory in CATEGORY_MAPPING:
-            target_category = CATEGORY_MAPPING[subcategory]
-            category_dir = os.path.join(TEMP_OUTPUT_DIR, target_category)
-            os.makedirs(category_dir, exist_ok=True)
-            source_path = os.path.join(IMAGE_DIR, filename)
-            dest_path = os.path.join(category_dir, filename)
-            shutil.copyfile(source_path, dest_path)
-
-    # --- NEW: Undersampling to Balance the Dataset ---
-    print("\n--- Balancing the Dataset via Undersampling ---")
-    
-    # 1. Count images in each category
-    category_counts = {cat: len(os.listdir(os.path.join(TEMP_OUTPUT_DIR, cat))) for cat in os.listdir(TEMP_OUTPUT_DIR)}
-    print("Original counts:", category_counts)
-
-    # 2. Find the size of the smallest class (our target size)
-    if not category_counts:
+            if os.path.lexists(dest): os.remove(dest)
+            if _archive is not None:
+                temp = dest + '.part'
+                with _archive.open(source) as src, open(temp, 'wb') as out:
+                    shutil.copyfileobj(src, out, 1024 * 1024)
+                os.replace(temp, dest)
+            elif link_mode == 'hardlink':
+                try:
+                    os.link(source, dest)
+                except OSError:
+                    shutil.copyfile(source, dest)  # Different filesystem
+            elif link_mode == 'symlink':
+                os.symlink(source, dest)
+            else:
+                shutil.copyfile(source, dest)
+        except Exception as e:
+            print(f"Error writing {dest}: {e}")
+            failed.append(dest)
+    return failed
+
+
+# --- Planning ---
+
+def balanced_sample(source, seed):
+    """
+    Picks the balanced (undersampled) training set from the CSV index alone.
+    Returns ({relative destination path: (source, signature)}, per-class size, original counts).
+    """
+    df = source.read_csv()
+    id_to_category = {}
+    for image_id, subcategory in zip(df['id'], df['subCategory']):
+        if subcategory in CATEGORY_MAPPING: id_to_category[f"{image_id}.jpg"] = CATEGORY_MAPPING[subcategory]
+
+    by_category = {}
+    for filename in source.images:
+        category = id_to_category.get(filename)
+        if category: by_category.setdefault(category, []).append(filename)
+    if not by_category: return {}, 0, {}
+    counts = {category: len(files) for category, files in by_category.items()}
+    min_count = min(counts.values())
+
+    rng = random.Random(seed)
+    wanted = {}
+    for category in sorted(by_category):
+        for filename in rng.sample(sorted(by_category[category]), min_count):
+            wanted[f"{category}/{filename}"] = source.images[filename]
+    return wanted, min_count, counts
+
+
+def load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def dataset_files(output_dir):
+    """Every "<category>/<filename>" in the class folders of `output_dir`."""
+    return [f"{category}/{filename}" for category in os.listdir(output_dir) if os.path.isdir(os.path.join(output_dir, category))
+            for filename in os.listdir(os.path.join(output_dir, category))]
+
+
+def save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    with open(path + '.part', 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + '.part', path)
+
+
+def prepare_dataset(source='zip', link_mode='hardlink', workers=None, seed=SEED, full=False):
+    if source == 'zip':
+        data = ZipSource(ZIP_FILE_PATH)
+    else:
+        if not os.path.exists(DATA_DIR):
+            print(f"Unzipping {ZIP_FILE_PATH}...")
+            with zipfile.ZipFile(ZIP_FILE_PATH, 'r') as zip_ref:
+                zip_ref.extractall(DATA_DIR)
+            print("Unzipping complete.")
+        data = FolderSource(DATA_DIR)
+
+    try:
+        wanted, min_count, counts = balanced_sample(data, seed)
+    except Exception as e:
+        print(f"Error reading or processing styles.csv: {e}")
+        return
+    if not wanted:
         print("No categories were created. Exiting.")
         return
-    min_count = min(category_counts.values())
+    print("Original counts:", counts)
     print(f"Target size for all categories will be the smallest class size: {min_count}")
 
-    # 3. Create the final balanced dataset directory
-    if os.path.exists(OUTPUT_DIR):
-        shutil.rmtree(OUTPUT_DIR)
+    # --- Incremental: only write what is new or changed since the last run, and drop what is no longer sampled ---
+    if full and os.path.exists(OUTPUT_DIR): shutil.rmtree(OUTPUT_DIR)
     os.makedirs(OUTPUT_DIR, exist_ok=True)
+    previous = load_manifest(OUTPUT_DIR)
+    # Without a manifest (dataset/ built by an older version of this script) every file not sampled now is stale
+    stale = set(previous or dataset_files(OUTPUT_DIR)) - set(wanted)
+    for relative in stale:
+        path = os.path.join(OUTPUT_DIR, relative)
+        if os.path.lexists(path): os.remove(path)
+    for category in os.listdir(OUTPUT_DIR):
+        folder = os.path.join(OUTPUT_DIR, category)
+        if os.path.isdir(folder) and not os.listdir(folder): os.rmdir(folder)  # A class that is no longer sampled
+    if stale: print(f"Removed {len(stale)} image(s) that are no longer sampled.")
+    todo = [relative for relative, (_, signature) in wanted.items()
+            if previous.get(relative, {}).get('signature') != signature or not os.path.exists(os.path.join(OUTPUT_DIR, relative))]
+    print(f"{len(wanted) - len(todo)} image(s) are up to date, {len(todo)} to write.")
+
+    for category in {relative.split('/')[0] for relative in wanted}:
+        os.makedirs(os.path.join(OUTPUT_DIR, category), exist_ok=True)
+    tasks = [(wanted[relative][0], os.path.join(OUTPUT_DIR, relative)) for relative in todo]
+    chunks = [tasks[i:i + CHUNK_SIZE] for i in range(0, len(tasks), CHUNK_SIZE)]
+    failed = set()
+    if chunks:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_open_archive,
+                                 initargs=(ZIP_FILE_PATH if source == 'zip' else None,)) as pool:
+            futures = {pool.submit(_materialize, chunk, link_mode): len(chunk) for chunk in chunks}
+            with tqdm(total=len(tasks)) as progress:
+                for future in as_completed(futures):
+                    failed.update(future.result())
+                    progress.update(futures[future])
+
+    manifest = {relative: {"source": src, "signature": signature} for relative, (src, signature) in wanted.items()
+                if os.path.join(OUTPUT_DIR, relative) not in failed}
+    save_manifest(OUTPUT_DIR, manifest)
 
-    # 4. Copy a balanced number of images to the final directory
-    for category, count in category_counts.items():
-        source_dir = os.path.join(TEMP_OUTPUT_DIR, category)
-        dest_dir = os.path.join(OUTPUT_DIR, category)
-        os.makedirs(dest_dir, exist_ok=True)
-        
-        # Get all image files for the category
-        images = os.listdir(source_dir)
-        # Randomly sample 'min_count' images from the list
-        sampled_images = random.sample(images, min_count)
-        
-        for image in sampled_images:
-            shutil.copyfile(os.path.join(source_dir, image), os.path.join(dest_dir, image))
-
-    # 5. Clean up the temporary directory
-    shutil.rmtree(TEMP_OUTPUT_DIR)
-    
     print("\n-----------------------------------------")
     print("✅ Dataset preparation and balancing complete!")
     print(f"Your new, balanced training data is ready in the '{OUTPUT_DIR}' directory.")
     print(f"Each category now contains {min_count} images.")
+    if failed: print(f"⚠️ {len(failed)} image(s) could not be written; rerun to retry them.")
     print("-----------------------------------------")
 
 if __name__ == '__main__':
-    if not os.path.exists(ZIP_FILE_PATH):
+    parser = argparse.ArgumentParser(description="Builds the balanced training set in 'dataset/' from the fashion dataset archive.")
+    parser.add_argument('--source', choices=['zip', 'folder'], default='zip',
+                        help="zip: read images straight from the archive (default); folder: use the extracted copy in DATA_DIR")
+    parser.add_argument('--link', choices=['hardlink', 'symlink', 'copy'], default='hardlink',
+                        help="How images from the extracted folder are placed into dataset/ (folder source only)")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument('--seed', type=int, default=SEED, help="Seed for the balanced sample")
+    parser.add_argument('--full', action='store_true', help="Ignore the manifest and rebuild dataset/ from scratch")
+    args = parser.parse_args()
+
+    if not os.path.exists(ZIP_FILE_PATH) and not (args.source == 'folder' and os.path.exists(DATA_DIR)):
         print(f"Error: '{ZIP_FILE_PATH}' not found. Please download the dataset.")
     else:
-        prepare_dataset()
+        prepare_dataset(args.source, args.link, args.workers, args.seed, args.full)
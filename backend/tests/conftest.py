@@ -0,0 +1,14 @@
+# backend/tests/conftest.py
+
+import os
+import tempfile
+
+# The app reads its configuration at import time: point it at throwaway storage before any test imports it
+_workdir = tempfile.mkdtemp(prefix='fashion-tests-')
+os.environ.update({
+    'SQLALCHEMY_DATABASE_URI': f"sqlite:///{_workdir}/test.db",
+    'UPLOAD_FOLDER': os.path.join(_workdir, 'uploads'),
+    'THUMBNAIL_FOLDER': os.path.join(_workdir, 'thumbnails'),
+    'EMBEDDING_INDEX_FOLDER': os.path.join(_workdir, 'embeddings'),
+    'MODEL_PRELOAD': 'false',
+})
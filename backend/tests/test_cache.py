@@ -0,0 +1,195 @@
+# backend/tests/test_cache.py
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from benchmarks.stubs import weather_stub, WeatherHandler
+from cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+# --- TTL and LRU ---
+
+def test_entries_expire_after_their_ttl():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=60, clock=clock)
+    cache.set('paris', 21)
+    clock.advance(59)
+    assert cache.get('paris') == 21
+    clock.advance(1)
+    assert cache.get('paris') is None
+    assert len(cache) == 0
+
+
+def test_expired_entries_are_recomputed():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=60, clock=clock)
+    calls = []
+    compute = lambda: calls.append(1) or len(calls)
+    assert cache.get_or_compute('paris', compute) == 1
+    clock.advance(30)
+    assert cache.get_or_compute('paris', compute) == 1
+    clock.advance(30)
+    assert cache.get_or_compute('paris', compute) == 2
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 2
+
+
+def test_least_recently_used_entry_is_evicted_at_maxsize():
+    cache = TTLCache(maxsize=2, ttl=60, clock=FakeClock())
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'b' is now the least recently used
+    cache.set('c', 3)
+    assert len(cache) == 2
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+# --- What is not cached ---
+
+def test_none_results_are_not_cached():
+    cache = TTLCache(maxsize=10, ttl=60, clock=FakeClock())
+    calls = []
+    for _ in range(3):
+        assert cache.get_or_compute('atlantis', lambda: calls.append(1)) is None
+    assert len(calls) == 3
+    assert len(cache) == 0
+
+
+def test_should_cache_decides_what_is_stored():
+    cache = TTLCache(maxsize=10, ttl=60, should_cache=lambda result: result.get('outfit') is not None, clock=FakeClock())
+    assert cache.get_or_compute('prompt', lambda: {'outfit': None, 'notes': "Gemini is down"})['outfit'] is None
+    assert cache.get('prompt') is None
+    cache.get_or_compute('prompt', lambda: {'outfit': {'top': 1}, 'notes': "ok"})
+    assert cache.get('prompt')['outfit'] == {'top': 1}
+
+
+def test_failed_computations_raise_and_are_retried():
+    cache = TTLCache(maxsize=10, ttl=60, clock=FakeClock())
+
+    def fail():
+        raise TimeoutError("upstream timed out")
+
+    with pytest.raises(TimeoutError):
+        cache.get_or_compute('paris', fail)
+    assert cache.get_or_compute('paris', lambda: 21) == 21
+
+
+# --- Coalescing ---
+
+def test_concurrent_callers_share_one_computation():
+    cache = TTLCache(maxsize=10, ttl=60)
+    started, release, calls = threading.Event(), threading.Event(), []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 21
+
+    with ThreadPoolExecutor(8) as pool:
+        leader = pool.submit(cache.get_or_compute, 'paris', slow)
+        started.wait(5)
+        followers = [pool.submit(cache.get_or_compute, 'paris', slow) for _ in range(7)]
+        while cache.stats()['coalesced'] < 7:
+            threading.Event().wait(0.01)
+        release.set()
+        assert leader.result() == 21 and [f.result() for f in followers] == [21] * 7
+    assert len(calls) == 1
+
+
+def test_waiting_callers_get_the_leaders_exception():
+    cache = TTLCache(maxsize=10, ttl=60)
+    started, release = threading.Event(), threading.Event()
+
+    def fail():
+        started.set()
+        release.wait(5)
+        raise TimeoutError("upstream timed out")
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(cache.get_or_compute, 'paris', fail)
+        started.wait(5)
+        follower = pool.submit(cache.get_or_compute, 'paris', fail)
+        while cache.stats()['coalesced'] < 1:
+            threading.Event().wait(0.01)
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(TimeoutError):
+                future.result()
+
+
+def test_concurrent_streams_share_one_producer():
+    cache = TTLCache(maxsize=10, ttl=60, should_cache=lambda result: result.get('outfit') is not None)
+    release, calls = threading.Event(), []
+
+    def produce():
+        calls.append(1)
+        yield 'notes', "A relaxed "
+        release.wait(5)
+        yield 'notes', "look."
+        return {'outfit': {'top': 1}, 'notes': "A relaxed look."}
+
+    leader = cache.get_or_stream('prompt', produce)
+    follower = cache.get_or_stream('prompt', produce)
+    assert next(iter(follower)) == ('notes', "A relaxed ")
+    release.set()
+    assert list(leader) == list(follower) == [('notes', "A relaxed "), ('notes', "look.")]
+    assert leader.result() == follower.result() == cache.get_or_compute('prompt', lambda: None)
+    assert len(calls) == 1
+
+    cached = cache.get_or_stream('prompt', produce)
+    assert list(cached) == [] and cached.result()['outfit'] == {'top': 1}
+    assert len(calls) == 1
+
+
+def test_streams_finish_without_readers_and_failures_are_not_cached():
+    cache = TTLCache(maxsize=10, ttl=60, should_cache=lambda result: result.get('outfit') is not None)
+
+    def produce():
+        yield 'notes', "partial"
+        return {'outfit': None, 'notes': "Gemini timed out"}
+
+    assert cache.get_or_stream('prompt', produce).result(timeout=5)['outfit'] is None
+    assert cache.get('prompt') is None
+
+
+# --- Weather cache against the OpenWeatherMap stub ---
+
+@pytest.fixture
+def weather(monkeypatch):
+    from app import app, weather_cache
+    with weather_stub(latency=0) as stub:
+        monkeypatch.setenv('WEATHER_API_KEY', 'stub')
+        monkeypatch.setitem(app.config, 'WEATHER_API_URL', f"{stub.url}/data/2.5/weather")
+        weather_cache.clear()
+        yield stub
+        weather_cache.clear()
+
+
+def test_weather_is_fetched_once_per_city(weather):
+    from app import get_weather
+    first = get_weather('Paris')
+    assert first['main']['temp'] == get_weather(' paris ')['main']['temp']
+    assert weather.calls == 1
+
+
+def test_failed_weather_lookups_are_not_cached(weather):
+    from app import get_weather, weather_cache
+    assert get_weather(WeatherHandler.UNKNOWN_CITY) is None
+    assert get_weather(WeatherHandler.UNKNOWN_CITY) is None
+    assert weather.calls == 2
+    assert len(weather_cache) == 0
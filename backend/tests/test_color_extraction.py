@@ -0,0 +1,34 @@
+# backend/tests/test_color_extraction.py
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from color_extraction import dominant_color, color_label, palette_name, srgb_to_lab
+from image_preprocessing import DecodedImage
+
+
+def garment_photo(rgb, background=(245, 245, 242), size=200):
+    """A flat-lay product photo: a solid garment in the middle of a light, plain backdrop."""
+    pixels = np.full((size, size, 3), background, dtype=np.uint8)
+    pixels[size // 5:-size // 5, size // 4:-size // 4] = rgb
+    return DecodedImage(Image.fromarray(pixels), (size, size))
+
+
+@pytest.mark.parametrize('rgb, name', [
+    ((255, 0, 0), 'Red'), ((0, 200, 0), 'Green'), ((0, 0, 255), 'Blue'),
+    ((0, 255, 0), 'Green'), ((200, 0, 0), 'Red'), ((0, 120, 255), 'Blue'),
+])
+def test_strong_colors_get_their_names(rgb, name):
+    assert color_label(dominant_color(garment_photo(rgb))) == name
+
+
+@pytest.mark.parametrize('rgb, name', [
+    ((130, 20, 35), 'red'), ((25, 35, 80), 'navy'), ((70, 110, 160), 'blue'), ((100, 110, 60), 'green'), ((195, 165, 125), 'beige'),
+])
+def test_muted_shades_keep_their_names(rgb, name):
+    assert palette_name(srgb_to_lab(rgb)) == name
+
+
+def test_colors_outside_the_palette_stay_unnamed():
+    assert palette_name(srgb_to_lab((255, 220, 0))) is None  # Yellow
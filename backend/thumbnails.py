@@ -0,0 +1,79 @@
+# backend/thumbnails.py
+
+import hashlib
+import os
+import uuid
+
+from PIL import Image
+
+from image_preprocessing import DecodedImage, decode
+
+# --- Configuration ---
+SIZES = (128, 256, 512)
+FORMATS = {'webp': ('WEBP', 'image/webp'), 'jpeg': ('JPEG', 'image/jpeg')}
+QUALITY = 80
+# Bump when the resizing/encoding settings change so clients drop their cached copies.
+DERIVATIVE_VERSION = 1
+
+
+def derivative_path(thumbnail_folder, filename, size, fmt):
+    stem = filename.rsplit('.', 1)[0]
+    return os.path.join(thumbnail_folder, str(size), f"{stem}.{fmt}")
+
+
+def derivative_etag(filename, size, fmt):
+    """
+    Strong ETag for a derivative. Uploaded files are never overwritten in place,
+    so the source name plus the generator settings identify the bytes exactly.
+    """
+    return hashlib.sha1(f"{filename}:{size}:{fmt}:{DERIVATIVE_VERSION}".encode()).hexdigest()
+
+
+def make_derivative(source, target_path, size, fmt):
+    """
+    Downscales `source` to fit in a `size` x `size` box and writes it atomically to `target_path`.
+    `source` is a path, or a DecodedImage (at least `size` pixels on its shorter side) that is left untouched.
+    """
+    # A path is decoded in JPEG draft mode, which lets the decoder do most of the downscaling
+    img = source.image.copy() if isinstance(source, DecodedImage) else DecodedImage.open(source, size).image
+    img.thumbnail((size, size), Image.LANCZOS)
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    temp_path = f"{target_path}.{uuid.uuid4().hex}.part"
+    pil_format = FORMATS[fmt][0]
+    img.save(temp_path, pil_format, quality=QUALITY, **({'method': 4} if pil_format == 'WEBP' else {'optimize': True, 'progressive': True}))
+    os.replace(temp_path, target_path)
+
+
+def get_or_create_derivative(upload_folder, thumbnail_folder, filename, size, fmt, image=None):
+    """Returns the path of the cached derivative, generating it on first use (from `image` when given)."""
+    target_path = derivative_path(thumbnail_folder, filename, size, fmt)
+    if not os.path.exists(target_path):
+        make_derivative(image if image is not None else os.path.join(upload_folder, filename), target_path, size, fmt)
+    return target_path
+
+
+def create_all_derivatives(upload_folder, thumbnail_folder, filename, image=None):
+    """
+    Pre-generates every size/format variant, e.g. right after an upload. The source is decoded
+    once for all of them; pass the upload's DecodedImage to skip even that.
+    """
+    try:
+        image = decode(image if image is not None else os.path.join(upload_folder, filename), max(SIZES))
+    except Exception as e:
+        print(f"Error decoding {filename} for its derivatives: {e}")
+        return
+    for size in SIZES:
+        for fmt in FORMATS:
+            try:
+                get_or_create_derivative(upload_folder, thumbnail_folder, filename, size, fmt, image)
+            except Exception as e:
+                print(f"Error creating {size}px {fmt} derivative of {filename}: {e}")
+
+
+def remove_derivatives(thumbnail_folder, filename):
+    for size in SIZES:
+        for fmt in FORMATS:
+            try:
+                os.remove(derivative_path(thumbnail_folder, filename, size, fmt))
+            except FileNotFoundError:
+                pass
@@ -1,12 +1,20 @@
 # backend/train_model.py
 
 import tensorflow as tf
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
+from tensorflow.keras.preprocessing.image import ImageDataGenerator, load_img, img_to_array
 from tensorflow.keras.applications import MobileNetV2
-from tensorflow.keras.layers import Dense, GlobalAveragePooling2D
+from tensorflow.keras.layers import Dense, GlobalAveragePooling2D, Input
 from tensorflow.keras.models import Model
 from tensorflow.keras.optimizers import Adam
+import argparse
+import json
 import os
+import time
+
+import numpy as np
+
+from image_preprocessing import preprocess_input
+from input_pipeline import list_dataset, split_dataset, make_datasets
 
 # --- Configuration ---
 DATASET_DIR = 'dataset'
@@ -14,97 +22,262 @@ IMAGE_SIZE = (224, 224)
 BATCH_SIZE = 32
 NUM_EPOCHS = 5 # An epoch is one full pass through the entire dataset. 5 is a good starting point.
 MODEL_SAVE_PATH = 'fashion_model.h5'
+CLASS_INDICES_PATH = 'class_indices.json'
+VALIDATION_SPLIT = 0.2
+SEED = 42
+# Pooled MobileNetV2 features of every training image, computed once and memory-mapped from here
+FEATURE_CACHE_DIR = 'feature_cache'
+FEATURE_DIM = 1280
+AUGMENTED_VIEWS = 2 # Extra randomly augmented copies of each training image in the feature cache
+HEAD_EPOCHS = 30 # Epochs over cached features take seconds, so the head can train for longer
+FINE_TUNE_LEARNING_RATE = 1e-5
+# Quantized exports for ml_model.py's tflite runtime (INFERENCE_RUNTIME=tflite)
+TFLITE_EXPORTS = {'dynamic': 'fashion_model_dynamic.tflite', 'int8': 'fashion_model_int8.tflite'}
+CALIBRATION_IMAGES = 200 # Training images used to calibrate the int8 activation ranges
+
+# The augmentations used by both the generator pipeline and the cached augmented views
+AUGMENTATION = dict(horizontal_flip=True, rotation_range=20, width_shift_range=0.2, height_shift_range=0.2, shear_range=0.2, zoom_range=0.2)
+
+
+def build_head(num_classes):
+    """The layers we train on top of the pooled backbone features."""
+    return [Dense(1024, activation='relu'), Dense(num_classes, activation='softmax')]
+
+
+def build_full_model(base_model, head):
+    x = GlobalAveragePooling2D()(base_model.output) # A layer to reduce dimensions
+    for layer in head:
+        x = layer(x)
+    return Model(inputs=base_model.input, outputs=x)
+
 
-def train_model():
+# --- Cached-feature training ---
+
+def load_batch(paths, augmenter=None, seed=None):
+    images = np.stack([img_to_array(load_img(p, target_size=IMAGE_SIZE)) for p in paths])
+    if augmenter is not None:
+        images = np.stack([augmenter.random_transform(image, seed=seed + i) for i, image in enumerate(images)])
+    return preprocess_input(images) # Same normalization as the generators, tf.data and inference
+
+
+def dataset_signature(paths, views):
+    """Changes when any image is added, removed or modified, or the cache settings change."""
+    files = [(p, os.path.getsize(p), os.path.getmtime(p)) for p in paths]
+    return {"files": files, "views": views, "image_size": list(IMAGE_SIZE), "backbone": "MobileNetV2/imagenet/avg", "input": "[-1, 1]"}
+
+
+def extract_features(paths, labels, train_indices, views, cache_dir=FEATURE_CACHE_DIR):
     """
-    Loads the prepared dataset, fine-tunes a pre-trained model,
-    and saves the new, specialized model.
+    Runs the frozen backbone once over every image (plus `views` augmented copies of each
+    training image) and stores the pooled features in a memory-mapped array. Reuses the
+    cache as long as the dataset and settings are unchanged.
+    Returns (features memmap, labels, row ranges {"train": (start, stop), "validation": ...}).
     """
-    if not os.path.exists(DATASET_DIR):
-        print(f"Error: Dataset directory '{DATASET_DIR}' not found.")
-        print("Please run 'prepare_dataset.py' first.")
-        return
+    os.makedirs(cache_dir, exist_ok=True)
+    meta_path = os.path.join(cache_dir, 'meta.json')
+    features_path = os.path.join(cache_dir, 'features.npy')
+    signature = dataset_signature(paths, views)
+
+    train_set = set(train_indices)
+    validation_indices = [i for i in range(len(paths)) if i not in train_set]
+    # Row layout, one contiguous segment each: the training images, their augmented views (view by view), the validation images
+    segments = [(train_indices, None)] + [(train_indices, v) for v in range(views)] + [(validation_indices, None)]
+    row_labels = np.concatenate([labels[indices] for indices, _ in segments]).astype(np.int32)
+    n_train_rows = len(train_indices) * (1 + views)
+    ranges = {"train": (0, n_train_rows), "validation": (n_train_rows, len(row_labels))}
+
+    if os.path.exists(meta_path) and os.path.exists(features_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get('complete') and meta.get('signature') == json.loads(json.dumps(signature)):
+            print(f"Reusing cached features from '{cache_dir}'.")
+            return np.load(features_path, mmap_mode='r'), row_labels, ranges
+
+    if os.path.exists(meta_path): os.remove(meta_path)  # An interrupted extraction must not look complete
+    print(f"Extracting backbone features for {len(row_labels)} image views (runs once)...")
+    backbone = MobileNetV2(weights='imagenet', include_top=False, pooling='avg', input_shape=IMAGE_SIZE + (3,))
+    features = np.lib.format.open_memmap(features_path, mode='w+', dtype=np.float32, shape=(len(row_labels), FEATURE_DIM))
+    augmenter = ImageDataGenerator(**AUGMENTATION)
+    started, row = time.perf_counter(), 0
+    for indices, view in segments:
+        for start in range(0, len(indices), BATCH_SIZE):
+            batch = indices[start:start + BATCH_SIZE]
+            images = load_batch([paths[i] for i in batch], augmenter if view is not None else None,
+                                seed=None if view is None else SEED + 1_000_003 * (view + 1) + start)
+            features[row:row + len(batch)] = backbone.predict_on_batch(images)
+            row += len(batch)
+        print(f"  {row}/{len(row_labels)} ({time.perf_counter() - started:.0f}s)")
+    features.flush()
+    with open(meta_path, 'w') as f:
+        json.dump({"signature": signature, "complete": True, "rows": len(row_labels)}, f)
+    return np.load(features_path, mmap_mode='r'), row_labels, ranges
+
+
+def train_head_on_features(views=AUGMENTED_VIEWS, epochs=HEAD_EPOCHS):
+    paths, labels, class_indices = list_dataset()
+    train_indices, _ = split_dataset(paths, labels)
+    features, row_labels, ranges = extract_features(paths, labels, train_indices, views)
+    num_classes = len(class_indices)
+
+    train_slice, validation_slice = slice(*ranges['train']), slice(*ranges['validation'])
+    x_train, y_train = features[train_slice], tf.keras.utils.to_categorical(row_labels[train_slice], num_classes)
+    x_validation, y_validation = features[validation_slice], tf.keras.utils.to_categorical(row_labels[validation_slice], num_classes)
+
+    # Train only the Dense head, straight on the cached features
+    head = build_head(num_classes)
+    inputs = Input(shape=(FEATURE_DIM,))
+    x = inputs
+    for layer in head:
+        x = layer(x)
+    head_model = Model(inputs=inputs, outputs=x)
+    head_model.compile(optimizer=Adam(learning_rate=0.001), loss='categorical_crossentropy', metrics=['accuracy'])
+
+    print("Starting head training on cached features...")
+    head_model.fit(np.asarray(x_train), y_train, batch_size=BATCH_SIZE, epochs=epochs, shuffle=True,
+                   validation_data=(np.asarray(x_validation), y_validation))
+    print("✅ Training complete!")
+
+    # Put the trained head back on the (frozen, unchanged) backbone: the saved model is the same as before
+    base_model = MobileNetV2(weights='imagenet', include_top=False, input_shape=(224, 224, 3))
+    model = build_full_model(base_model, head)
+    return model, class_indices
+
+
+# --- End-to-end training through the image generators ---
 
-    # 1. Prepare the Data Generators
-    # ImageDataGenerator is a Keras utility that can load images from folders
-    # and prepare them for training (e.g., resizing, batching, and data augmentation).
-    
+def make_generators(augment=True):
     # We split our data: 80% for training, 20% for validation (testing).
     datagen = ImageDataGenerator(
-        rescale=1./255, # Normalize pixel values from 0-255 to 0-1
-        validation_split=0.2, # Use 20% of the data for validation
-        horizontal_flip=True, # Data augmentation to improve model robustness
-        rotation_range=20,
-        width_shift_range=0.2,
-        height_shift_range=0.2,
-        shear_range=0.2,
-        zoom_range=0.2
+        preprocessing_function=preprocess_input, # Scale pixels to [-1, 1], exactly as at inference time
+        validation_split=VALIDATION_SPLIT, # Use 20% of the data for validation
+        **(AUGMENTATION if augment else {})
     )
-
     train_generator = datagen.flow_from_directory(
-        DATASET_DIR,
-        target_size=IMAGE_SIZE,
-        batch_size=BATCH_SIZE,
-        class_mode='categorical',
-        subset='training' # This is the training set
+        DATASET_DIR, target_size=IMAGE_SIZE, batch_size=BATCH_SIZE, class_mode='categorical', subset='training', seed=SEED
     )
-
     validation_generator = datagen.flow_from_directory(
-        DATASET_DIR,
-        target_size=IMAGE_SIZE,
-        batch_size=BATCH_SIZE,
-        class_mode='categorical',
-        subset='validation' # This is the validation set
+        DATASET_DIR, target_size=IMAGE_SIZE, batch_size=BATCH_SIZE, class_mode='categorical', subset='validation', seed=SEED
     )
+    return train_generator, validation_generator
+
+
+def train_end_to_end(fine_tune, epochs=NUM_EPOCHS, pipeline='tfdata'):
+    if pipeline == 'tfdata':
+        train_data, validation_data, class_indices = make_datasets(DATASET_DIR, BATCH_SIZE, seed=SEED, validation_split=VALIDATION_SPLIT)
+    else:
+        train_data, validation_data = make_generators()
+        class_indices = train_data.class_indices
 
-    # 2. Build the Model (Fine-Tuning)
     # Load the pre-trained MobileNetV2 model, but without its final classification layer.
     base_model = MobileNetV2(weights='imagenet', include_top=False, input_shape=(224, 224, 3))
-
-    # Freeze the layers of the base model so we don't ruin their pre-trained knowledge.
+    # Frozen: keep the pre-trained knowledge as is. Fine-tuning: let every layer adapt, with a small learning rate.
     for layer in base_model.layers:
-        layer.trainable = False
-
-    # Add our own custom classification layers on top.
-    x = base_model.output
-    x = GlobalAveragePooling2D()(x) # A layer to reduce dimensions
-    x = Dense(1024, activation='relu')(x) # A dense, fully connected layer
-    
-    # The final output layer must have the same number of neurons as we have categories.
-    num_classes = len(train_generator.class_indices)
-    predictions = Dense(num_classes, activation='softmax')(x) # Softmax is used for multi-class classification
-
-    # Combine the base model and our new layers into the final model.
-    model = Model(inputs=base_model.input, outputs=predictions)
-
-    # 3. Compile the Model
-    # We tell the model how to learn. Adam is a popular and effective optimizer.
-    model.compile(optimizer=Adam(learning_rate=0.001), loss='categorical_crossentropy', metrics=['accuracy'])
-    
+        layer.trainable = fine_tune
+
+    model = build_full_model(base_model, build_head(len(class_indices)))
+    learning_rate = FINE_TUNE_LEARNING_RATE if fine_tune else 0.001
+    model.compile(optimizer=Adam(learning_rate=learning_rate), loss='categorical_crossentropy', metrics=['accuracy'])
+
     print("\n--- Model Summary ---")
     model.summary()
     print("---------------------\n")
 
-    # 4. Train the Model
     print("Starting model training...")
-    history = model.fit(
-        train_generator,
-        epochs=NUM_EPOCHS,
-        validation_data=validation_generator
-    )
+    model.fit(train_data, epochs=epochs, validation_data=validation_data)
     print("✅ Training complete!")
+    return model, class_indices
+
+
+# --- Quantized TFLite export ---
+
+def build_inference_model(model):
+    """The classifier with the pooled backbone features as a second output, like ml_model's feature model."""
+    pooled = next(layer for layer in model.layers if isinstance(layer, GlobalAveragePooling2D))
+    return Model(inputs=model.input, outputs=[pooled.output, model.output])
+
+
+def calibration_batches(paths, seed=SEED):
+    """Representative inputs for int8 calibration: resized and scaled to [-1, 1] with the same preprocess_input as ml_model.py."""
+    rng = np.random.default_rng(seed)
+    for i in rng.choice(len(paths), size=min(CALIBRATION_IMAGES, len(paths)), replace=False):
+        image = img_to_array(load_img(paths[i], target_size=IMAGE_SIZE, interpolation='nearest'))
+        yield [preprocess_input(image[np.newaxis])]
+
+
+def export_tflite(model, variants=tuple(TFLITE_EXPORTS)):
+    """
+    Writes post-training quantized copies of the model:
+    'dynamic' int8 weights, float activations (no calibration needed, ~4x smaller);
+    'int8'    int8 weights and activations, calibrated on training images (float input/output kept for the caller).
+    """
+    inference_model = build_inference_model(model)
+    calibration_paths = None
+    for variant in variants:
+        converter = tf.lite.TFLiteConverter.from_keras_model(inference_model)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if variant == 'int8':
+            if calibration_paths is None:
+                paths, labels, _ = list_dataset()
+                train_indices, _ = split_dataset(paths, labels)
+                calibration_paths = [paths[i] for i in train_indices]
+            converter.representative_dataset = lambda: calibration_batches(calibration_paths)
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        started = time.perf_counter()
+        with open(TFLITE_EXPORTS[variant], 'wb') as f:
+            f.write(converter.convert())
+        size_mb = os.path.getsize(TFLITE_EXPORTS[variant]) / 1e6
+        print(f"✅ {variant} TFLite model saved to '{TFLITE_EXPORTS[variant]}' ({size_mb:.1f} MB, {time.perf_counter() - started:.0f}s)")
+
+
+def train_model(mode='cached', views=AUGMENTED_VIEWS, epochs=None, pipeline='tfdata', export=tuple(TFLITE_EXPORTS)):
+    """
+    Trains the clothing classifier and saves the model and its class indices.
+
+    mode='cached'   frozen backbone; its features are computed once and cached, only the head trains (fast on CPU)
+    mode='frozen'   frozen backbone, every image goes through it in every epoch (the original pipeline)
+    mode='finetune' end-to-end fine-tuning of the backbone and the head
+
+    pipeline picks the input pipeline of the frozen and finetune modes: 'tfdata' (parallel decode,
+    cached decoded images, prefetch) or 'generator' (the original ImageDataGenerator).
+    export lists the quantized TFLite variants to write next to the .h5 ('dynamic', 'int8').
+    """
+    if not os.path.exists(DATASET_DIR):
+        print(f"Error: Dataset directory '{DATASET_DIR}' not found.")
+        print("Please run 'prepare_dataset.py' first.")
+        return
+
+    if mode == 'cached':
+        model, class_indices = train_head_on_features(views, epochs or HEAD_EPOCHS)
+    else:
+        model, class_indices = train_end_to_end(fine_tune=(mode == 'finetune'), epochs=epochs or NUM_EPOCHS, pipeline=pipeline)
 
-    # 5. Save the Final Model
     model.save(MODEL_SAVE_PATH)
     print(f"✅ Model saved to '{MODEL_SAVE_PATH}'")
-    
+
     # Also save the class indices (e.g., {'T-Shirt': 0, 'Jeans': 1, ...})
     # We will need this mapping to understand the model's predictions later.
-    import json
-    with open('class_indices.json', 'w') as f:
-        json.dump(train_generator.class_indices, f)
-    print("✅ Class indices saved to 'class_indices.json'")
+    with open(CLASS_INDICES_PATH, 'w') as f:
+        json.dump(class_indices, f)
+    print(f"✅ Class indices saved to '{CLASS_INDICES_PATH}'")
+
+    if export:
+        export_tflite(model, export)
 
 
 if __name__ == '__main__':
-    train_model()
+    parser = argparse.ArgumentParser(description="Trains the clothing classifier on the 'dataset/' folder.")
+    parser.add_argument('--mode', choices=['cached', 'frozen', 'finetune'], default='cached',
+                        help="cached (default): train the head on cached backbone features; frozen: original generator pipeline; "
+                             "finetune: full end-to-end fine-tuning")
+    parser.add_argument('--fine-tune', dest='mode', action='store_const', const='finetune', help="Shortcut for --mode finetune")
+    parser.add_argument('--views', type=int, default=AUGMENTED_VIEWS, help="Augmented views per training image in the feature cache")
+    parser.add_argument('--epochs', type=int, default=None)
+    parser.add_argument('--pipeline', choices=['tfdata', 'generator'], default='tfdata', help="Input pipeline for --mode frozen/finetune")
+    parser.add_argument('--export', nargs='*', choices=list(TFLITE_EXPORTS), default=list(TFLITE_EXPORTS),
+                        help="Quantized TFLite variants to export after training (none: pass --export with no values)")
+    parser.add_argument('--export-only', action='store_true', help=f"Skip training; export the TFLite variants of '{MODEL_SAVE_PATH}'")
+    args = parser.parse_args()
+    if args.export_only:
+        export_tflite(tf.keras.models.load_model(MODEL_SAVE_PATH), args.export)
+    else:
+        train_model(args.mode, args.views, args.epochs, args.pipeline, args.export)
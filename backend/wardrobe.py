@@ -0,0 +1,120 @@
+# backend/wardrobe.py
+
+import hashlib
+import heapq
+import json
+import threading
+from collections import namedtuple
+
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+
+from models.database import db, ClothingItem, WardrobeState
+from fashion_logic import OutfitRecommender
+
+# Compact, immutable per-item record; _asdict() gives the {"id", "filename", "category", "color"} shape the API returns
+WardrobeItem = namedtuple('WardrobeItem', ['id', 'filename', 'category', 'color'])
+
+_change_listeners = []
+
+
+def on_change(callback):
+    """Calls `callback()` after every commit in this process that changed the wardrobe (see bump_version)."""
+    _change_listeners.append(callback)
+
+
+def bump_version():
+    """Marks the wardrobe as changed. Call it in the same transaction that adds, edits or deletes clothes."""
+    result = db.session.execute(update(WardrobeState).where(WardrobeState.id == 1).values(version=WardrobeState.version + 1))
+    if result.rowcount == 0:
+        db.session.add(WardrobeState(id=1, version=1))
+    db.session.info['wardrobe_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _notify_change(session):
+    if session.info.pop('wardrobe_changed', False):
+        for callback in _change_listeners:
+            callback()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_change(session):
+    session.info.pop('wardrobe_changed', None)
+
+
+def current_version():
+    return db.session.query(WardrobeState.version).filter(WardrobeState.id == 1).scalar() or 0
+
+
+def wardrobe_hash(items):
+    """Changes whenever any of the given items is added, removed, recategorised or recoloured."""
+    state = sorted((item.id, item.category or '', item.color or '') for item in items)
+    return hashlib.sha1(json.dumps(state).encode()).hexdigest()
+
+
+class WardrobeSnapshot:
+    """
+    Read-only copy of the whole wardrobe at one version: items by id and by category.
+    Everything derived from it (bucket hashes, the local recommender) is computed at most once per version.
+    """
+
+    def __init__(self, version, items):
+        self.version = version
+        self.items = {item.id: item for item in items}
+        self.by_category = {}
+        for item in sorted(items, key=lambda item: item.id):
+            self.by_category.setdefault(item.category, []).append(item)
+        self._bucket_hashes = {}
+        self._recommender = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, item_id):
+        return self.items.get(item_id)
+
+    def in_categories(self, categories):
+        """Items of the given categories, ordered by id."""
+        buckets = [self.by_category[c] for c in set(categories) if c in self.by_category]
+        return list(heapq.merge(*buckets, key=lambda item: item.id))
+
+    def fingerprint(self, categories):
+        """Hash of the items in the given categories; unchanged by edits to any other category."""
+        hashes = []
+        for category in sorted(set(categories)):
+            if category not in self._bucket_hashes:
+                self._bucket_hashes[category] = wardrobe_hash(self.by_category.get(category, ()))
+            hashes.append(self._bucket_hashes[category])
+        return hashlib.sha1("".join(hashes).encode()).hexdigest()
+
+    @property
+    def recommender(self):
+        if self._recommender is None:
+            with self._lock:
+                if self._recommender is None: self._recommender = OutfitRecommender(self.items.values())
+        return self._recommender
+
+
+class WardrobeCache:
+    """
+    Holds the current snapshot for this worker. `current()` costs one primary-key read of the
+    version counter; the clothing table is only read again after an upload, edit or delete.
+    """
+
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def current(self):
+        version = current_version()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version: return snapshot
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != version:
+                rows = db.session.query(ClothingItem.id, ClothingItem.filename, ClothingItem.category, ClothingItem.color).all()
+                self._snapshot = WardrobeSnapshot(version, [WardrobeItem(*row) for row in rows])
+                self.reloads += 1
+            return self._snapshot
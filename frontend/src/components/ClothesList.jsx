@@ -33,7 +33,7 @@ const ClothingItemCard = ({ item, onDelete, onEdit }) => {
       className="relative rounded-xl shadow-lg bg-white dark:bg-gray-800 p-3 transition-transform hover:scale-105 group"
     >
       <img
-        src={`http://127.0.0.1:5000/uploads/${item.filename}`}
+        src={`http://127.0.0.1:5000/thumbnails/512/${item.filename}`}
         className="rounded-md mb-2 h-56 object-cover w-full"
         alt={item.category}
       />
@@ -165,7 +165,7 @@ export default function ClothesList() {
           <motion.div key="folders" initial={{ opacity: 0 }} animate={{ opacity: 1 }} exit={{ opacity: 0 }} className="grid grid-cols-1 sm:grid-cols-2 md:grid-cols-3 lg:grid-cols-4 gap-6">
             {Object.keys(groupedClothes).map((category) => (
               <motion.div key={category} onClick={() => setSelectedCategory(category)} className="cursor-pointer aspect-square rounded-2xl p-4 flex flex-col justify-end shadow-lg bg-white dark:bg-gray-800 relative overflow-hidden group" whileHover={{ scale: 1.03 }}>
-                <img src={`${API_URL}/uploads/${groupedClothes[category][0].filename}`} className="absolute top-0 left-0 w-full h-full object-cover transition-transform duration-500 group-hover:scale-110" alt={category}/>
+                <img src={`${API_URL}/thumbnails/512/${groupedClothes[category][0].filename}`} className="absolute top-0 left-0 w-full h-full object-cover transition-transform duration-500 group-hover:scale-110" alt={category}/>
                 <div className="absolute top-0 left-0 w-full h-full bg-gradient-to-t from-black/70 to-transparent"></div>
                 <div className="relative z-10 text-white">
                   <h4 className="text-2xl font-bold capitalize">{category}</h4>
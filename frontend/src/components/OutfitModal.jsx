@@ -5,7 +5,7 @@ const ClothingCard = ({ item, type }) => (
     <div className="flex flex-col items-center">
         <h3 className="text-xl font-semibold mb-3 text-gray-700 dark:text-gray-200">{type}</h3>
         <img
-            src={`http://127.0.0.1:5000/uploads/${item.filename}`}
+            src={`http://127.0.0.1:5000/thumbnails/512/${item.filename}`}
             className="w-full h-80 object-cover rounded-xl shadow-lg"
             alt={item.category}
         />
@@ -42,10 +42,11 @@ export default function OutfitModal({ outfit, onClose }) {
             </button>
           </div>
           
-          <div className="grid grid-cols-1 md:grid-cols-3 gap-8">
+          <div className="grid grid-cols-1 md:grid-cols-4 gap-8">
             {outfit.top && <ClothingCard item={outfit.top} type={outfit.top.category === 'Dress' ? 'Dress' : 'Top'}/>}
             {outfit.bottom && <ClothingCard item={outfit.bottom} type="Bottom"/>}
             {outfit.outerwear && <ClothingCard item={outfit.outerwear} type="Outerwear"/>}
+            {outfit.shoes && <ClothingCard item={outfit.shoes} type="Shoes"/>}
           </div>
 
         </motion.div>
@@ -57,14 +57,23 @@ const ChatHistoryItem = ({ chat, isActive, onClick, onRename, onDelete }) => {
     );
 };
 
+const CHATS_PAGE_SIZE = 50;
+
 // --- Main Sidebar Component ---
 export default function Sidebar({ page, setPage, activeChatId, setActiveChatId, onNewChat, closeSidebar, darkMode, setDarkMode }) {
     const [chats, setChats] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
     const [settingsOpen, setSettingsOpen] = useState(false);
 
     const fetchChats = () => {
-        axios.get('http://127.0.0.1:5000/chats')
-            .then(res => setChats(res.data))
+        axios.get('http://127.0.0.1:5000/chats', { params: { limit: CHATS_PAGE_SIZE } })
+            .then(res => { setChats(res.data.items); setNextCursor(res.data.next_cursor); })
+            .catch(err => console.error("Failed to fetch chats", err));
+    };
+
+    const fetchMoreChats = () => {
+        axios.get('http://127.0.0.1:5000/chats', { params: { limit: CHATS_PAGE_SIZE, cursor: nextCursor } })
+            .then(res => { setChats(prev => [...prev, ...res.data.items]); setNextCursor(res.data.next_cursor); })
             .catch(err => console.error("Failed to fetch chats", err));
     };
 
@@ -116,6 +125,9 @@ export default function Sidebar({ page, setPage, activeChatId, setActiveChatId,
                     onRename={handleRename} onDelete={handleDelete}
                 />
             ))}
+            {nextCursor && (
+                <button onClick={fetchMoreChats} className="w-full p-2 text-xs font-semibold text-violet-600 hover:underline">Show more</button>
+            )}
         </div>
       </div>
       
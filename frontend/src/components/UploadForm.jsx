@@ -39,7 +39,7 @@ const getSelectStyles = (isDark) => ({
 });
 
 export default function UploadForm() {
-  const [file, setFile] = useState(null);
+  const [files, setFiles] = useState([]);
   const [category, setCategory] = useState(null);
   const [color, setColor] = useState(null);
   const [isDarkMode, setIsDarkMode] = useState(false);
@@ -56,14 +56,20 @@ export default function UploadForm() {
   const handleSubmit = async (e) => {
     e.preventDefault();
     // FIX: Only the file is now required.
-    if (!file) {
+    if (files.length === 0) {
       alert("Please select an image to upload.");
       return;
     }
     setUploading(true);
 
+    // Several images or a zip go through the bulk endpoint in a single request
+    const isBulk = files.length > 1 || files[0].name.toLowerCase().endsWith(".zip");
     const formData = new FormData();
-    formData.append("image", file);
+    if (isBulk) {
+      files.forEach(f => formData.append(f.name.toLowerCase().endsWith(".zip") ? "archive" : "images", f));
+    } else {
+      formData.append("image", files[0]);
+    }
     
     // FIX: Only append category and color if they have been selected by the user.
     if (category) {
@@ -74,10 +80,16 @@ export default function UploadForm() {
     }
 
     try {
-      await axios.post(`http://127.0.0.1:5000/upload`, formData);
-      alert("Uploaded successfully!");
+      if (isBulk) {
+        const res = await axios.post(`http://127.0.0.1:5000/upload/bulk`, formData);
+        const failures = res.data.results.filter(r => r.status === "error").map(r => `${r.file}: ${r.error}`);
+        alert(`Uploaded ${res.data.created} item(s).` + (failures.length ? `\n\nSkipped:\n${failures.join("\n")}` : ""));
+      } else {
+        await axios.post(`http://127.0.0.1:5000/upload`, formData);
+        alert("Uploaded successfully!");
+      }
       // Reset form
-      setFile(null);
+      setFiles([]);
       setCategory(null);
       setColor(null);
       // This is a simple way to reset the file input visually
@@ -95,9 +107,12 @@ export default function UploadForm() {
       {/* File input */}
       <div>
         <label className="block font-semibold mb-2">Upload Image (Required)</label>
+        <p className="text-xs text-gray-500 mb-2">Select several images, or a .zip of them, to add a whole closet at once.</p>
         <input
           type="file"
-          onChange={(e) => setFile(e.target.files[0])}
+          multiple
+          accept="image/png,image/jpeg,.zip"
+          onChange={(e) => setFiles(Array.from(e.target.files))}
           required
           className={`block w-full text-sm text-gray-500 file:mr-4 file:py-2 file:px-4 file:rounded-full file:border-0 file:text-sm file:font-semibold file:bg-violet-50 dark:file:bg-violet-900/50 file:text-violet-700 dark:file:text-violet-300 hover:file:bg-violet-100 dark:hover:file:bg-violet-900/80`}
         />
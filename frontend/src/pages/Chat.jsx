@@ -8,7 +8,7 @@ import OutfitModal from '../components/OutfitModal'; // Import the new modal
 // --- Reusable Message Component ---
 const ChatMessage = ({ message, onViewOutfit }) => {
     const isUser = message.role === 'user';
-    const outfitData = message.outfit_data ? JSON.parse(message.outfit_data) : null;
+    const outfitData = message.outfit_data;
 
     return (
         <motion.div
@@ -33,43 +33,60 @@ const ChatMessage = ({ message, onViewOutfit }) => {
 const OutfitDisplay = ({ outfit }) => (
     <div className="mt-4 pt-4 border-t border-gray-300 dark:border-gray-600 group">
         <p className="text-xs text-center font-semibold text-gray-500 dark:text-gray-400 mb-2 group-hover:text-violet-500">Click to view</p>
-        <div className="grid grid-cols-3 gap-2 text-center">
+        <div className="grid grid-cols-4 gap-2 text-center">
             {outfit.top && <ClothingThumbnail item={outfit.top} />}
             {outfit.bottom && <ClothingThumbnail item={outfit.bottom} />}
             {outfit.outerwear && <ClothingThumbnail item={outfit.outerwear} />}
+            {outfit.shoes && <ClothingThumbnail item={outfit.shoes} />}
         </div>
     </div>
 );
 
 const ClothingThumbnail = ({ item }) => (
     <div>
-        <img src={`http://127.0.0.1:5000/uploads/${item.filename}`} className="w-full h-24 object-cover rounded-md shadow-sm" alt={item.category} />
+        <img src={`http://127.0.0.1:5000/thumbnails/256/${item.filename}`} className="w-full h-24 object-cover rounded-md shadow-sm" alt={item.category} />
         <p className="text-xs mt-1 capitalize">{item.category}</p>
     </div>
 );
 
+const PAGE_SIZE = 30;
+
 // --- Main Chat Component ---
 export default function Chat({ activeChatId }) {
     const [messages, setMessages] = useState([]);
     const [inputPrompt, setInputPrompt] = useState('');
     const [loading, setLoading] = useState(false);
     const [viewingOutfit, setViewingOutfit] = useState(null); // State for the modal
+    const [olderCursor, setOlderCursor] = useState(null); // Cursor of the page before the oldest loaded message
     const messagesEndRef = useRef(null);
+    const loadingOlderRef = useRef(false);
 
     useEffect(() => {
+        if (loadingOlderRef.current) { loadingOlderRef.current = false; return; } // Keep the scroll position when older messages are prepended
         messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
     }, [messages]);
 
     useEffect(() => {
         if (activeChatId) {
             setLoading(true);
-            axios.get(`http://127.0.0.1:5000/chats/${activeChatId}/messages`)
-                .then(res => setMessages(res.data))
+            // Only the newest page; older messages are loaded on demand
+            axios.get(`http://127.0.0.1:5000/chats/${activeChatId}/messages`, { params: { limit: PAGE_SIZE } })
+                .then(res => { setMessages(res.data.items); setOlderCursor(res.data.next_cursor); })
                 .catch(err => console.error("Failed to fetch messages", err))
                 .finally(() => setLoading(false));
         }
     }, [activeChatId]);
 
+    const loadOlderMessages = () => {
+        axios.get(`http://127.0.0.1:5000/chats/${activeChatId}/messages`, { params: { limit: PAGE_SIZE, cursor: olderCursor } })
+            .then(res => {
+                loadingOlderRef.current = true;
+                setMessages(prev => [...res.data.items, ...prev]);
+                setOlderCursor(res.data.next_cursor);
+            })
+            .catch(err => console.error("Failed to fetch older messages", err));
+    };
+
     const handleSendMessage = async (e) => {
         e.preventDefault();
         if (!inputPrompt.trim() || !activeChatId) return;
@@ -80,8 +97,38 @@ export default function Chat({ activeChatId }) {
         setLoading(true);
 
         try {
-            const res = await axios.post(`http://127.0.0.1:5000/chats/${activeChatId}/messages`, { prompt: userMessage.content });
-            setMessages(prev => [...prev, res.data]);
+            // Stream the stylist notes in as they are written (Server-Sent Events)
+            const res = await fetch(`http://127.0.0.1:5000/chats/${activeChatId}/messages?stream=1`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
+                body: JSON.stringify({ prompt: userMessage.content }),
+            });
+            if (!res.ok || !res.body) throw new Error(`Request failed with status ${res.status}`);
+
+            const updateReply = (update) => setMessages(prev => [...prev.slice(0, -1), update(prev[prev.length - 1])]);
+            const reader = res.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let started = false;
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                let boundary;
+                while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                    const rawEvent = buffer.slice(0, boundary);
+                    buffer = buffer.slice(boundary + 2);
+                    const event = /^event: (.*)$/m.exec(rawEvent)?.[1];
+                    const data = JSON.parse(/^data: (.*)$/m.exec(rawEvent)?.[1] ?? 'null');
+                    if (!started) {
+                        started = true;
+                        setLoading(false);
+                        setMessages(prev => [...prev, { role: 'ai', content: '', outfit_data: null }]);
+                    }
+                    if (event === 'notes') updateReply(reply => ({ ...reply, content: reply.content + (data.text || '') }));
+                    if (event === 'done') updateReply(() => data);
+                }
+            }
         } catch (err) {
             console.error("Failed to send message", err);
             const errorMsg = { role: 'ai', content: "Sorry, I ran into an error. Please try again.", outfit_data: null };
@@ -98,6 +145,11 @@ export default function Chat({ activeChatId }) {
             <PageHeader title="AI" highlight="Stylist Chat" subtitle="Your personal fashion conversationalist." />
             
             <div className="flex-grow overflow-y-auto pr-4">
+                {olderCursor && (
+                    <button onClick={loadOlderMessages} className="block mx-auto my-2 text-sm font-semibold text-violet-600 hover:underline">
+                        Load earlier messages
+                    </button>
+                )}
                 {messages.map((msg, index) => <ChatMessage key={index} message={msg} onViewOutfit={setViewingOutfit} />)}
                 {loading && <ChatMessage message={{role: 'ai', content: "Thinking..."}} />}
                 <div ref={messagesEndRef} />
@@ -43,7 +43,7 @@ const ClothingCard = ({ item, type }) => (
     <div className="flex flex-col items-center">
         <h4 className="font-semibold mb-2 text-gray-600 dark:text-gray-300">{type}</h4>
         <img
-            src={`http://127.0.0.1:5000/uploads/${item.filename}`}
+            src={`http://127.0.0.1:5000/thumbnails/512/${item.filename}`}
             className="w-full h-64 object-cover rounded-lg shadow-md"
             alt={item.category}
         />